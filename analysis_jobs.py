@@ -0,0 +1,114 @@
+import argparse
+import os
+import socket
+import threading
+import time
+
+from database import (
+    get_posts_by_profile_url,
+    save_analysis_result,
+    ensure_analysis_job_indexes,
+    enqueue_analysis_job,
+    claim_analysis_job,
+    finish_analysis_job,
+    get_analysis_job,
+)
+
+POLL_INTERVAL_SECONDS = float(os.environ.get("ANALYSIS_JOB_POLL_SECONDS", 2))
+# A running job not finished within this time is assumed abandoned and taken over
+STALE_JOB_SECONDS = int(os.environ.get("ANALYSIS_JOB_STALE_SECONDS", 600))
+
+_indexes_ready = False
+_worker_thread = None
+_worker_lock = threading.Lock()
+
+
+def _ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        ensure_analysis_job_indexes()
+        _indexes_ready = True
+
+
+def enqueue(profile_url):
+    """Requests a (re)analysis of a profile, e.g. after new posts were saved."""
+    _ensure_indexes()
+    enqueue_analysis_job(profile_url)
+
+
+def get_job_status(profile_url):
+    """
+    Returns the profile's job document ('status' is queued, running, done or failed,
+    with 'requested_at', 'started_at', 'finished_at' and 'error'), or None if never queued.
+    """
+    return get_analysis_job(profile_url)
+
+
+def process_job(job):
+    """Computes and stores the analysis for one claimed job."""
+    from data_analyzer import run_full_analysis
+    from data_cache import invalidate
+
+    profile_url = job["_id"]
+    start = time.perf_counter()
+    try:
+        analysis = run_full_analysis(get_posts_by_profile_url(profile_url))
+        if analysis:
+            save_analysis_result(profile_url, analysis)
+        finish_analysis_job(profile_url)
+        print(f"  ✅ Analysis for {profile_url} in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        finish_analysis_job(profile_url, error=f"{type(e).__name__}: {e}")
+        print(f"  ❌ Analysis for {profile_url} failed: {e}")
+    # Cached reads in this process (the app, when the worker runs in-process) now see the result
+    invalidate(profile_url)
+
+
+def run_pending(worker_id=None, max_jobs=None):
+    """Processes queued jobs until the queue is empty (or max_jobs were run). Returns the number run."""
+    _ensure_indexes()
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = claim_analysis_job(worker_id, STALE_JOB_SECONDS)
+        if job is None:
+            break
+        process_job(job)
+        processed += 1
+    return processed
+
+
+def run_worker(poll_interval=POLL_INTERVAL_SECONDS, worker_id=None):
+    """Polls the queue forever; several workers can run at once since claims are atomic."""
+    while True:
+        try:
+            if not run_pending(worker_id):
+                time.sleep(poll_interval)
+        except Exception as e:
+            print(f"⚠️ Analysis worker error: {e}")
+            time.sleep(poll_interval)
+
+
+def start_background_worker():
+    """Starts one daemon worker thread for this process (used by the app); later calls are no-ops."""
+    global _worker_thread
+    with _worker_lock:
+        if _worker_thread is None or not _worker_thread.is_alive():
+            _worker_thread = threading.Thread(target=run_worker, name="analysis-worker", daemon=True)
+            _worker_thread.start()
+    return _worker_thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Background worker for profile analysis jobs")
+    parser.add_argument('--enqueue', nargs='*', default=None, help="Queue analyses for these profile URLs")
+    parser.add_argument('--once', action='store_true', help="Process queued jobs, then exit")
+    args = parser.parse_args()
+
+    for url in args.enqueue or []:
+        enqueue(url)
+        print(f"Queued {url}")
+    if args.once:
+        print(f"Processed {run_pending()} jobs.")
+    elif args.enqueue is None:
+        run_worker()
@@ -0,0 +1,305 @@
+import argparse
+import json
+import math
+import os
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import tornado.ioloop
+import tornado.locks
+import tornado.util
+import tornado.web
+from pymongo.errors import PyMongoError
+from tornado.httpserver import HTTPServer
+
+import data_cache
+from database import initialize_database, POST_TABLE_SORTS, FEEDBACK_TABLE_SORTS
+from single_flight import get_single_flight_stats
+from change_feed import get_change_feed_stats, start_watcher
+
+API_PORT = int(os.environ.get("API_PORT", 8888))
+# Blocking work (MongoDB reads, LLM calls) runs on this pool; keep it within MONGO_MAX_POOL_SIZE
+API_WORKER_THREADS = int(os.environ.get("API_WORKER_THREADS", 32))
+API_MAX_CONCURRENT_READS = int(os.environ.get("API_MAX_CONCURRENT_READS", 64))
+API_MAX_CONCURRENT_GENERATIONS = int(os.environ.get("API_MAX_CONCURRENT_GENERATIONS", 4))
+# A request waiting longer than this for a free slot gets 503 instead of queueing indefinitely
+API_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("API_QUEUE_TIMEOUT_SECONDS", 5))
+API_MAX_BATCH_JOBS = int(os.environ.get("API_MAX_BATCH_JOBS", 50))
+API_MAX_PAGE_SIZE = 200
+
+FEEDBACK_VALUES = {"positive", "negative", "saved", "neutral"}
+
+
+class ConcurrencyLimit:
+    """Caps in-flight requests of one kind; waiters give up after API_QUEUE_TIMEOUT_SECONDS."""
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.semaphore = tornado.locks.Semaphore(limit)
+        self.stats = {"active": 0, "completed": 0, "rejected": 0}
+
+    async def run(self, executor, fn, *args):
+        try:
+            await self.semaphore.acquire(timeout=datetime.timedelta(seconds=API_QUEUE_TIMEOUT_SECONDS))
+        except tornado.util.TimeoutError:
+            self.stats["rejected"] += 1
+            raise tornado.web.HTTPError(503, reason=f"Too many concurrent {self.name} requests")
+        self.stats["active"] += 1
+        try:
+            return await tornado.ioloop.IOLoop.current().run_in_executor(executor, fn, *args)
+        finally:
+            self.stats["active"] -= 1
+            self.stats["completed"] += 1
+            self.semaphore.release()
+
+
+def _jsonable(value):
+    if isinstance(value, pd.DataFrame):
+        if not isinstance(value.index, pd.RangeIndex):
+            # Labelled rows (dates, topics) are kept as keys
+            return _jsonable(value.to_dict(orient="index"))
+        return json.loads(value.to_json(orient="records", date_format="iso", default_handler=str))
+    if isinstance(value, pd.Series):
+        return _jsonable(value.to_dict())
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, (np.integer, np.bool_)):
+        return value.item()
+    if isinstance(value, (float, np.floating)):
+        return None if math.isnan(value) or math.isinf(value) else float(value)
+    if isinstance(value, (datetime.datetime, datetime.date, pd.Timestamp)):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, bool)):
+        return value
+    return str(value)   # ObjectId and other BSON types
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    """JSON responses, with blocking calls run on the shared executor under a concurrency limit."""
+
+    def initialize(self, executor, limits):
+        self.executor = executor
+        self.limits = limits
+
+    def run_read(self, fn, *args):
+        return self.limits["read"].run(self.executor, fn, *args)
+
+    def write_json(self, value, status=200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+        self.write(json.dumps(_jsonable(value)))
+
+    def write_error(self, status_code, **kwargs):
+        self.write_json({"error": self._reason}, status_code)
+
+    def json_body(self):
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except json.JSONDecodeError as e:
+            raise tornado.web.HTTPError(400, reason=f"Invalid JSON: {e}")
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, reason="Expected a JSON object")
+        return body
+
+    def profile_url(self):
+        profile_url = self.get_query_argument("profile_url", None)
+        if not profile_url:
+            raise tornado.web.HTTPError(400, reason="Missing profile_url")
+        return profile_url
+
+    def int_argument(self, name, default, minimum=1, maximum=None):
+        try:
+            value = int(self.get_query_argument(name, default))
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason=f"{name} must be an integer")
+        return max(minimum, min(value, maximum) if maximum else value)
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.write_json({"status": "ok"})
+
+
+class ProfilesHandler(BaseHandler):
+    async def get(self):
+        self.write_json({"profiles": await self.run_read(data_cache.get_profile_urls)})
+
+
+class ProfileHandler(BaseHandler):
+    async def get(self):
+        profile = await self.run_read(data_cache.get_profile_data_by_url, self.profile_url())
+        if not profile:
+            raise tornado.web.HTTPError(404, reason="Profile not found")
+        self.write_json(profile)
+
+
+class PostsHandler(BaseHandler):
+    async def get(self):
+        sort_by = self.get_query_argument("sort_by", "date")
+        if sort_by not in POST_TABLE_SORTS:
+            raise tornado.web.HTTPError(400, reason=f"sort_by must be one of {POST_TABLE_SORTS}")
+        page = self.int_argument("page", 1)
+        page_size = self.int_argument("page_size", 25, maximum=API_MAX_PAGE_SIZE)
+        posts_df, total = await self.run_read(
+            data_cache.get_posts_page, self.profile_url(),
+            self.get_query_argument("start_date", None), self.get_query_argument("end_date", None),
+            tuple(self.get_query_arguments("type")), sort_by,
+            self.get_query_argument("descending", "true").lower() != "false", page, page_size,
+        )
+        self.write_json({"page": page, "page_size": page_size, "total": total, "posts": posts_df})
+
+
+class FeedbackPageHandler(BaseHandler):
+    async def get(self):
+        sort_by = self.get_query_argument("sort_by", "timestamp")
+        if sort_by not in FEEDBACK_TABLE_SORTS:
+            raise tornado.web.HTTPError(400, reason=f"sort_by must be one of {FEEDBACK_TABLE_SORTS}")
+        page = self.int_argument("page", 1)
+        page_size = self.int_argument("page_size", 25, maximum=API_MAX_PAGE_SIZE)
+        feedback_df, total = await self.run_read(
+            data_cache.get_feedback_page, self.profile_url(),
+            self.get_query_argument("start_date", None), self.get_query_argument("end_date", None),
+            tuple(self.get_query_arguments("feedback")), self.get_query_argument("topic", None),
+            sort_by, self.get_query_argument("descending", "true").lower() != "false", page, page_size,
+        )
+        self.write_json({"page": page, "page_size": page_size, "total": total, "feedback": feedback_df})
+
+    async def post(self):
+        from content_generator import save_post_feedback
+
+        body = self.json_body()
+        missing = [field for field in ("profile_url", "content", "feedback") if not body.get(field)]
+        if missing:
+            raise tornado.web.HTTPError(400, reason=f"Missing fields: {', '.join(missing)}")
+        if body["feedback"] not in FEEDBACK_VALUES:
+            raise tornado.web.HTTPError(400, reason=f"feedback must be one of {sorted(FEEDBACK_VALUES)}")
+        try:
+            failed = await self.run_read(
+                save_post_feedback, body["content"], body["feedback"], body["profile_url"],
+                body.get("textual_feedback"), body.get("topic"), body.get("tone"), body.get("scheduled_time"),
+            )
+        except PyMongoError as e:
+            raise tornado.web.HTTPError(503, reason=f"Feedback could not be saved: {type(e).__name__}")
+        response = {"saved": True}
+        if failed:
+            response["warnings"] = [f"{name} not updated" for name in failed]
+        self.write_json(response, 201)
+
+
+class AnalysisHandler(BaseHandler):
+    async def get(self):
+        from analysis_jobs import enqueue, get_job_status
+
+        profile_url = self.profile_url()
+        analysis = await self.run_read(data_cache.get_profile_analysis, profile_url)
+        job = await self.run_read(get_job_status, profile_url)
+        if analysis:
+            self.write_json({"analysis": analysis, "job": job})
+            return
+        # Nothing computed yet: queue it (once) and let the client poll, like Content Insights does
+        if job is None:
+            await self.run_read(enqueue, profile_url)
+            job = await self.run_read(get_job_status, profile_url)
+        self.write_json({"analysis": None, "job": job}, 202)
+
+
+class FeedbackSummaryHandler(BaseHandler):
+    async def get(self):
+        self.write_json(await self.run_read(data_cache.get_feedback_summary, self.profile_url()))
+
+
+class PreferencesHandler(BaseHandler):
+    async def get(self):
+        from preference_store import get_preferences
+        self.write_json(await self.run_read(get_preferences, self.profile_url()))
+
+
+class GenerateHandler(BaseHandler):
+    async def post(self):
+        from batch_generation import run_batch_generation, normalize_job
+
+        body = self.json_body()
+        jobs = body.get("jobs") or ([body] if body.get("profile_url") else [])
+        if not jobs:
+            raise tornado.web.HTTPError(400, reason="Expected 'jobs' or a single job with profile_url and topic")
+        if len(jobs) > API_MAX_BATCH_JOBS:
+            raise tornado.web.HTTPError(400, reason=f"At most {API_MAX_BATCH_JOBS} jobs per request")
+        try:
+            jobs = [normalize_job(job) for job in jobs]
+        except (KeyError, TypeError, ValueError) as e:
+            raise tornado.web.HTTPError(400, reason=f"Invalid job: {e}")
+
+        def generate():
+            # Identical requests in flight share one LLM call through the generation cache's single flight
+            return list(run_batch_generation(jobs, max_concurrency=min(len(jobs), API_MAX_CONCURRENT_GENERATIONS)))
+
+        results = await self.limits["generate"].run(self.executor, generate)
+        self.write_json({"results": results})
+
+
+class StatsHandler(BaseHandler):
+    def get(self):
+        self.write_json({
+            "limits": {name: dict(limit.stats, limit=limit.limit) for name, limit in self.limits.items()},
+            "data_cache": data_cache.get_data_cache_stats(),
+            "single_flight": get_single_flight_stats(),
+            "change_feed": get_change_feed_stats(),
+        })
+
+
+def make_app(executor=None):
+    """
+    Builds the Tornado application.
+
+    Args:
+        executor (ThreadPoolExecutor, optional): Pool for blocking calls (API_WORKER_THREADS threads by default)
+
+    Returns:
+        tornado.web.Application
+    """
+    settings = {
+        "executor": executor or ThreadPoolExecutor(API_WORKER_THREADS, thread_name_prefix="api"),
+        "limits": {
+            "read": ConcurrencyLimit("read", API_MAX_CONCURRENT_READS),
+            "generate": ConcurrencyLimit("generation", API_MAX_CONCURRENT_GENERATIONS),
+        },
+    }
+    return tornado.web.Application([
+        (r"/health", HealthHandler, settings),
+        (r"/profiles", ProfilesHandler, settings),
+        (r"/profile", ProfileHandler, settings),
+        (r"/posts", PostsHandler, settings),
+        (r"/analysis", AnalysisHandler, settings),
+        (r"/feedback", FeedbackPageHandler, settings),
+        (r"/feedback/summary", FeedbackSummaryHandler, settings),
+        (r"/preferences", PreferencesHandler, settings),
+        (r"/generate", GenerateHandler, settings),
+        (r"/stats", StatsHandler, settings),
+    ])
+
+
+def serve(port=API_PORT, analysis_worker=False):
+    initialize_database()
+    # Invalidate cached reads when other processes write
+    start_watcher()
+    if analysis_worker:
+        from analysis_jobs import start_background_worker
+        start_background_worker()
+    server = HTTPServer(make_app(), xheaders=True)
+    server.listen(port)
+    print(f"✅ API listening on http://localhost:{port}")
+    tornado.ioloop.IOLoop.current().start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Async HTTP API over profiles, posts, analyses, generation and feedback")
+    parser.add_argument('--port', type=int, default=API_PORT)
+    parser.add_argument('--analysis-worker', action='store_true', help="Also process analysis jobs in this process")
+    args = parser.parse_args()
+
+    serve(args.port, args.analysis_worker)
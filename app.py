@@ -1,26 +1,24 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-
-from data_analyzer import (
-    analyze_post_engagement,
-    analyze_posting_patterns,
-    analyze_hashtags,
-    analyze_content_length,
-    sentiment_analysis,
-    get_optimal_posting_time
-)
-
-from content_generator import generate_post, update_feedback_preferences
-
-from database import (
-    initialize_database,
+import math
+import os
+
+# Heavy modules (matplotlib, scipy/TextBlob via data_analyzer, the generation stack)
+# are imported inside the page that needs them, so opening one page does not pay for all
+from database import POST_TABLE_SORTS, FEEDBACK_TABLE_SORTS
+from change_feed import CHANGE_POLL_SECONDS, start_watcher, latest_seq, get_changes_since
+# Reads repeated on every rerun are served from a process-wide cache shared by all sessions
+from data_cache import (
     get_profile_urls,
     get_profile_data_by_url,
-    get_posts_by_profile_url,
-    save_analysis_result,
-    get_feedback_by_profile_url
+    get_feedback_summary,
+    get_profile_analysis,
+    get_data_version,
+    get_data_cache_stats,
+    get_posts_page,
+    get_feedback_page,
+    get_distinct_values,
+    invalidate,
 )
 
 # Page configuration
@@ -30,21 +28,83 @@ st.set_page_config(
     layout="wide"
 )
 
-def make_serializable(obj):
-    if isinstance(obj, dict):
-        return {str(k): make_serializable(v) for k, v in obj.items()}
-    elif isinstance(obj, (np.float64, np.int64, np.int32, np.float32)):
-        return float(obj)
-    elif isinstance(obj, (np.ndarray, pd.Series)):
-        return make_serializable(obj.tolist())
-    elif isinstance(obj, pd.Timestamp):
-        return obj.to_pydatetime()
-    elif isinstance(obj, float) and np.isnan(obj):
-        return None
-    return obj
-
-# Initialize the database (MongoDB)
-initialize_database()
+# The MongoDB client is created on first data access (database.get_client), so the first
+# render does not wait for a connection check
+
+
+# Analyses run in a separate `python analysis_jobs.py` worker; ANALYSIS_WORKER_IN_APP=1
+# runs one on a thread of this process instead, started with the first session
+@st.cache_resource
+def _start_analysis_worker():
+    from analysis_jobs import start_background_worker
+    return start_background_worker()
+
+
+if os.environ.get("ANALYSIS_WORKER_IN_APP", "0") == "1":
+    _start_analysis_worker()
+
+
+# Writes from other processes (the scraper, analysis workers, the API) are picked up by a
+# change watcher that invalidates this process's cached reads. It is started by the first
+# page that shows live updates (see live_updates below), not at import
+@st.cache_resource
+def _start_change_watcher():
+    return start_watcher()
+
+
+LIVE_UPDATES = os.environ.get("CHANGE_FEED_IN_APP", "1") == "1"
+
+
+def paged_table(key, fetch, page_size):
+    """
+    Shows one page of a server-side paginated table with a page selector.
+    fetch(page) returns (DataFrame for that page, total matching rows).
+    """
+    page_key = f"{key}_page"
+    page = st.session_state.get(page_key, 1)
+    table_df, total = fetch(page)
+    pages = max(1, math.ceil(total / page_size))
+    if page > pages:
+        # Filters changed and the old page no longer exists
+        page = pages
+        table_df, total = fetch(page)
+    st.session_state[page_key] = page
+
+    table_df.index = range((page - 1) * page_size + 1, (page - 1) * page_size + len(table_df) + 1)
+    st.dataframe(table_df, use_container_width=True)
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        st.number_input("Page", min_value=1, max_value=pages, step=1, key=page_key)
+    with col2:
+        first = (page - 1) * page_size + 1 if total else 0
+        st.caption(f"Rows {first}–{(page - 1) * page_size + len(table_df)} of {total}")
+
+def live_updates(key, profile_url, collections, label):
+    """
+    Refreshes the page when new data for the profile lands, and lists the new rows.
+    The check runs in a fragment every CHANGE_POLL_SECONDS and only reads this process's change log.
+    """
+    if not LIVE_UPDATES:
+        return
+    _start_change_watcher()
+    seq_key, new_key = f"{key}_seq_{profile_url}", f"{key}_new_{profile_url}"
+    st.session_state.setdefault(seq_key, latest_seq())
+    _watch_changes(seq_key, new_key, profile_url, tuple(collections))
+    new_rows = st.session_state.get(new_key)
+    if new_rows:
+        with st.expander(f"🔔 {len(new_rows)} new {label} since you opened this page"):
+            st.dataframe(pd.DataFrame(new_rows), use_container_width=True)
+
+
+@st.fragment(run_every=CHANGE_POLL_SECONDS)
+def _watch_changes(seq_key, new_key, profile_url, collections):
+    events, seq = get_changes_since(profile_url, st.session_state[seq_key], collections)
+    st.session_state[seq_key] = seq
+    if events:
+        # Only this profile's cached reads were invalidated, so the rerun re-reads just those
+        rows = [e["row"] for e in events if any(v is not None for v in e["row"].values())]
+        st.session_state[new_key] = (st.session_state.get(new_key, []) + rows)[-50:]
+        st.rerun()
 
 # Main page title
 st.title("LinkedIn Content Creator AI")
@@ -53,6 +113,11 @@ st.markdown("This tool helps you analyze LinkedIn data stored in MongoDB and gen
 # Sidebar navigation
 st.sidebar.title("Navigation")
 page = st.sidebar.radio("Select a page", ["Profile Analysis", "Content Insights", "Post Generator", "Feedback Dashboard"])
+data_cache_stats = get_data_cache_stats()
+st.sidebar.caption(
+    f"Data cache: {data_cache_stats['hits']} hits, {data_cache_stats['entries']} entries "
+    f"({data_cache_stats['hit_rate']:.0%} hit rate)"
+)
 
 # ─── PROFILE ANALYSIS ───────────────────────────────────────────────────────────
 if page == "Profile Analysis":
@@ -66,13 +131,15 @@ if page == "Profile Analysis":
         profile_option = st.selectbox("Select a profile to analyze", profile_urls)
 
         if st.button("Load Profile Data"):
-            st.spinner("Loading profile data...")
+            st.session_state.loaded_profile = profile_option
+        # Stays loaded across the reruns caused by the table's filter and page widgets
+        if st.session_state.get("loaded_profile") == profile_option:
             profile_data = get_profile_data_by_url(profile_option)
             if not profile_data:
                 st.error("No data found for this profile.")
             else:
-                posts_data = get_posts_by_profile_url(profile_option)
                 st.success(f"Loaded profile: {profile_data['name']}")
+                live_updates("posts", profile_option, ["posts", "profiles"], "posts")
 
                 col1, col2 = st.columns(2)
                 with col1:
@@ -88,66 +155,120 @@ if page == "Profile Analysis":
                     st.write(f"**Average Engagement:** {profile_data['avg_engagement']:.1f}")
 
                 st.subheader("Recent Posts")
-                selected_columns = ['post_url', 'date', 'time', 'content_length_type', 'type', 'likes', 'comments', 'shares', 'engagement']
-                posts_df = pd.DataFrame(posts_data)
-                posts_df = posts_df[selected_columns]
-                posts_df.index = posts_df.index + 1
-                st.dataframe(posts_df)
+                with st.expander("Filter & sort"):
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        date_range = st.date_input("Date range", value=(), key="posts_dates")
+                        post_types = st.multiselect("Type", get_distinct_values("posts", "type", profile_option))
+                    with col2:
+                        sort_by = st.selectbox("Sort by", POST_TABLE_SORTS)
+                        descending = st.checkbox("Descending", True, key="posts_desc")
+                    with col3:
+                        page_size = st.selectbox("Rows per page", [25, 50, 100], key="posts_page_size")
+                start_date, end_date = (list(date_range) + [None, None])[:2]
+                paged_table(
+                    "posts",
+                    lambda page: get_posts_page(
+                        profile_option, start_date and start_date.isoformat(), end_date and end_date.isoformat(),
+                        post_types, sort_by, descending, page, page_size,
+                    ),
+                    page_size,
+                )
 
 
 # ─── CONTENT INSIGHTS ───────────────────────────────────────────────────────────
 elif page == "Content Insights":
+    from posting_time_model import get_posting_time_recommendation
+    from charts import CHART_BACKEND, chart_specs, render_chart
+    from analysis_jobs import enqueue as enqueue_analysis, get_job_status
+
     profile_urls = get_profile_urls()
     if not profile_urls:
         st.warning("No profiles found in the database.")
     else:
         profile_option = st.selectbox("Select a profile for insights", profile_urls, key="insights_profile")
-        posts_df = get_posts_by_profile_url(profile_option)
+        chart_backend = st.sidebar.radio(
+            "Chart style", ["matplotlib", "native"], index=0 if CHART_BACKEND == "matplotlib" else 1,
+            help="'native' sends chart data to the browser instead of rendered images",
+        )
 
         st.header("Content Insights & Trends")
 
-        if posts_df.empty:
-            st.warning("No posts data for this profile.")
+        # Analyses are computed by background jobs; this page only reads the stored result
+        job = get_job_status(profile_option)
+        waiting = st.session_state.setdefault("analysis_waiting", set())
+        if job and job["status"] in ("queued", "running"):
+            waiting.add(profile_option)
+        elif profile_option in waiting:
+            # The job this session was waiting for has finished: drop the cached (older) result
+            waiting.discard(profile_option)
+            invalidate(profile_option)
+
+        live_updates("analysis", profile_option, ["analysis"], "analyses")
+        analysis = get_profile_analysis(profile_option)
+        data_version = get_data_version(profile_option)
+        charts = chart_specs(analysis)
+
+        if job and job["status"] in ("queued", "running"):
+            st.info(f"⏳ Analysis {job['status']} since {job['requested_at']:%Y-%m-%d %H:%M:%S}"
+                    + ("; showing the previous result." if analysis else "."))
+            if st.button("Check again"):
+                st.rerun()
+        elif job and job["status"] == "failed":
+            st.error(f"Last analysis failed: {job.get('error')}")
+            if st.button("Retry analysis"):
+                enqueue_analysis(profile_option)
+                st.rerun()
+        elif not analysis and job is None:
+            enqueue_analysis(profile_option)
+            st.info("⏳ Analysis queued for this profile.")
+            if st.button("Check again"):
+                st.rerun()
+
+        if not analysis:
+            if job and job["status"] == "done":
+                st.warning("No posts data for this profile.")
         else:
             # ───────────────────────────── Engagement Analysis ─────────────────────────────
             st.subheader("📈 Engagement Analysis")
             col1, col2 = st.columns(2)
 
             with col1:
-                fig, ax = plt.subplots(figsize=(10, 6))
-                engagement_by_type = analyze_post_engagement(posts_df)
-                engagement_by_type.plot.bar(ax=ax)
-                ax.set(title="Average Engagement by Content Type", xlabel="Type", ylabel="Engagement")
-                st.pyplot(fig)
+                if "engagement_by_type" in charts:
+                    render_chart(col1, profile_option, data_version, "engagement_by_type",
+                                 charts["engagement_by_type"], chart_backend)
 
             with col2:
-                sentiment_counts = sentiment_analysis(posts_df)
                 st.write("Sentiment Breakdown:")
-                for sentiment, count in sentiment_counts.items():
-                    st.write(f"**{sentiment}**: {count}")
+                for sentiment, count in (analysis.get("sentiment_counts") or {}).items():
+                    st.write(f"**{sentiment}**: {count:.0f}")
 
             # ───────────────────────────── Posting Patterns ─────────────────────────────
             st.subheader("⏰ Posting Patterns")
-            engagement_by_hour, correlation = analyze_posting_patterns(posts_df)
-
-            fig, ax = plt.subplots(figsize=(10, 6))
-            engagement_by_hour.plot.line(marker='o', ax=ax)
-            ax.set(title="Posting Time vs Engagement", xlabel="Hour of Day", ylabel="Engagement")
-            ax.grid(True, linestyle='--', alpha=0.7)
-            st.pyplot(fig)
-
-            st.info(f"**Optimal posting time**: {get_optimal_posting_time(posts_df)}")
-            st.info(f"**Correlation between posting time and engagement**: {correlation:.2f}")
+            if "engagement_by_hour" in charts:
+                render_chart(st, profile_option, data_version, "engagement_by_hour",
+                             charts["engagement_by_hour"], chart_backend)
+
+            posting_time = get_posting_time_recommendation(profile_option)
+            if posting_time:
+                st.info(
+                    f"**Optimal posting time**: {posting_time['label']} "
+                    f"(expected engagement {posting_time['expected_engagement']:.0f}, "
+                    f"95% CI {posting_time['ci_low']:.0f}–{posting_time['ci_high']:.0f}, "
+                    f"based on {posting_time['n_posts']} posts)"
+                )
+            else:
+                st.info(f"**Optimal posting time**: {analysis.get('optimal_posting_time')}")
+            if analysis.get("posting_time_correlation") is not None:
+                st.info(f"**Correlation between posting time and engagement**: {analysis['posting_time_correlation']:.2f}")
 
             # ───────────────────────────── Content Length Analysis ─────────────────────────────
             st.subheader("📝 Content Length Analysis")
-            engagement_by_length, length_correlation = analyze_content_length(posts_df)
-
-            fig, ax = plt.subplots(figsize=(10, 6))
-            engagement_by_length.plot.bar(ax=ax)
-            ax.set(title="Content Length Category vs Engagement", xlabel="Length Category", ylabel="Engagement")
-            st.pyplot(fig)
+            if "engagement_by_length" in charts:
+                render_chart(st, profile_option, data_version, "engagement_by_length",
+                             charts["engagement_by_length"], chart_backend)
 
+            length_correlation = analysis.get("length_correlation") or {}
             if length_correlation.get('r_squared') is not None:
                 st.info(f"**Correlation (R²) between content length and engagement**: {length_correlation['r_squared']:.2f}")
             else:
@@ -155,52 +276,31 @@ elif page == "Content Insights":
 
             # ───────────────────────────── Hashtag Analysis ─────────────────────────────
             st.subheader("🔍 Hashtag Analysis")
-            top_hashtags, hashtag_engagement = analyze_hashtags(posts_df)
+            top_hashtags = analysis.get("top_hashtags") or {}
 
             if top_hashtags:
                 st.write("🔝 **Top 5 Hashtags by Usage**")
-                for hashtag, count in top_hashtags:
-                    st.markdown(f"- **#{hashtag}** — {count} uses")
+                for hashtag, count in top_hashtags.items():
+                    st.markdown(f"- **#{hashtag}** — {count:.0f} uses")
 
-                engagement_data = pd.DataFrame([
-                    {"Hashtag": f"#{hashtag}", "Avg. Engagement": round(engagement, 2)}
-                    for hashtag, engagement in hashtag_engagement.items()
-                ])
-                engagement_data = engagement_data.sort_values(by="Avg. Engagement", ascending=False).reset_index(drop=True)
+                engagement_data = charts["hashtag_engagement"]["data"].round(2)
+                engagement_data = engagement_data.rename_axis("Hashtag").reset_index()
 
                 st.write("📊 **Average Engagement by Hashtag**")
                 st.dataframe(engagement_data, use_container_width=True, hide_index=True)
 
-                fig, ax = plt.subplots(figsize=(10, 6))
-                engagement_data.plot.bar(x='Hashtag', y='Avg. Engagement', ax=ax, legend=False, color='#4c91f0')
-                ax.set_title("Hashtag Engagement", fontsize=14)
-                ax.set_ylabel("Average Engagement")
-                ax.set_xlabel("")
-                ax.grid(True, linestyle='--', alpha=0.5)
-                st.pyplot(fig)
+                render_chart(st, profile_option, data_version, "hashtag_engagement",
+                             charts["hashtag_engagement"], chart_backend)
             else:
                 st.warning("No hashtags found in the data.")
 
-            # ───────────────────────────── Background Save to MongoDB ─────────────────────────────
-            try:
-                analysis_data = {
-                "engagement_by_type": make_serializable(engagement_by_type.to_dict()),
-                "sentiment_counts": make_serializable(sentiment_counts),
-                "engagement_by_hour": make_serializable(engagement_by_hour.to_dict()),
-                "posting_time_correlation": make_serializable(correlation),
-                "optimal_posting_time": get_optimal_posting_time(posts_df),
-                "engagement_by_length": make_serializable(engagement_by_length.to_dict()),
-                "length_correlation": make_serializable(length_correlation),
-                "top_hashtags": make_serializable(dict(top_hashtags)),
-                "hashtag_engagement": make_serializable(hashtag_engagement),
-            }
-                save_analysis_result(profile_option, analysis_data)
-            except Exception as e:
-                st.warning(f"⚠️ Failed to save analysis to database: {e}")
-
 # ─── POST GENERATOR ─────────────────────────────────────────────────────────────
 elif page == "Post Generator":
     st.header("AI Post Generator")
+    from content_generator import generate_post, stream_post_variations, save_post_feedback
+    from generation_cache import get_cache_stats
+    from single_flight import get_single_flight_stats
+    from preference_store import get_preferences, DEFAULT_PREFERENCES
 
     # Profile selection dropdown
     profile_urls = get_profile_urls()  # Function to fetch profile URLs
@@ -213,22 +313,65 @@ elif page == "Post Generator":
     # Input for generating post
     topic = st.text_input("Enter a topic or theme for your post:")
 
+    # Defaults learned from this profile's feedback (shared by all sessions, cached per profile)
+    preferences = get_preferences(profile_option) if profile_option else DEFAULT_PREFERENCES
+    tones = ["Professional", "Conversational", "Inspirational", "Educational", "Promotional"]
     with st.expander("Advanced Options"):
-        tone = st.select_slider("Select tone:", ["Professional", "Conversational", "Inspirational", "Educational", "Promotional"])
+        if preferences.get("ratings"):
+            st.caption(f"Defaults learned from {preferences['ratings']} rated posts "
+                       f"(topics liked most: {', '.join(preferences['preferred_content_types'])})")
+        # Widget keys include the profile so switching profiles applies that profile's defaults
+        tone = st.select_slider("Select tone:", tones,
+                                value=preferences["preferred_tone"] if preferences["preferred_tone"] in tones else "Conversational",
+                                key=f"tone_{profile_option}")
         include_cta = st.checkbox("Include a call-to-action", True)
-        max_length = st.slider("Maximum post length", 100, 1000, 500)
-        include_hashtags = st.checkbox("Include hashtags", True)
+        max_length = st.slider("Maximum post length", 100, 1000, preferences.get("suggested_max_length", 500),
+                               key=f"max_length_{profile_option}")
+        include_hashtags = st.checkbox("Include hashtags", preferences["hashtag_preference"],
+                                       key=f"hashtags_{profile_option}")
         num_hashtags = st.slider("Number of hashtags", 1, 10, 3) if include_hashtags else 0
+        force_refresh = st.checkbox("Force fresh variations (skip generation cache)", False)
+        stream_output = st.checkbox("Show variations as they are generated", True)
 
     # Use Session State to track generated posts
     if "latest_posts" not in st.session_state:
         st.session_state.latest_posts = []
+        st.session_state.latest_posts_id = 0
 
     if st.button("Generate Post"):
         if not topic:
             st.warning("Please enter a topic.")
         elif not profile_option:
             st.warning("Please select a profile to post as.")
+        elif stream_output:
+            # Render each variation as soon as it is parsed from the stream; the
+            # preview is replaced by the regular list (with feedback forms) below
+            preview = st.empty()
+            posts = []
+            try:
+                with preview.container():
+                    st.caption("Generating posts…")
+                    for p in stream_post_variations(
+                        profile_url=profile_option,
+                        topic=topic,
+                        tone=tone,
+                        include_cta=include_cta,
+                        max_length=max_length,
+                        include_hashtags=include_hashtags,
+                        num_hashtags=num_hashtags,
+                        force_refresh=force_refresh
+                    ):
+                        posts.append(p)
+                        st.markdown(f"#### Variation {len(posts)}")
+                        st.markdown(p["content"].replace("\n", "<br>"), unsafe_allow_html=True)
+            except Exception as e:
+                st.error(f"Streaming generation failed: {e}")
+            preview.empty()
+            if not posts:
+                st.error("Failed to generate posts.")
+            else:
+                st.session_state.latest_posts = posts
+                st.session_state.latest_posts_id += 1
         else:
             with st.spinner("Generating posts…"):
                 posts = generate_post(
@@ -238,43 +381,57 @@ elif page == "Post Generator":
                     include_cta=include_cta,
                     max_length=max_length,
                     include_hashtags=include_hashtags,
-                    num_hashtags=num_hashtags
+                    num_hashtags=num_hashtags,
+                    force_refresh=force_refresh
                 )
                 if not posts:
                     st.error("Failed to generate posts.")
                 else:
                     st.session_state.latest_posts = posts
+                    st.session_state.latest_posts_id += 1
+
+    cache_stats = get_cache_stats()
+    st.sidebar.caption(
+        f"Generation cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"({cache_stats['hit_rate']:.0%} hit rate, {cache_stats['pregenerated_hits']} served pre-generated)"
+    )
+    generation_flight = get_single_flight_stats().get("generation")
+    if generation_flight:
+        st.sidebar.caption(f"Coalesced generation requests: {generation_flight['coalesced']} of {generation_flight['calls']}")
 
     # For each post variation allow independent feedback submission with session state
     if st.session_state.get("latest_posts"):
         st.subheader("Post Variations")
+        # Widget keys include the generation, so a new batch starts without submitted feedback
+        batch = st.session_state.latest_posts_id
         for i, p in enumerate(st.session_state.latest_posts):
             st.markdown(f"#### Variation {i+1}")
             st.markdown(p["content"].replace("\n", "<br>"), unsafe_allow_html=True)
 
-            form_key = f"feedback_form_{i}"
-            submitted_key = f"submitted_feedback_{i}"
+            form_key = f"feedback_form_{batch}_{i}"
+            submitted_key = f"submitted_feedback_{batch}_{i}"
 
             if submitted_key not in st.session_state:
                 st.session_state[submitted_key] = False
 
             # Allow feedback submission even if posts are regenerated
             with st.form(key=form_key):
-                textual_feedback = st.text_area("Provide your feedback:", key=f"textual_feedback_{i}")
+                textual_feedback = st.text_area("Provide your feedback:", key=f"textual_feedback_{batch}_{i}")
                 feedback_choice = st.radio(
                     "How do you feel about this post?",
-                    ["👍 Like", "👎 Dislike", "💾 Save"], key=f"radio_{i}"
+                    ["👍 Like", "👎 Dislike", "💾 Save"], key=f"radio_{batch}_{i}"
                 )
                 submit_btn = st.form_submit_button("Submit Feedback")
                 if submit_btn:
                     feedback_map = {
                         "👍 Like": "positive",
                         "👎 Dislike": "negative",
+                        "💾 Save": "saved",
                     }
 
                     # Save feedback to DB
                     try:
-                        update_feedback_preferences(
+                        failed = save_post_feedback(
                             post_content=p["content"],
                             feedback=feedback_map[feedback_choice],
                             profile_url=profile_option,
@@ -286,6 +443,8 @@ elif page == "Post Generator":
                         st.session_state[submitted_key] = True
                         st.success("✅ Feedback submitted & saved to database.")
                         st.info(f"Feedback: {feedback_map[feedback_choice]}\nText: {textual_feedback}")
+                        if failed:
+                            st.warning(f"⚠️ Some views may lag behind this feedback ({', '.join(failed)} not updated).")
                     except Exception as e:
                         st.error(f"❌ Failed to save feedback: {e}")
             # Show info about already submitted feedback
@@ -296,6 +455,7 @@ elif page == "Post Generator":
 # ─── FEEDBACK DASHBOARD ────────────────────────────────────────────────────────
 elif page == "Feedback Dashboard":
     st.header("Feedback Dashboard")
+    import matplotlib.pyplot as plt
     st.markdown("Track performance and analyze feedback trends from posts and user interactions.")
 
     # Select profile
@@ -305,32 +465,30 @@ elif page == "Feedback Dashboard":
     else:
         profile_option = st.selectbox("Select a profile to view feedback", profile_urls, key="feedback_profile")
 
-        feedback_df = get_feedback_by_profile_url(profile_option)
-        if feedback_df.empty:
+        live_updates("feedback", profile_option, ["feedback"], "feedback entries")
+        # Small per-day rollups maintained by save_feedback, not the raw feedback documents
+        summary = get_feedback_summary(profile_option)
+        if not summary["total"]:
             st.info("No feedback available for this profile.")
         else:
             # --- KPI Metrics ---
             st.subheader("Key Metrics")
-            total_feedback = len(feedback_df)
-            num_positive = (feedback_df['feedback'] == 'positive').sum()
-            num_negative = (feedback_df['feedback'] == 'negative').sum()
-            num_saved = (feedback_df['feedback'] == 'saved').sum() if 'saved' in feedback_df['feedback'].unique() else 0
+            feedback_counts = summary["counts"]
 
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("Total Feedback", total_feedback)
+                st.metric("Total Feedback", summary["total"])
             with col2:
-                st.metric("👍 Likes", num_positive)
+                st.metric("👍 Likes", int(feedback_counts.get('positive', 0)))
             with col3:
-                st.metric("👎 Dislikes", num_negative)
+                st.metric("👎 Dislikes", int(feedback_counts.get('negative', 0)))
             with col4:
-                st.metric("💾 Saved", num_saved)
+                st.metric("💾 Saved", int(feedback_counts.get('saved', 0)))
 
             # --- Feedback Trend Over Time ---
             st.subheader("Feedback Trend Over Time")
-            if 'timestamp' in feedback_df.columns:
-                feedback_df['date'] = pd.to_datetime(feedback_df['timestamp'], errors='coerce').dt.date
-                trend_df = feedback_df.groupby(['date', 'feedback']).size().unstack(fill_value=0)
+            trend_df = summary["trend"]
+            if not trend_df.empty:
                 fig, ax = plt.subplots(figsize=(10, 5))
                 trend_df.plot(kind="line", marker="o", ax=ax)
                 ax.set_xlabel("Date")
@@ -338,26 +496,26 @@ elif page == "Feedback Dashboard":
                 ax.set_title("Feedback Trend Over Time")
                 ax.grid(True, linestyle="--", alpha=0.7)
                 st.pyplot(fig)
+                plt.close(fig)
             else:
                 st.info("No feedback timestamp data available for trend analysis.")
 
             # --- Feedback Distribution Pie Chart ---
             st.subheader("Feedback Distribution")
-            feedback_counts = feedback_df['feedback'].value_counts()
             fig2, ax2 = plt.subplots()
             ax2.pie(feedback_counts, labels=feedback_counts.index, autopct="%1.1f%%", startangle=90, colors=["#4CAF50", "#F44336", "#2196F3"])
             ax2.axis("equal")
             st.pyplot(fig2)
+            plt.close(fig2)
 
             # --- Top Topics and Tone Effectiveness ---
             st.subheader("Top Topics & Tone Effectiveness")
-            if 'topic' in feedback_df.columns and 'feedback' in feedback_df.columns:
-                topic_feedback = feedback_df.groupby(['topic', 'feedback']).size().unstack(fill_value=0)
+            topic_feedback, tone_feedback = summary["topics"], summary["tones"]
+            if not topic_feedback.empty or not tone_feedback.empty:
                 if not topic_feedback.empty:
                     st.write("Feedback by Topic:")
                     st.dataframe(topic_feedback)
 
-                tone_feedback = feedback_df.groupby(['tone', 'feedback']).size().unstack(fill_value=0)
                 if not tone_feedback.empty:
                     st.write("Feedback by Tone:")
                     st.dataframe(tone_feedback)
@@ -366,14 +524,26 @@ elif page == "Feedback Dashboard":
 
             # --- Detailed Feedback Table ---
             st.subheader("Detailed Feedback Table")
-            display_cols = ['textual_feedback', 'feedback', 'topic', 'tone', 'timestamp']
-            available_cols = [col for col in display_cols if col in feedback_df.columns]
-            table_df = feedback_df[available_cols].copy()
-            # Only sort if 'timestamp' is available
-            if 'timestamp' in table_df.columns:
-                st.dataframe(table_df.sort_values(by='timestamp', ascending=False), use_container_width=True)
-            else:
-                st.dataframe(table_df, use_container_width=True)
+            with st.expander("Filter & sort"):
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    date_range = st.date_input("Date range", value=(), key="feedback_dates")
+                    feedback_values = st.multiselect("Feedback", get_distinct_values("feedback", "feedback", profile_option))
+                with col2:
+                    topic_filter = st.selectbox("Topic", ["All"] + get_distinct_values("feedback", "topic", profile_option))
+                    sort_by = st.selectbox("Sort by", FEEDBACK_TABLE_SORTS)
+                with col3:
+                    descending = st.checkbox("Descending", True, key="feedback_desc")
+                    page_size = st.selectbox("Rows per page", [25, 50, 100], key="feedback_page_size")
+            start_date, end_date = (list(date_range) + [None, None])[:2]
+            paged_table(
+                "feedback",
+                lambda page: get_feedback_page(
+                    profile_option, start_date, end_date, feedback_values,
+                    None if topic_filter == "All" else topic_filter, sort_by, descending, page, page_size,
+                ),
+                page_size,
+            )
 
 # Footer
 st.markdown("---")
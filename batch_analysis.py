@@ -0,0 +1,110 @@
+import argparse
+import os
+import time
+import concurrent.futures
+
+from data_analyzer import run_full_analysis
+from database import get_profile_urls, get_posts_by_profile_urls, save_analysis_results, get_latest_benchmarks
+from posting_time_model import fit_posting_time_model
+
+
+def analyze_profile(profile_url, posts_df):
+    """
+    Runs the full data_analyzer suite for one profile (executed in a worker process).
+
+    Returns:
+        tuple: (profile_url, analysis dict, seconds spent, error message or None)
+    """
+    start = time.perf_counter()
+    try:
+        analysis = run_full_analysis(posts_df)
+        return profile_url, analysis, time.perf_counter() - start, None
+    except Exception as e:
+        return profile_url, {}, time.perf_counter() - start, str(e)
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def run_batch_analysis(profile_urls=None, max_workers=None, batch_size=25):
+    """
+    Computes and stores analysis results for many profiles at once.
+
+    Posts are read in bulk, one query per batch of profiles, the analyses are
+    fanned out across a process pool sized to the cores and results are written
+    through save_analysis_results one batch at a time.
+
+    Args:
+        profile_urls (list, optional): Profiles to analyze (defaults to every stored profile)
+        max_workers (int, optional): Process pool size (defaults to the CPU count)
+        batch_size (int): Profiles per bulk read and per batched write
+
+    Returns:
+        dict: Per-profile timings in seconds ('error' is set for failed profiles)
+    """
+    profile_urls = profile_urls if profile_urls is not None else get_profile_urls()
+    workers = max_workers or os.cpu_count() or 1
+    benchmark_data = get_latest_benchmarks()
+    timings = {}
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        for batch in _chunks(list(profile_urls), batch_size):
+            posts_by_profile = get_posts_by_profile_urls(batch)
+            futures = [
+                executor.submit(analyze_profile, url, posts_by_profile[url])
+                for url in batch if url in posts_by_profile
+            ]
+            for url in batch:
+                if url not in posts_by_profile:
+                    timings[url] = {"seconds": 0.0, "error": "no posts"}
+
+            results = []
+            for future in concurrent.futures.as_completed(futures):
+                url, analysis, seconds, error = future.result()
+                timings[url] = {"seconds": seconds, "error": error}
+                if error:
+                    print(f"  ❌ {url}: analysis failed ({error})")
+                    continue
+                print(f"  ✅ {url}: {seconds:.2f}s")
+                results.append((url, analysis))
+
+            try:
+                save_analysis_results(results)
+            except Exception as e:
+                print(f"❌ Error saving analysis batch to MongoDB: {e}")
+
+            # Fold any newly scraped posts into the cached posting-time models
+            for url, _ in results:
+                try:
+                    fit_posting_time_model(url, benchmark_data=benchmark_data)
+                except Exception as e:
+                    print(f"  ⚠️ {url}: posting-time model refit failed ({e})")
+
+    return timings
+
+
+def print_timing_report(timings):
+    completed = {url: t for url, t in timings.items() if not t["error"]}
+    print("\n--- Batch Analysis Summary ---")
+    print(f"Profiles: {len(timings)} | Analyzed: {len(completed)} | Failed/skipped: {len(timings) - len(completed)}")
+    if completed:
+        seconds = sorted(t["seconds"] for t in completed.values())
+        print(f"Total CPU time: {sum(seconds):.2f}s | Slowest profile: {seconds[-1]:.2f}s")
+        for url, t in sorted(completed.items(), key=lambda item: item[1]["seconds"], reverse=True)[:10]:
+            print(f"  {t['seconds']:.2f}s  {url}")
+    print("-------------------------------\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute analysis results for all stored profiles")
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size (defaults to CPU count)")
+    parser.add_argument('--batch-size', type=int, default=25, help="Profiles per bulk read / batched write")
+    parser.add_argument('--profiles', nargs='*', default=None, help="Only analyze these profile URLs")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    timings = run_batch_analysis(args.profiles, max_workers=args.workers, batch_size=args.batch_size)
+    print_timing_report(timings)
+    print(f"Finished in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,180 @@
+import argparse
+import json
+import random
+import threading
+import time
+import concurrent.futures
+
+from content_generator import generate_post_variations
+from llm_client import LLMBackend, get_backend
+from prompt_context import get_contexts
+
+# Option names accepted per job, with generate_post's defaults
+DEFAULT_OPTIONS = {
+    "tone": "Conversational",
+    "include_cta": True,
+    "max_length": 500,
+    "include_hashtags": True,
+    "num_hashtags": 3,
+    "force_refresh": False,
+}
+
+# Exception class names that indicate a temporary failure worth retrying
+# (matched by name so the Gemini SDK's api_core exceptions need no import here)
+TRANSIENT_ERROR_NAMES = {
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError",
+    "TooManyRequests", "GatewayTimeout", "Aborted", "Unavailable",
+}
+
+
+class RateLimiter:
+    """Thread-safe token bucket: at most `rate` acquisitions per second, with bursts up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimitedBackend(LLMBackend):
+    """
+    Wraps a backend so every model call (first attempts, re-asks after unparseable output
+    and regenerations) takes a token first; cache hits and coalesced requests make no call
+    and take none.
+    """
+
+    def __init__(self, backend, rate_limiter):
+        self.backend = backend
+        self.rate_limiter = rate_limiter
+        self.name = backend.name    # same generation cache keys as the wrapped backend
+
+    def generate(self, prompt, model_name, generation_config):
+        self.rate_limiter.acquire()
+        return self.backend.generate(prompt, model_name, generation_config)
+
+    def generate_with_usage(self, prompt, model_name, generation_config):
+        self.rate_limiter.acquire()
+        return self.backend.generate_with_usage(prompt, model_name, generation_config)
+
+    def stream(self, prompt, model_name, generation_config):
+        self.rate_limiter.acquire()
+        yield from self.backend.stream(prompt, model_name, generation_config)
+
+
+def is_transient_error(error):
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def normalize_job(job):
+    """Accepts (profile_url, topic[, options]) tuples or dicts and returns a job dict."""
+    if isinstance(job, dict):
+        options = dict(DEFAULT_OPTIONS, **job.get("options", {}))
+        return {"profile_url": job["profile_url"], "topic": job["topic"], "options": options}
+    profile_url, topic, *rest = job
+    options = dict(DEFAULT_OPTIONS, **(rest[0] if rest else {}))
+    return {"profile_url": profile_url, "topic": topic, "options": options}
+
+
+def _run_job(job, context, backend, max_retries, base_delay):
+    start = time.perf_counter()
+    for attempt in range(1, max_retries + 2):
+        try:
+            posts = generate_post_variations(
+                job["profile_url"], job["topic"], context=context, backend=backend, **job["options"]
+            )
+            return {"job": job, "posts": posts, "error": None, "attempts": attempt,
+                    "seconds": time.perf_counter() - start}
+        except Exception as e:
+            if attempt > max_retries or not is_transient_error(e):
+                return {"job": job, "posts": [], "error": f"{type(e).__name__}: {e}", "attempts": attempt,
+                        "seconds": time.perf_counter() - start}
+            # Exponential backoff with full jitter
+            time.sleep(random.uniform(0, base_delay * 2 ** (attempt - 1)))
+
+
+def run_batch_generation(jobs, max_concurrency=8, rate_per_second=None, max_retries=3, base_delay=1.0):
+    """
+    Generates posts for many (profile_url, topic, options) jobs concurrently.
+
+    Prompt contexts for all profiles in the batch are prefetched with one bulk
+    query. Jobs run on a thread pool bounded by max_concurrency, and every LLM
+    call they make (re-asks and regenerations included, cache hits excluded) is
+    subject to an optional token-bucket rate limit; transient errors are retried
+    with exponential backoff.
+
+    Args:
+        jobs (iterable): (profile_url, topic[, options]) tuples or dicts with those keys
+        max_concurrency (int): Maximum in-flight generations
+        rate_per_second (float, optional): Maximum LLM calls started per second
+        max_retries (int): Retries per job on transient errors
+        base_delay (float): Initial backoff in seconds
+
+    Yields:
+        dict: One result per job as soon as it finishes, with 'job', 'posts',
+              'error', 'attempts' and 'seconds'
+    """
+    jobs = [normalize_job(job) for job in jobs]
+    if not jobs:
+        return
+
+    profile_urls = list({job["profile_url"] for job in jobs})
+    contexts = get_contexts(profile_urls)
+    backend = RateLimitedBackend(get_backend(), RateLimiter(rate_per_second)) if rate_per_second else None
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [
+            executor.submit(
+                _run_job, job, contexts[job["profile_url"]],
+                backend, max_retries, base_delay,
+            )
+            for job in jobs
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate posts for many profiles/topics concurrently")
+    parser.add_argument('jobs_file', type=str,
+                        help='JSON list of {"profile_url": ..., "topic": ..., "options": {...}} jobs')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=None, help="Max LLM calls per second")
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--output', type=str, default=None, help="Write results as JSON lines to this file")
+    args = parser.parse_args()
+
+    with open(args.jobs_file) as f:
+        batch_jobs = json.load(f)
+
+    out = open(args.output, 'w') if args.output else None
+    start = time.perf_counter()
+    failed = 0
+    for result in run_batch_generation(batch_jobs, args.concurrency, args.rate, args.retries):
+        job = result["job"]
+        if result["error"]:
+            failed += 1
+            print(f"  ❌ {job['profile_url']} / {job['topic']}: {result['error']}")
+        else:
+            print(f"  ✅ {job['profile_url']} / {job['topic']}: {len(result['posts'])} posts in {result['seconds']:.2f}s")
+        if out:
+            out.write(json.dumps(result, default=str) + "\n")
+            out.flush()
+    if out:
+        out.close()
+    print(f"Finished {len(batch_jobs)} jobs ({failed} failed) in {time.perf_counter() - start:.2f}s")
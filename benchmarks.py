@@ -0,0 +1,249 @@
+import argparse
+import os
+import re
+import concurrent.futures
+
+import numpy as np
+import pandas as pd
+
+from data_analyzer import get_post_hours
+from database import (
+    get_all_profiles,
+    get_posts_by_profile_urls,
+    save_benchmarks,
+    get_latest_benchmarks,
+    to_field_name,
+)
+
+PERCENTILES = [10, 25, 50, 75, 90]
+# Peer distributions are stored as this many evenly spaced quantiles (0th to 100th
+# percentile), so a benchmark document stays the same size however many profiles there are
+QUANTILE_POINTS = 101
+
+# Per-profile metrics that are benchmarked against every other profile.
+# Each one maps a key (content type, hour, hashtag) to that profile's mean engagement.
+KEYED_DIMENSIONS = ["engagement_by_type", "engagement_by_hour", "engagement_by_hashtag"]
+SCALAR_DIMENSIONS = ["avg_engagement", "engagement_per_1k_followers"]
+
+
+def _parse_count(value):
+    """
+    Parses a scraped connections/followers value ("1,234", "500+", 812) into a number.
+
+    Returns:
+        float: Parsed count, or NaN if it cannot be parsed
+    """
+    if value is None:
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r'[\d,]+', str(value))
+    if not match:
+        return np.nan
+    return float(match.group(0).replace(',', ''))
+
+
+def compute_profile_aggregates(profile_url, posts_df, followers=None):
+    """
+    Computes the partial aggregates for one profile that feed the corpus benchmarks.
+
+    Args:
+        profile_url (str): Profile the posts belong to
+        posts_df (pd.DataFrame): Posts for the profile
+        followers: Scraped follower count for the profile
+
+    Returns:
+        dict: Mean engagement keyed by type, hour and hashtag plus scalar metrics
+    """
+    aggregates = {"profile_url": profile_url}
+    for dimension in KEYED_DIMENSIONS:
+        aggregates[dimension] = {}
+
+    if posts_df.empty or 'engagement' not in posts_df.columns:
+        aggregates["avg_engagement"] = None
+        aggregates["engagement_per_1k_followers"] = None
+        return aggregates
+
+    engagement = pd.to_numeric(posts_df['engagement'], errors='coerce')
+    avg_engagement = engagement.mean()
+
+    if 'type' in posts_df.columns:
+        by_type = engagement.groupby(posts_df['type']).mean().dropna()
+        aggregates["engagement_by_type"] = {to_field_name(k): float(v) for k, v in by_type.items()}
+
+    if 'time' in posts_df.columns:
+        by_hour = engagement.groupby(get_post_hours(posts_df)).mean().dropna()
+        aggregates["engagement_by_hour"] = {str(int(k)): float(v) for k, v in by_hour.items()}
+
+    if 'hashtags_list' in posts_df.columns:
+        exploded = pd.DataFrame({
+            'hashtag': posts_df['hashtags_list'].apply(lambda x: x if isinstance(x, list) else []),
+            'engagement': engagement,
+        }).explode('hashtag').dropna(subset=['hashtag'])
+        by_hashtag = exploded.groupby('hashtag')['engagement'].mean().dropna()
+        aggregates["engagement_by_hashtag"] = {to_field_name(k): float(v) for k, v in by_hashtag.items()}
+
+    followers_count = _parse_count(followers)
+    aggregates["avg_engagement"] = None if pd.isna(avg_engagement) else float(avg_engagement)
+    if aggregates["avg_engagement"] is not None and followers_count and followers_count > 0:
+        aggregates["engagement_per_1k_followers"] = aggregates["avg_engagement"] / followers_count * 1000
+    else:
+        aggregates["engagement_per_1k_followers"] = None
+
+    return aggregates
+
+
+def _summarize(values):
+    """Percentiles plus a fixed grid of peer quantiles used for ranking a single profile later."""
+    values = np.asarray(values, dtype=float)
+    quantiles = np.percentile(values, np.linspace(0, 100, min(QUANTILE_POINTS, len(values))))
+    summary = {"n": int(len(values)), "quantiles": quantiles.tolist()}
+    for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f"p{p}"] = float(v)
+    return summary
+
+
+def merge_profile_aggregates(partials):
+    """
+    Reduces per-profile partial aggregates into percentile benchmarks.
+
+    Args:
+        partials (list): Output of compute_profile_aggregates for each profile
+
+    Returns:
+        dict: Benchmarks keyed by dimension (and by key for keyed dimensions)
+    """
+    collected = {dimension: {} for dimension in KEYED_DIMENSIONS}
+    scalars = {dimension: [] for dimension in SCALAR_DIMENSIONS}
+
+    for partial in partials:
+        for dimension in KEYED_DIMENSIONS:
+            for key, value in partial.get(dimension, {}).items():
+                collected[dimension].setdefault(key, []).append(value)
+        for dimension in SCALAR_DIMENSIONS:
+            if partial.get(dimension) is not None:
+                scalars[dimension].append(partial[dimension])
+
+    benchmarks = {
+        dimension: {key: _summarize(values) for key, values in keys.items()}
+        for dimension, keys in collected.items()
+    }
+    for dimension, values in scalars.items():
+        benchmarks[dimension] = _summarize(values) if values else {"n": 0, "quantiles": []}
+    return benchmarks
+
+
+def compute_benchmarks(max_workers=None, save=True):
+    """
+    Computes cross-profile benchmarks in one sweep over the whole database.
+
+    Profiles and posts are read with one bulk query each, per-profile partial
+    aggregates are computed in a process pool, and the merged result is stored
+    in the benchmarks collection.
+
+    Args:
+        max_workers (int, optional): Process pool size (defaults to the CPU count)
+        save (bool): Whether to persist the result
+
+    Returns:
+        dict: The computed benchmarks
+    """
+    profiles = {p["profile_url"]: p for p in get_all_profiles() if p.get("profile_url")}
+    posts_by_profile = get_posts_by_profile_urls(list(profiles))
+
+    args = [
+        (url, posts_by_profile.get(url, pd.DataFrame()), profiles[url].get("followers"))
+        for url in profiles
+    ]
+
+    if len(args) > 1:
+        workers = min(max_workers or os.cpu_count() or 1, len(args))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            partials = list(executor.map(compute_profile_aggregates, *zip(*args)))
+    else:
+        partials = [compute_profile_aggregates(*a) for a in args]
+
+    benchmark_data = {
+        "profiles_count": len(partials),
+        "percentiles": PERCENTILES,
+        "benchmarks": merge_profile_aggregates(partials),
+    }
+    if save:
+        save_benchmarks(benchmark_data)
+    return benchmark_data
+
+
+def _percentile_rank(quantiles, value):
+    """
+    Share of peers (0-100) at or below value, interpolated between the stored quantiles.
+    Also accepts the sorted peer values stored by older benchmark runs.
+    """
+    if not quantiles:
+        return None
+    quantiles = np.asarray(quantiles, dtype=float)
+    if value < quantiles[0]:
+        return 0.0
+    if value >= quantiles[-1]:
+        return 100.0
+    grid = np.linspace(0, 100, len(quantiles))
+    i = int(np.searchsorted(quantiles, value, side='right')) - 1
+    # quantiles[i] <= value < quantiles[i + 1]
+    return float(grid[i] + (value - quantiles[i]) / (quantiles[i + 1] - quantiles[i]) * (grid[i + 1] - grid[i]))
+
+
+def rank_profile_against_peers(profile_url, posts_df, followers=None, benchmark_data=None):
+    """
+    Ranks one profile's metrics against the stored cross-profile benchmarks.
+
+    Only the given profile's posts are aggregated; peers are read from the
+    precomputed benchmarks, so the corpus is never rescanned.
+
+    Args:
+        profile_url (str): Profile to rank
+        posts_df (pd.DataFrame): Posts for that profile
+        followers: Scraped follower count for the profile
+        benchmark_data (dict, optional): Benchmarks to use (defaults to the latest stored)
+
+    Returns:
+        dict: For each dimension, the profile's value, percentile rank and peer median
+    """
+    benchmark_data = benchmark_data or get_latest_benchmarks()
+    benchmarks = benchmark_data.get("benchmarks", {})
+    if not benchmarks:
+        return {}
+
+    aggregates = compute_profile_aggregates(profile_url, posts_df, followers)
+    ranking = {}
+
+    for dimension in KEYED_DIMENSIONS:
+        ranking[dimension] = {}
+        for key, value in aggregates[dimension].items():
+            peers = benchmarks.get(dimension, {}).get(key)
+            if not peers:
+                continue
+            ranking[dimension][key] = {
+                "value": value,
+                "percentile_rank": _percentile_rank(peers.get("quantiles", peers.get("values")), value),
+                "peer_median": peers.get("p50"),
+            }
+
+    for dimension in SCALAR_DIMENSIONS:
+        value = aggregates.get(dimension)
+        peers = benchmarks.get(dimension, {})
+        if value is None or not peers.get("quantiles", peers.get("values")):
+            continue
+        ranking[dimension] = {
+            "value": value,
+            "percentile_rank": _percentile_rank(peers.get("quantiles", peers.get("values")), value),
+            "peer_median": peers.get("p50"),
+        }
+
+    return ranking
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute cross-profile engagement benchmarks")
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size (defaults to CPU count)")
+    args = parser.parse_args()
+    result = compute_benchmarks(max_workers=args.workers)
+    print(f"✅ Benchmarks computed over {result['profiles_count']} profiles.")
@@ -0,0 +1,235 @@
+import argparse
+import datetime
+import os
+import threading
+import time
+from collections import deque
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+import data_cache
+import vector_index
+from database import (
+    POSTS_COLLECTION,
+    FEEDBACK_COLLECTION,
+    ANALYSIS_COLLECTION,
+    PROFILES_COLLECTION,
+    POST_TABLE_COLUMNS,
+    FEEDBACK_TABLE_COLUMNS,
+    find_inserted_since,
+    watch_collections,
+)
+
+# "change_stream" (replica sets), "polling" (standalone servers) or "auto" (change streams when available)
+CHANGE_FEED_BACKEND = os.environ.get("CHANGE_FEED_BACKEND", "auto")
+CHANGE_POLL_SECONDS = float(os.environ.get("CHANGE_POLL_SECONDS", 2))
+# Inserts from other processes may carry slightly older ObjectIds; the polling window overlaps by this much
+POLL_OVERLAP_SECONDS = 5
+POLL_PAGE_SIZE = 1000
+MAX_EVENTS_PER_PROFILE = 200
+
+# Watched collections and the fields of their documents forwarded to sessions as new rows
+WATCHED_FIELDS = {
+    POSTS_COLLECTION: POST_TABLE_COLUMNS,
+    FEEDBACK_COLLECTION: FEEDBACK_TABLE_COLUMNS,
+    ANALYSIS_COLLECTION: ["timestamp"],
+    PROFILES_COLLECTION: [],
+}
+
+
+class ChangeLog:
+    """
+    Recent changes per profile, numbered with a process-wide sequence so each
+    session can ask for what happened since the last sequence it saw.
+    """
+
+    def __init__(self, max_events=MAX_EVENTS_PER_PROFILE):
+        self.max_events = max_events
+        self.seq = 0
+        self.events = {}          # profile_url -> deque of event dicts
+        self.lock = threading.Lock()
+        self.stats = {"events": 0, "invalidations": 0}
+
+    def publish(self, collection, operation, documents):
+        """
+        Records changed documents and invalidates the cached reads of each affected profile
+        once, plus its in-memory vector index when posts or feedback changed.
+        """
+        touched = set()
+        with self.lock:
+            for doc in documents:
+                profile_url = doc.get("profile_url")
+                if not profile_url:
+                    continue
+                self.seq += 1
+                self.events.setdefault(profile_url, deque(maxlen=self.max_events)).append({
+                    "seq": self.seq,
+                    "collection": collection,
+                    "operation": operation,
+                    "profile_url": profile_url,
+                    "row": {field: doc.get(field) for field in WATCHED_FIELDS.get(collection, [])},
+                })
+                self.stats["events"] += 1
+                touched.add(profile_url)
+            self.stats["invalidations"] += len(touched)
+        for profile_url in touched:
+            data_cache.invalidate(profile_url)
+            if collection in (POSTS_COLLECTION, FEEDBACK_COLLECTION):
+                vector_index.invalidate(profile_url)
+
+    def since(self, profile_url, seq, collections=None):
+        """Events of a profile after sequence `seq` (optionally only some collections), and the latest sequence."""
+        with self.lock:
+            events = [
+                e for e in self.events.get(profile_url, ())
+                if e["seq"] > seq and (collections is None or e["collection"] in collections)
+            ]
+            return events, self.seq
+
+
+_log = ChangeLog()
+_watcher_thread = None
+_watcher_lock = threading.Lock()
+_backend_in_use = None
+
+
+def get_changes_since(profile_url, seq, collections=None):
+    """
+    Changes to a profile seen by this process's watcher.
+
+    Args:
+        profile_url (str): Profile to check
+        seq (int): Last sequence the caller has seen (latest_seq() when it started watching)
+        collections (iterable, optional): Only report changes to these collections
+
+    Returns:
+        tuple: (list of events with 'seq', 'collection', 'operation', 'profile_url' and 'row', latest sequence)
+    """
+    return _log.since(profile_url, seq, set(collections) if collections else None)
+
+
+def latest_seq():
+    with _log.lock:
+        return _log.seq
+
+
+def get_change_feed_stats():
+    with _log.lock:
+        return dict(_log.stats, seq=_log.seq, backend=_backend_in_use)
+
+
+def _projection(collection):
+    return {"profile_url": 1, **{field: 1 for field in WATCHED_FIELDS[collection]}}
+
+
+def poll_once(watermarks, seen):
+    """
+    One polling pass: publishes documents inserted since each collection's watermark,
+    paging forward by _id until a page comes back short, so a burst larger than
+    POLL_PAGE_SIZE is drained in one pass.
+
+    Polling only sees inserts: documents updated in place (a re-scraped post) are
+    reported by change streams only.
+
+    Args:
+        watermarks (dict): collection -> UTC datetime of the newest ObjectId seen (updated in place)
+        seen (dict): collection -> ids already published within the overlap window (updated in place)
+
+    Returns:
+        int: Number of new documents
+    """
+    found = 0
+    for collection in WATCHED_FIELDS:
+        since = watermarks[collection] - datetime.timedelta(seconds=POLL_OVERLAP_SECONDS)
+        after_id = None
+        while True:
+            page = find_inserted_since(collection, since, _projection(collection), POLL_PAGE_SIZE, after_id)
+            docs = [d for d in page if d["_id"] not in seen[collection]]
+            if docs:
+                found += len(docs)
+                _log.publish(collection, "insert", docs)
+                seen[collection].update(d["_id"] for d in docs)
+                watermarks[collection] = max(watermarks[collection], docs[-1]["_id"].generation_time)
+            if len(page) < POLL_PAGE_SIZE:
+                break
+            after_id = page[-1]["_id"]
+        # Forget ids that have left the overlap window
+        cutoff = watermarks[collection] - datetime.timedelta(seconds=POLL_OVERLAP_SECONDS)
+        seen[collection] = {i for i in seen[collection] if i.generation_time >= cutoff}
+    return found
+
+
+def run_polling(poll_interval=CHANGE_POLL_SECONDS):
+    """Polls forever, starting from now (existing documents are not replayed)."""
+    global _backend_in_use
+    _backend_in_use = "polling"
+    now = datetime.datetime.now(datetime.timezone.utc)
+    watermarks = {collection: now for collection in WATCHED_FIELDS}
+    seen = {collection: set() for collection in WATCHED_FIELDS}
+    while True:
+        try:
+            poll_once(watermarks, seen)
+        except PyMongoError as e:
+            print(f"⚠️ Change feed polling error: {e}")
+        time.sleep(poll_interval)
+
+
+def run_change_stream():
+    """Follows a change stream forever, resuming after transient errors. Raises OperationFailure if unsupported."""
+    global _backend_in_use
+    resume_token = None
+    while True:
+        try:
+            with watch_collections(WATCHED_FIELDS, resume_token) as stream:
+                _backend_in_use = "change_stream"
+                for change in stream:
+                    resume_token = stream.resume_token
+                    doc = change.get("fullDocument")
+                    if doc:
+                        _log.publish(change["ns"]["coll"], change["operationType"], [doc])
+        except OperationFailure:
+            if _backend_in_use is None:
+                raise    # change streams need a replica set
+            print("⚠️ Change stream interrupted, resuming")
+            time.sleep(CHANGE_POLL_SECONDS)
+        except PyMongoError as e:
+            print(f"⚠️ Change stream error: {e}")
+            time.sleep(CHANGE_POLL_SECONDS)
+
+
+def run_watcher(backend=None):
+    backend = backend or CHANGE_FEED_BACKEND
+    if backend in ("auto", "change_stream"):
+        try:
+            run_change_stream()
+        except OperationFailure as e:
+            if backend == "change_stream":
+                raise
+            print(f"⚠️ Change streams unavailable ({e.code}), polling every {CHANGE_POLL_SECONDS:g}s instead")
+    run_polling()
+
+
+def start_watcher():
+    """Starts one daemon watcher thread for this process (the app or the API server); later calls are no-ops."""
+    global _watcher_thread
+    with _watcher_lock:
+        if _watcher_thread is None or not _watcher_thread.is_alive():
+            _watcher_thread = threading.Thread(target=run_watcher, name="change-feed", daemon=True)
+            _watcher_thread.start()
+    return _watcher_thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print changes to posts, feedback, analyses and profiles as they happen")
+    parser.add_argument('--backend', choices=["auto", "change_stream", "polling"], default=CHANGE_FEED_BACKEND)
+    args = parser.parse_args()
+
+    threading.Thread(target=run_watcher, args=(args.backend,), daemon=True).start()
+    seen_seq = 0
+    while True:
+        time.sleep(CHANGE_POLL_SECONDS)
+        with _log.lock:
+            events = sorted((e for log in _log.events.values() for e in log if e["seq"] > seen_seq), key=lambda e: e["seq"])
+            seen_seq = _log.seq
+        for event in events:
+            print(f"[{_backend_in_use}] {event['operation']} {event['collection']}  {event['profile_url']}")
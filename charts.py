@@ -0,0 +1,118 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# "matplotlib" renders PNGs (cached per profile and data version); "native" ships the
+# chart data to the browser (Streamlit's Vega-Lite charts) instead of rasterized images
+CHART_BACKEND = os.environ.get("CHART_BACKEND", "matplotlib")
+CHART_CACHE_MAX_ENTRIES = int(os.environ.get("CHART_CACHE_MAX_ENTRIES", 200))
+FIGSIZE = (10, 6)
+DPI = 100
+
+_lock = threading.Lock()
+_rendered = OrderedDict()   # (profile_url, data_version, chart name) -> PNG bytes
+_stats = {"hits": 0, "renders": 0, "evictions": 0}
+
+
+def chart_specs(analysis):
+    """
+    Chart data for Content Insights, built from a stored analysis result.
+
+    Args:
+        analysis (dict): Output of data_analyzer.run_full_analysis
+
+    Returns:
+        dict: Chart name -> {'kind', 'data' (DataFrame indexed by x), 'title', 'xlabel', 'ylabel'};
+              charts without data are omitted
+    """
+    specs = {}
+    by_type = (analysis.get("engagement_by_type") or {}).get("mean") or {}
+    if by_type:
+        specs["engagement_by_type"] = {
+            "kind": "bar", "data": pd.DataFrame({"Engagement": by_type}),
+            "title": "Average Engagement by Content Type", "xlabel": "Type", "ylabel": "Engagement",
+        }
+    by_hour = analysis.get("engagement_by_hour") or {}
+    if by_hour:
+        hours = pd.Series({int(float(hour)): value for hour, value in by_hour.items()}).sort_index()
+        specs["engagement_by_hour"] = {
+            "kind": "line", "data": hours.rename("Engagement").to_frame(),
+            "title": "Posting Time vs Engagement", "xlabel": "Hour of Day", "ylabel": "Engagement",
+        }
+    by_length = analysis.get("engagement_by_length") or {}
+    if by_length:
+        specs["engagement_by_length"] = {
+            "kind": "bar", "data": pd.DataFrame({"Engagement": by_length}),
+            "title": "Content Length Category vs Engagement", "xlabel": "Length Category", "ylabel": "Engagement",
+        }
+    by_hashtag = analysis.get("hashtag_engagement") or {}
+    if by_hashtag:
+        data = pd.DataFrame({"Avg. Engagement": {f"#{tag}": value for tag, value in by_hashtag.items()}})
+        specs["hashtag_engagement"] = {
+            "kind": "bar", "data": data.sort_values("Avg. Engagement", ascending=False),
+            "title": "Hashtag Engagement", "xlabel": "", "ylabel": "Average Engagement",
+        }
+    return specs
+
+
+def _render_png(spec):
+    # A Figure created directly (not through pyplot) is never registered globally, so it is
+    # freed as soon as the PNG is written instead of accumulating across reruns
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=FIGSIZE, dpi=DPI)
+    ax = fig.subplots()
+    if spec["kind"] == "line":
+        spec["data"].plot.line(marker='o', ax=ax, legend=False)
+        ax.grid(True, linestyle='--', alpha=0.7)
+    else:
+        spec["data"].plot.bar(ax=ax, legend=False, color='#4c91f0')
+        ax.grid(True, linestyle='--', alpha=0.5, axis='y')
+    ax.set(title=spec["title"], xlabel=spec["xlabel"], ylabel=spec["ylabel"])
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    fig.clear()
+    return buffer.getvalue()
+
+
+def get_chart_png(profile_url, data_version, name, spec):
+    """Rendered PNG for a chart, from the in-process LRU cache while the profile's data is unchanged."""
+    key = (profile_url, data_version, name)
+    with _lock:
+        if key in _rendered:
+            _rendered.move_to_end(key)
+            _stats["hits"] += 1
+            return _rendered[key]
+    png = _render_png(spec)
+    with _lock:
+        _stats["renders"] += 1
+        _rendered[key] = png
+        while len(_rendered) > CHART_CACHE_MAX_ENTRIES:
+            _rendered.popitem(last=False)
+            _stats["evictions"] += 1
+    return png
+
+
+def render_chart(st, profile_url, data_version, name, spec, backend=None):
+    """
+    Draws one chart in Streamlit with the chosen backend.
+
+    Args:
+        st: The streamlit module (or a container such as a column)
+        backend (str, optional): 'matplotlib' or 'native' (defaults to CHART_BACKEND)
+    """
+    if (backend or CHART_BACKEND) == "native":
+        st.caption(spec["title"])
+        draw = st.line_chart if spec["kind"] == "line" else st.bar_chart
+        draw(spec["data"], x_label=spec["xlabel"] or None, y_label=spec["ylabel"])
+    else:
+        st.image(get_chart_png(profile_url, data_version, name, spec), use_container_width=True)
+
+
+def get_chart_cache_stats():
+    with _lock:
+        return dict(_stats, entries=len(_rendered))
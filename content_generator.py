@@ -1,124 +1,371 @@
-import json
-import random
 import pandas as pd
 from datetime import datetime
-import google.generativeai as genai
-from dotenv import load_dotenv  # To load environment variables
-import os
-from database import get_analysis_by_profile_url, save_feedback, get_feedback_by_profile_url
-
-# Load environment variables from .env
-load_dotenv()
-
-GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
-genai.configure(api_key=GOOGLE_API_KEY)
-
-# Global preferences based on user feedback
-user_preferences = {
-    'preferred_tone': 'Conversational',
-    'optimal_length': 'medium',
-    'preferred_content_types': ['professional development', 'industry trends'],
-    'hashtag_preference': True
+from database import save_feedback
+from prompt_context import get_context, feedback_context_items, format_feedback_insights
+from posting_time_model import get_posting_time_recommendation
+from trending import record_feedback_topic
+from dedup import index_feedback, is_similar_to_disliked, disliked_similarity
+import vector_index
+import generation_cache
+import data_cache
+import preference_store
+from llm_client import get_backend
+from output_parser import IncrementalPostParser, OutputParseError, parse_posts, validate_post
+from token_budget import ContextItem, pack_context, output_token_limit, record_usage
+from single_flight import get_group
+
+# The Gemini client is configured lazily on first use (see llm_client.py)
+
+MODEL_NAME = "gemini-1.5-pro"
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "top_k": 40,
+    "max_output_tokens": 1500,
 }
+NUM_VARIATIONS = 3
+
+# Analysis insights rank above any single feedback snippet when packing the prompt context
+INSIGHT_VALUE = 5.0
+# Few-shot examples are worth up to this much, scaled by their similarity to the topic
+EXAMPLE_VALUE = 6.0
+NUM_EXAMPLES = 2
+
+# How many times to regenerate when every variation repeats disliked content
+DUPLICATE_REGENERATION_ATTEMPTS = 1
+
+_generation_flight = get_group("generation")
+
 
-def generate_post(profile_url, topic, tone="Conversational", include_cta=True, max_length=500, include_hashtags=True, num_hashtags=3):
-    print("Here")
+def _reask_prompt(prompt, errors, missing):
+    """Asks only for the variations that failed validation, instead of regenerating all of them."""
+    problems = "\n".join(f"- {error}" for error in errors)
+    return f"""{prompt}
+
+    A previous answer to this request had these problems:
+    {problems}
+
+    Return only {missing} new variation(s) in the same JSON format. Only return valid JSON. No explanation.
+    """
+
+
+def _generate_validated(prompt, backend, config):
+    """
+    One generation call whose output is extracted, repaired and validated; when
+    variations fail validation, a single targeted re-ask requests only the missing ones.
+
+    Raises:
+        OutputParseError: If no valid variation could be obtained
+    """
+    response_text, usage = backend.generate_with_usage(prompt, MODEL_NAME, config)
+    record_usage(prompt, response_text, usage)
+    return _validate_response(prompt, response_text, backend, config)
+
+
+def _validate_response(prompt, response_text, backend, config):
+    """Parses a complete response and re-asks once for variations that are missing or invalid."""
     try:
-        # Get analysis and feedback for the profile
-        analysis = get_analysis_by_profile_url(profile_url)
-        feedback_df = get_feedback_by_profile_url(profile_url)
-
-        # Extract insights from analysis
-        insights = ""
-        if analysis:
-            if 'optimal_posting_time' in analysis:
-                insights += f"Optimal posting time: {analysis['optimal_posting_time']}. "
-            if 'top_hashtags' in analysis:
-                top_hashtags = ", ".join(analysis['top_hashtags'].keys())
-                insights += f"Top performing hashtags: {top_hashtags}. "
-
-        # Extract insights from feedback
-        feedback_insights = ""
-        if not feedback_df.empty:
-            positive_feedback = feedback_df[feedback_df["feedback"] == "positive"]
-            negative_feedback = feedback_df[feedback_df["feedback"] == "negative"]
-            neutral_feedback = feedback_df[feedback_df["feedback"] == "neutral"]
-
-            feedback_insights += f"\nUser prefers content like:\n"
-            for content in positive_feedback["content"].head(2):
-                feedback_insights += f"- {content[:150]}...\n"
-
-            if not negative_feedback.empty:
-                feedback_insights += "\nAvoid content like:\n"
-                for content in negative_feedback["content"].head(2):
-                    feedback_insights += f"- {content[:150]}...\n"
-
-            if feedback_df["textual_feedback"].notnull().any():
-                feedback_insights += "\nDirect user suggestions:\n"
-                for fb in feedback_df["textual_feedback"].dropna().unique()[:2]:
-                    feedback_insights += f"- {fb}\n"
-
-        # System prompt
-        system_instruction = "You are a LinkedIn content expert who creates engaging posts that drive high engagement."
-
-        # Final prompt
-        prompt = f"""
-        {system_instruction}
-        
-        Create 3 variations of a LinkedIn post about {topic}.
-        
-        Guidelines:
-        - Tone: {tone}
-        - Max length: {max_length} characters
-        - {include_cta and 'Include a call-to-action' or 'No call-to-action needed'}
-        - {include_hashtags and f'Include {num_hashtags} relevant hashtags' or 'No hashtags'}
-
-        Insights from LinkedIn analysis:
-        {insights}
-
-        Feedback-based content preferences:
-        {feedback_insights}
-
-        Ensure posts are professional, engaging, and follow best practices for LinkedIn.
-
-        Return output in this JSON format:
+        result = parse_posts(response_text)
+        posts, errors = result.posts, result.errors
+    except OutputParseError as e:
+        posts, errors = [], [str(e)]
+
+    missing = NUM_VARIATIONS - len(posts)
+    if errors and missing > 0:
+        print(f"Re-asking for {missing} variation(s): {'; '.join(errors)}")
+        reask = _reask_prompt(prompt, errors, missing)
+        response_text, usage = backend.generate_with_usage(reask, MODEL_NAME, config)
+        record_usage(reask, response_text, usage, label="reask")
+        try:
+            posts += parse_posts(response_text).posts[:missing]
+        except OutputParseError as e:
+            print(f"Re-ask failed: {e}")
+
+    if not posts:
+        raise OutputParseError("No valid post variations in model response")
+    return posts
+
+
+def build_prompt(profile_url, topic, tone="Conversational", include_cta=True, max_length=500, include_hashtags=True, num_hashtags=3,
+                 context=None):
+    """
+    Renders the full generation prompt from the profile's materialized prompt context.
+
+    Args:
+        context (dict, optional): Prefetched prompt context (read from the database if omitted)
+
+    Returns:
+        str: The prompt sent to the model (also the basis of the generation cache key)
+    """
+    # One small precomputed document instead of the full analysis and feedback history
+    if context is None:
+        context = get_context(profile_url)
+
+    # Candidate insights from analysis
+    items = []
+    posting_time = get_posting_time_recommendation(profile_url, fit_if_missing=False)
+    if posting_time:
+        items.append(ContextItem("insights", f"Optimal posting time: {posting_time['label']}. ", INSIGHT_VALUE))
+    elif context.get("optimal_posting_time"):
+        items.append(ContextItem("insights", f"Optimal posting time: {context['optimal_posting_time']}. ", INSIGHT_VALUE))
+    if context.get("top_hashtags"):
+        top_hashtags = ", ".join(context["top_hashtags"])
+        items.append(ContextItem("insights", f"Top performing hashtags: {top_hashtags}. ", INSIGHT_VALUE))
+
+    # Candidate insights from feedback, then keep the most valuable ones within the token budget
+    items += feedback_context_items(context)
+
+    # The profile's best posts closest to the topic, as few-shot examples
+    try:
+        retrieved = vector_index.retrieve_examples(profile_url, topic, k=NUM_EXAMPLES)
+    except Exception as e:
+        # Examples only improve the prompt; generate without them rather than fail
+        print(f"⚠️ Example retrieval failed for {profile_url}: {e}")
+        retrieved = []
+    for example in retrieved:
+        items.append(ContextItem("examples", f"- {example['content']}\n", EXAMPLE_VALUE * example["similarity"]))
+
+    selected = pack_context(items)
+    insights = "".join(item.text for item in selected if item.section == "insights")
+    examples = "".join(item.text for item in selected if item.section == "examples")
+    examples_section = ""
+    if examples:
+        examples_section = f"High-performing posts from this profile on similar topics (match their style, do not copy):\n{examples}"
+    feedback_insights = format_feedback_insights(context, selected)
+
+    # System prompt
+    system_instruction = "You are a LinkedIn content expert who creates engaging posts that drive high engagement."
+
+    # Final prompt
+    prompt = f"""
+    {system_instruction}
+    
+    Create {NUM_VARIATIONS} variations of a LinkedIn post about {topic}.
+    
+    Guidelines:
+    - Tone: {tone}
+    - Max length: {max_length} characters
+    - {include_cta and 'Include a call-to-action' or 'No call-to-action needed'}
+    - {include_hashtags and f'Include {num_hashtags} relevant hashtags' or 'No hashtags'}
+
+    Insights from LinkedIn analysis:
+    {insights}
+
+    Feedback-based content preferences:
+    {feedback_insights}
+    {examples_section}
+
+    Ensure posts are professional, engaging, and follow best practices for LinkedIn.
+
+    Return output in this JSON format:
+    {{
+      "posts": [
         {{
-          "posts": [
-            {{
-              "content": "Post content here",
-              "estimated_engagement": 0-100
-            }}
-          ]
+          "content": "Post content here",
+          "estimated_engagement": 0-100
         }}
+      ]
+    }}
 
-        Only return valid JSON. No explanation.
-        """
+    Only return valid JSON. No explanation.
+    """
+    return prompt
 
-        # Generate using Gemini
-        model = genai.GenerativeModel(
-            model_name="gemini-1.5-pro",
-            generation_config={
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "top_k": 40,
-                "max_output_tokens": 1500,
-            }
-        )
 
-        response = model.generate_content(prompt)
+def generate_post_variations(profile_url, topic, tone="Conversational", include_cta=True, max_length=500, include_hashtags=True,
+                             num_hashtags=3, force_refresh=False, context=None, pregenerate=False, backend=None):
+    """
+    Generates post variations, raising on model or parsing errors (generate_post
+    wraps this with fallback posts). Used directly by batch jobs that retry.
 
-        try:
-            result = json.loads(response.text)
-            return result["posts"]
-        except json.JSONDecodeError:
-            import re
-            json_pattern = r'({[\s\S]*})'
-            match = re.search(json_pattern, response.text)
-            if match:
-                result = json.loads(match.group(1))
-                return result["posts"]
-            else:
-                raise ValueError("Could not parse JSON from Gemini response")
+    Args:
+        pregenerate (bool): Only fill the cache ahead of a request: returns None without
+            calling the model if an entry already exists, and marks new entries as pre-generated.
+            It shares in-flight calls with identical interactive requests either way
+        backend (LLMBackend, optional): Backend for the model calls (get_backend() by default),
+            e.g. batch_generation's rate-limited wrapper
+
+    Returns:
+        list: Dicts with 'content' and 'estimated_engagement'
+    """
+    prompt = build_prompt(profile_url, topic, tone, include_cta, max_length, include_hashtags, num_hashtags,
+                          context=context)
+    backend = backend or get_backend()
+    config = dict(GENERATION_CONFIG, max_output_tokens=output_token_limit(max_length, NUM_VARIATIONS))
+
+    # Identical prompt + model config -> reuse the stored variations unless fresh ones are requested
+    cache_key = generation_cache.make_cache_key(prompt, f"{backend.name}:{MODEL_NAME}", config)
+    if pregenerate and generation_cache.contains(cache_key):
+        return None
+    # Concurrent identical requests (double-clicks, several dashboard users, pre-generation)
+    # share one model call
+    return _generation_flight.do(_flight_key(cache_key, force_refresh), _lookup_or_generate, profile_url, topic, tone, prompt, backend, config,
+                                 cache_key, force_refresh, pregenerate)
+
+
+def _flight_key(cache_key, force_refresh=False):
+    if force_refresh:
+        return ("refresh", cache_key)
+    return cache_key
+
+
+def _lookup_or_generate(profile_url, topic, tone, prompt, backend, config, cache_key, force_refresh, pregenerate):
+    if pregenerate:
+        # Filled since the caller checked: lookups here would count as interactive hits/misses
+        if generation_cache.contains(cache_key):
+            cached_posts = generation_cache.get(cache_key)
+            if cached_posts is not None:
+                return cached_posts
+    elif force_refresh:
+        generation_cache.record_bypass()
+    else:
+        cached_posts = generation_cache.get(cache_key)
+        if cached_posts is not None:
+            return cached_posts
+
+    posts, fresh = _generate_avoiding_disliked(profile_url, prompt, backend, config, DUPLICATE_REGENERATION_ATTEMPTS + 1)
+    if fresh:
+        generation_cache.put(cache_key, posts, {"profile_url": profile_url, "topic": topic, "tone": tone,
+                                                "pregenerated": pregenerate})
+    return posts
+
+
+def _generate_avoiding_disliked(profile_url, prompt, backend, config, attempts, rejected=None):
+    """
+    Generates variations, dropping those that near-duplicate disliked content and
+    regenerating when none survive.
+
+    Args:
+        attempts (int): Model calls to make at most
+        rejected (list, optional): Variations already rejected by the caller, offered in
+            the fallback together with the ones rejected here
+
+    Returns:
+        tuple: (posts, fresh). When every attempt resembled disliked content, posts are the
+            least similar distinct variations and fresh is False: offer them this once, but
+            never cache them
+    """
+    rejected = list(rejected or [])
+    for _ in range(attempts):
+        posts = _generate_validated(prompt, backend, config)
+        fresh_posts = [p for p in posts if not is_similar_to_disliked(profile_url, p["content"])]
+        if fresh_posts:
+            if len(fresh_posts) < len(posts):
+                print(f"Dropped {len(posts) - len(fresh_posts)} variation(s) similar to disliked content")
+            return fresh_posts, True
+        rejected.extend(posts)
+        print("All variations were similar to disliked content, regenerating")
+
+    print(f"⚠️ No variation avoided disliked content after {attempts} attempts")
+    # The model often repeats a variation across attempts: offer each text once
+    distinct = list({p["content"]: p for p in reversed(rejected)}.values())
+    distinct.sort(key=lambda p: disliked_similarity(profile_url, p["content"]))
+    return distinct[:NUM_VARIATIONS], False
+
+
+def _record_request(profile_url, topic, tone, include_cta, max_length, include_hashtags, num_hashtags):
+    generation_cache.record_request({
+        "profile_url": profile_url,
+        "topic": topic,
+        "tone": tone,
+        "options": {"include_cta": include_cta, "max_length": max_length,
+                    "include_hashtags": include_hashtags, "num_hashtags": num_hashtags},
+    })
+
+
+def stream_post_variations(profile_url, topic, tone="Conversational", include_cta=True, max_length=500, include_hashtags=True,
+                           num_hashtags=3, force_refresh=False):
+    """
+    Streaming variant of generate_post_variations: yields each variation as soon
+    as it has been parsed from the model's token stream. Cached results are
+    yielded immediately. Variations similar to disliked content are skipped; if the
+    whole stream resembled disliked content, the variations are regenerated (and
+    finally the least similar ones offered) as in generate_post_variations.
+
+    Yields:
+        dict: A post variation with 'content' and 'estimated_engagement'
+    """
+    _record_request(profile_url, topic, tone, include_cta, max_length, include_hashtags, num_hashtags)
+    prompt = build_prompt(profile_url, topic, tone, include_cta, max_length, include_hashtags, num_hashtags)
+    backend = get_backend()
+    config = dict(GENERATION_CONFIG, max_output_tokens=output_token_limit(max_length, NUM_VARIATIONS))
+
+    cache_key = generation_cache.make_cache_key(prompt, f"{backend.name}:{MODEL_NAME}", config)
+    # Coalesced with identical streaming and non-streaming requests: this stream leads the
+    # call, or it waits for the leader's variations and yields them
+    flight_key = _flight_key(cache_key, force_refresh)
+    leader, call = _generation_flight.try_lead(flight_key)
+    if not leader:
+        yield from _generation_flight.wait(call) or []
+        return
+
+    posts = []
+    error = RuntimeError("Generation stream was closed before it finished")
+    try:
+        if force_refresh:
+            generation_cache.record_bypass()
+        else:
+            cached_posts = generation_cache.get(cache_key)
+            if cached_posts is not None:
+                posts = cached_posts
+                error = None
+                yield from cached_posts
+                return
+
+        rejected = []
+        parser = IncrementalPostParser()
+        for chunk in backend.stream(prompt, MODEL_NAME, config):
+            for element in parser.feed(chunk):
+                post, _ = validate_post(element)
+                if post is None:
+                    continue
+                if is_similar_to_disliked(profile_url, post["content"]):
+                    rejected.append(post)
+                    continue
+                posts.append(post)
+                yield post
+        record_usage(prompt, parser.text, label="stream")
+
+        # Variations missing from the stream: parse the whole response, re-asking once if needed
+        if len(posts) < NUM_VARIATIONS:
+            streamed = {p["content"] for p in posts}
+            try:
+                completed = _validate_response(prompt, parser.text, backend, config)
+            except OutputParseError:
+                if not posts and not rejected:
+                    raise
+                completed = []
+            for post in completed:
+                if len(posts) >= NUM_VARIATIONS or post["content"] in streamed:
+                    continue
+                if is_similar_to_disliked(profile_url, post["content"]):
+                    rejected.append(post)
+                    continue
+                posts.append(post)
+                yield post
+
+        fresh = True
+        if not posts:
+            print("All streamed variations were similar to disliked content, regenerating")
+            posts, fresh = _generate_avoiding_disliked(profile_url, prompt, backend, config,
+                                                       DUPLICATE_REGENERATION_ATTEMPTS, rejected)
+            yield from posts
+
+        if posts and fresh:
+            generation_cache.put(cache_key, posts, {"profile_url": profile_url, "topic": topic, "tone": tone})
+        error = None
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        _generation_flight.complete(flight_key, call, posts, error)
+
+
+def generate_post(profile_url, topic, tone="Conversational", include_cta=True, max_length=500, include_hashtags=True, num_hashtags=3, force_refresh=False):
+    _record_request(profile_url, topic, tone, include_cta, max_length, include_hashtags, num_hashtags)
+    try:
+        return generate_post_variations(profile_url, topic, tone, include_cta, max_length, include_hashtags,
+                                        num_hashtags, force_refresh)
 
     except Exception as e:
         print(f"Error generating posts: {str(e)}")
@@ -128,7 +375,7 @@ def generate_post(profile_url, topic, tone="Conversational", include_cta=True, m
         ]
 
 
-def update_feedback_preferences(
+def save_post_feedback(
     post_content,
     feedback,
     profile_url,
@@ -138,44 +385,71 @@ def update_feedback_preferences(
     scheduled_time=None,
 ):
     """
-    Save feedback for a generated post to the database.
-    
+    Save feedback for a generated post to the database and update everything derived from it.
+
     Args:
         post_content (str): The content of the post.
-        feedback (str): 'positive', 'negative', or 'neutral'.
+        feedback (str): 'positive', 'negative', 'saved' or 'neutral'.
         profile_url (str): The profile for which this feedback relates.
         textual_feedback (str, optional): Free-form user feedback.
         topic (str, optional): Topic of the post.
         tone (str, optional): Tone of the post.
         scheduled_time (str or datetime, optional): If this post is scheduled in the future.
+
+    Returns:
+        list: Names of the derived updates (caches, preferences, trending, indexes) that
+            failed; the feedback itself is saved and they catch up on their own
+
+    Raises:
+        PyMongoError: If the feedback could not be written
     """
-    try:
-        # fallback timestamps for required fields
-        now = datetime.now()
-        feedback_doc = {
-            "profile_url": profile_url,
-            "content": post_content,
-            "feedback": feedback,
-            "textual_feedback": textual_feedback,
-            "generation_time": now,
-            "topic": topic,
-            "tone": tone,
-        }
-        
-        if scheduled_time:
-            # Accept string, datetime, or pandas Timestamp
-            if isinstance(scheduled_time, str):
-                try:
-                    feedback_doc["scheduled_time"] = pd.to_datetime(scheduled_time)
-                except Exception:
-                    feedback_doc["scheduled_time"] = now
-            else:
-                feedback_doc["scheduled_time"] = scheduled_time
+    # fallback timestamps for required fields
+    now = datetime.now()
+    feedback_doc = {
+        "profile_url": profile_url,
+        "content": post_content,
+        "feedback": feedback,
+        "textual_feedback": textual_feedback,
+        "generation_time": now,
+        "topic": topic,
+        "tone": tone,
+    }
+
+    if scheduled_time:
+        # Accept string, datetime, or pandas Timestamp
+        if isinstance(scheduled_time, str):
+            try:
+                feedback_doc["scheduled_time"] = pd.to_datetime(scheduled_time)
+            except Exception:
+                feedback_doc["scheduled_time"] = now
         else:
-            feedback_doc["scheduled_time"] = now
+            feedback_doc["scheduled_time"] = scheduled_time
+    else:
+        feedback_doc["scheduled_time"] = now
+
+    save_feedback(feedback_doc)
+    # Only the insert above may raise: a client retrying after a derived update failed
+    # would store the feedback twice
+    failed = []
+    for name, update in (
+        ("data_cache", lambda: data_cache.invalidate(profile_url)),
+        ("preferences", lambda: preference_store.record_feedback(feedback_doc)),
+        ("trending", lambda: record_feedback_topic(feedback_doc)),
+        ("dedup", lambda: index_feedback(feedback_doc)),
+        ("vector_index", lambda: vector_index.index_feedback(feedback_doc)),
+    ):
+        try:
+            update()
+        except Exception as e:
+            print(f"⚠️ Feedback saved but its {name} update failed: {e}")
+            failed.append(name)
+    return failed
 
-        save_feedback(feedback_doc)
-        
+
+def update_feedback_preferences(*args, **kwargs):
+    """save_post_feedback that reports failures instead of raising (for callers without error handling)."""
+    try:
+        save_post_feedback(*args, **kwargs)
     except Exception as e:
         print(f"❌ Failed to insert feedback into MongoDB: {e}")
 
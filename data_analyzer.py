@@ -1,9 +1,7 @@
 import pandas as pd
 import numpy as np
 from collections import Counter
-import matplotlib.pyplot as plt
-from scipy.stats import linregress
-from textblob import TextBlob
+from utils import make_serializable
 
 # Engagement analysis: Mean and variance of engagement by content type
 def analyze_post_engagement(posts_df):
@@ -17,6 +15,7 @@ def analyze_post_engagement(posts_df):
 def sentiment_analysis(posts_df):
     if posts_df.empty or 'content' not in posts_df.columns:
         return {}
+    from textblob import TextBlob  # imported on first use: slow to load and only needed here
 
     sentiments = []
     for post in posts_df['content']:
@@ -32,15 +31,19 @@ def sentiment_analysis(posts_df):
     sentiment_counts = posts_df['sentiment'].value_counts()
     return sentiment_counts
 
+# Hour of day of each post, parsed from the scraped 'HH:MM' time (does not modify posts_df)
+def get_post_hours(posts_df):
+    return pd.to_numeric(posts_df['time'].astype(str).str.split(':').str[0], errors='coerce')
+
 # Posting patterns: Average engagement by posting time and correlation coefficient
 def analyze_posting_patterns(posts_df):
     if posts_df.empty or 'time' not in posts_df.columns:
         return pd.Series()
 
-    posts_df['hour'] = posts_df['time'].apply(lambda x: int(x.split(':')[0]))
+    hours = get_post_hours(posts_df)
 
-    engagement_by_hour = posts_df.groupby('hour')['engagement'].mean()
-    correlation = np.corrcoef(posts_df['hour'], posts_df['engagement'])[0][1]
+    engagement_by_hour = posts_df['engagement'].groupby(hours.rename('hour')).mean()
+    correlation = np.corrcoef(hours, posts_df['engagement'])[0][1]
 
     return engagement_by_hour, correlation
 
@@ -58,6 +61,7 @@ def analyze_content_length(posts_df):
     posts_df['length_type_numeric'] = posts_df['content_length_type'].map(length_type_map)
 
     if posts_df['length_type_numeric'].nunique() > 1:
+        from scipy.stats import linregress  # imported on first use: scipy is slow to load
         slope, intercept, r_value, p_value, std_err = linregress(posts_df['length_type_numeric'], posts_df['engagement'])
         correlation = {
             'slope': slope,
@@ -119,10 +123,37 @@ def analyze_hashtags(posts_df):
     return hashtag_counts.most_common(5), hashtag_engagement
 
 # Optimal posting time based on engagement (with a correlation coefficient)
+# (see posting_time_model.py for the smoothed hour x weekday model used by the app)
 def get_optimal_posting_time(posts_df):
-    if posts_df.empty or 'hour' not in posts_df.columns:
+    if posts_df.empty or ('hour' not in posts_df.columns and 'time' not in posts_df.columns):
+        return None
+
+    hours = posts_df['hour'] if 'hour' in posts_df.columns else get_post_hours(posts_df)
+    avg_engagement_by_hour = posts_df['engagement'].groupby(hours).mean()
+    if avg_engagement_by_hour.empty:
         return None
+    optimal_hour = int(avg_engagement_by_hour.idxmax())
+    return f"{optimal_hour}:00"
 
-    avg_engagement_by_hour = posts_df.groupby('hour')['engagement'].mean()
-    optimal_hour = avg_engagement_by_hour.idxmax()
-    return f"{optimal_hour}:00" 
\ No newline at end of file
+# Full analysis suite for one profile, in the serializable form stored by save_analysis_result
+def run_full_analysis(posts_df):
+    if posts_df.empty:
+        return {}
+
+    engagement_by_type = analyze_post_engagement(posts_df)
+    sentiment_counts = sentiment_analysis(posts_df)
+    engagement_by_hour, correlation = analyze_posting_patterns(posts_df)
+    engagement_by_length, length_correlation = analyze_content_length(posts_df)
+    top_hashtags, hashtag_engagement = analyze_hashtags(posts_df)
+
+    return {
+        "engagement_by_type": make_serializable(engagement_by_type.to_dict()),
+        "sentiment_counts": make_serializable(dict(sentiment_counts)),
+        "engagement_by_hour": make_serializable(engagement_by_hour.to_dict()),
+        "posting_time_correlation": make_serializable(correlation),
+        "optimal_posting_time": get_optimal_posting_time(posts_df),
+        "engagement_by_length": make_serializable(engagement_by_length.to_dict()),
+        "length_correlation": make_serializable(length_correlation),
+        "top_hashtags": make_serializable(dict(top_hashtags)),
+        "hashtag_engagement": make_serializable(hashtag_engagement),
+    }
@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+import database
+from single_flight import get_group
+
+# How long a cached read may be served without seeing the latest writes from other processes
+DATA_CACHE_TTL_SECONDS = int(os.environ.get("DATA_CACHE_TTL_SECONDS", 60))
+# Least recently used entries are evicted beyond this (each page/filter combination is an entry)
+DATA_CACHE_MAX_ENTRIES = int(os.environ.get("DATA_CACHE_MAX_ENTRIES", 5000))
+
+ALL_PROFILES = "*"   # scope of reads that span every profile (e.g. the profile list)
+
+_lock = threading.Lock()
+_entries = OrderedDict()   # (name, scope, args) -> (version, expires_at, value), least recently used first
+_versions = {}       # scope -> data version, bumped by invalidate()
+_stats = {"hits": 0, "misses": 0, "expired": 0, "stale": 0, "invalidations": 0, "evictions": 0}
+_load_flight = get_group("data_cache")
+_MISS = object()
+_table_indexes_ready = False
+
+
+def _version(scope):
+    return _versions.get(scope, 0)
+
+
+def get_data_version(scope):
+    """Current data version of a profile (or ALL_PROFILES); changes whenever it is invalidated."""
+    with _lock:
+        return _version(scope)
+
+
+def cached_read(name, scope, loader, *args, ttl_seconds=None):
+    """
+    Returns loader(*args), served from the process-wide cache while the entry is
+    younger than the TTL and its scope's data version has not changed.
+
+    Args:
+        name (str): Name of the read (part of the cache key)
+        scope (str): Profile URL whose writes invalidate this read, or ALL_PROFILES
+        loader (callable): Database read to run on a miss
+        ttl_seconds (int, optional): Defaults to DATA_CACHE_TTL_SECONDS
+
+    Returns:
+        The loaded value; DataFrames (also inside tuples and dicts) are returned as copies so callers may modify them
+    """
+    key = (name, scope, args)
+    now = time.monotonic()
+    with _lock:
+        version = _version(scope)
+        entry = _entries.get(key)
+        if entry is not None and entry[0] == version and entry[1] > now:
+            _stats["hits"] += 1
+            _entries.move_to_end(key)
+            value = entry[2]
+        else:
+            if entry is None:
+                _stats["misses"] += 1
+            elif entry[0] != version:
+                _stats["stale"] += 1
+            else:
+                _stats["expired"] += 1
+            value = _MISS
+
+    if value is _MISS:
+        # Sessions rerunning the same page at once share one database read
+        value = _load_flight.do((key, version), loader, *args)
+        with _lock:
+            # Keep it only if no write invalidated the scope while loading
+            if _version(scope) == version:
+                _entries[key] = (version, now + (ttl_seconds or DATA_CACHE_TTL_SECONDS), value)
+                _entries.move_to_end(key)
+                while len(_entries) > DATA_CACHE_MAX_ENTRIES:
+                    _entries.popitem(last=False)
+                    _stats["evictions"] += 1
+
+    return _copy(value)
+
+
+def _copy(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(_copy(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    return value
+
+
+def invalidate(profile_url=None):
+    """
+    Drops cached reads after a write: those of one profile plus the cross-profile
+    reads (a scrape may add a profile), or everything if profile_url is None.
+    """
+    with _lock:
+        _stats["invalidations"] += 1
+        scopes = [profile_url, ALL_PROFILES] if profile_url else {scope for _, scope, _ in _entries} | {ALL_PROFILES}
+        for scope in scopes:
+            _versions[scope] = _version(scope) + 1
+        for key in [k for k in _entries if k[1] in scopes]:
+            del _entries[key]
+
+
+def get_data_cache_stats():
+    """Hits, misses (cold, expired, invalidated), invalidations, evictions and current entries, with the hit rate."""
+    with _lock:
+        stats = dict(_stats, entries=len(_entries))
+    lookups = stats["hits"] + stats["misses"] + stats["expired"] + stats["stale"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Cached versions of the reads the app repeats on every rerun
+
+def get_profile_urls():
+    return cached_read("profile_urls", ALL_PROFILES, database.get_profile_urls)
+
+
+def get_profile_data_by_url(profile_url):
+    return cached_read("profile", profile_url, database.get_profile_data_by_url, profile_url)
+
+
+def get_posts_by_profile_url(profile_url):
+    return cached_read("posts", profile_url, database.get_posts_by_profile_url, profile_url)
+
+
+def get_feedback_by_profile_url(profile_url):
+    return cached_read("feedback", profile_url, database.get_feedback_by_profile_url, profile_url)
+
+
+def get_profile_analysis(profile_url):
+    """Latest stored analysis of a profile (computed by the background jobs in analysis_jobs.py)."""
+    return cached_read("analysis", profile_url, database.get_analysis_by_profile_url, profile_url)
+
+
+def get_feedback_summary(profile_url):
+    """Feedback Dashboard metrics from the per-day rollups (see feedback_rollups.py)."""
+    from feedback_rollups import get_feedback_summary as load_summary
+    return cached_read("feedback_summary", profile_url, load_summary, profile_url)
+
+
+def _ensure_table_indexes():
+    global _table_indexes_ready
+    if not _table_indexes_ready:
+        database.ensure_table_indexes()
+        _table_indexes_ready = True
+
+
+def get_posts_page(profile_url, start_date=None, end_date=None, types=(), sort_by="date", descending=True,
+                   page=1, page_size=25):
+    """Cached database.get_posts_page; each filter/sort/page combination is its own entry."""
+    _ensure_table_indexes()
+    return cached_read("posts_page", profile_url, database.get_posts_page, profile_url, start_date, end_date,
+                       tuple(types), sort_by, descending, page, page_size)
+
+
+def get_feedback_page(profile_url, start_date=None, end_date=None, feedback_values=(), topic=None,
+                      sort_by="timestamp", descending=True, page=1, page_size=25):
+    """Cached database.get_feedback_page; each filter/sort/page combination is its own entry."""
+    _ensure_table_indexes()
+    return cached_read("feedback_page", profile_url, database.get_feedback_page, profile_url, start_date, end_date,
+                       tuple(feedback_values), topic, sort_by, descending, page, page_size)
+
+
+def get_distinct_values(collection, field, profile_url):
+    return cached_read(f"distinct:{collection}.{field}", profile_url, database.get_distinct_values,
+                       collection, field, profile_url)
@@ -1,31 +1,96 @@
 import os
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
 import pandas as pd
 from dotenv import load_dotenv
 import datetime
+import threading
 
 # Load environment variables from .env file
 load_dotenv()
 
 # MongoDB connection string
 MONGO_URI = os.getenv("MONGO_URI")
+# Connections shared by all threads of a process (the app's sessions, api_server.py's workers)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
 
-# MongoDB Client Initialization
-client = MongoClient(MONGO_URI)
-db = client["linkedin_data"]  # The database
+# MongoDB Client Initialization, deferred until the first query so importing this
+# module (e.g. for a page that never touches Mongo) does not create a client
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(MONGO_URI, maxPoolSize=MONGO_MAX_POOL_SIZE)
+    return _client
+
+
+class _LazyDatabase:
+    """Stands in for the pymongo Database and creates the client on first access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._database = None
+
+    def _resolve(self):
+        if self._database is None:
+            self._database = get_client()[self._name]
+        return self._database
+
+    def __getitem__(self, collection_name):
+        return self._resolve()[collection_name]
+
+    def __getattr__(self, attribute):
+        return getattr(self._resolve(), attribute)
+
+
+DB_NAME = "linkedin_data"
+db = _LazyDatabase(DB_NAME)  # The database
 
 # Collection names
 PROFILES_COLLECTION = "profiles"
 POSTS_COLLECTION = "posts"
 ANALYSIS_COLLECTION = "analysis"
 FEEDBACK_COLLECTION = "feedback"
+BENCHMARKS_COLLECTION = "benchmarks"
+POSTING_TIME_MODELS_COLLECTION = "posting_time_models"
+TRENDING_COLLECTION = "trending_sketches"
+NEAR_DUPLICATE_COLLECTION = "near_duplicate_index"
+GENERATION_CACHE_COLLECTION = "generation_cache"
+GENERATION_REQUESTS_COLLECTION = "generation_requests"
+PROMPT_CONTEXT_COLLECTION = "prompt_context"
+EMBEDDINGS_COLLECTION = "content_embeddings"
+ANALYSIS_JOBS_COLLECTION = "analysis_jobs"
+FEEDBACK_ROLLUPS_COLLECTION = "feedback_rollups"
+USER_PREFERENCES_COLLECTION = "user_preferences"
+
+# Materialized prompt context limits (see prompt_context.py)
+PROMPT_CONTEXT_SNIPPETS = 5       # most recent liked/disliked snippets kept per profile
+PROMPT_CONTEXT_SUGGESTIONS = 10   # most recent distinct textual suggestions kept per profile
+PROMPT_CONTEXT_SNIPPET_CHARS = 150
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Data values (topics, tones, hashtags, content types) used as field names. MongoDB does
+# not allow "." or a leading "$" there, so both become their full-width forms, which read
+# the same and map back exactly.
+def to_field_name(value):
+    return str(value).replace(".", "\uff0e").replace("$", "\uff04")
+
+
+def from_field_name(name):
+    return name.replace("\uff0e", ".").replace("\uff04", "$")
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Initialize the database (useful to check connection and collections)
 def initialize_database():
     try:
         # Testing the connection by listing collections
-        client.admin.command('ping')
+        get_client().admin.command('ping')
     except Exception as e:
         print(f"Error connecting to MongoDB: {e}")
 
@@ -60,6 +125,46 @@ def get_posts_by_profile_url(profile_url: str):
         return pd.DataFrame() 
     return pd.DataFrame(posts)
 
+# ────────────────────────────────────────────────────────────────────────────────
+# Get every stored profile document in a single read
+def get_all_profiles():
+    return list(db[PROFILES_COLLECTION].find({}, {"_id": 0}))
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Get posts for many profiles with one query, grouped by profile URL
+def get_posts_by_profile_urls(profile_urls=None):
+    query = {} if profile_urls is None else {"profile_url": {"$in": list(profile_urls)}}
+    posts = list(db[POSTS_COLLECTION].find(query, {"_id": 0}))
+    if not posts:
+        return {}
+    posts_df = pd.DataFrame(posts)
+    return {
+        profile_url: group.reset_index(drop=True)
+        for profile_url, group in posts_df.groupby("profile_url", sort=False)
+    }
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Get posts of a profile inserted after an ObjectId watermark (all posts if None)
+def get_posts_inserted_after(profile_url: str, after_id=None):
+    query = {"profile_url": profile_url, **({"_id": {"$gt": after_id}} if after_id else {})}
+    posts = list(db[POSTS_COLLECTION].find(query))
+    if not posts:
+        return pd.DataFrame()
+    return pd.DataFrame(posts)
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Stream documents from a collection without loading them all into memory
+def stream_collection(collection: str, query=None, projection=None, batch_size=1000):
+    projection = projection or {"_id": 0}
+    return db[collection].find(query or {}, projection, batch_size=batch_size)
+
+
+def stream_inserted_between(collection: str, after_id=None, before_id=None, batch_size=1000):
+    """Streams documents with after_id < _id < before_id in _id (insertion) order."""
+    id_range = {**({"$gt": after_id} if after_id else {}), **({"$lt": before_id} if before_id else {})}
+    query = {"_id": id_range} if id_range else {}
+    return db[collection].find(query, batch_size=batch_size).sort("_id", 1)
+
 
 def save_analysis_result(profile_url: str, analysis_data: dict):
     doc = {
@@ -68,19 +173,49 @@ def save_analysis_result(profile_url: str, analysis_data: dict):
         "timestamp": pd.Timestamp.now()
     }
     db["analysis"].insert_one(doc)
+    update_prompt_context_for_analysis(profile_url, analysis_data)
+
+
+def save_analysis_results(results):
+    """Batch variant of save_analysis_result for (profile_url, analysis_data) pairs."""
+    now = pd.Timestamp.now()
+    docs = [
+        {"profile_url": profile_url, "analysis": analysis_data, "timestamp": now}
+        for profile_url, analysis_data in results
+    ]
+    if docs:
+        db[ANALYSIS_COLLECTION].insert_many(docs, ordered=False)
+    for profile_url, analysis_data in results:
+        update_prompt_context_for_analysis(profile_url, analysis_data)
 
 
 def get_analysis_by_profile_url(profile_url):
-    profile_data = db[ANALYSIS_COLLECTION].find_one({"profile_url": profile_url})
+    # Analyses are appended over time, so always read the most recent one
+    profile_data = db[ANALYSIS_COLLECTION].find_one({"profile_url": profile_url}, sort=[("timestamp", -1)])
     if profile_data:
         return profile_data.get('analysis', {})
     return {}
 
+def get_analyses_by_profile_urls(profile_urls):
+    """Latest analysis for each of many profiles in one aggregation."""
+    pipeline = [
+        {"$match": {"profile_url": {"$in": list(profile_urls)}}},
+        {"$sort": {"timestamp": -1}},
+        {"$group": {"_id": "$profile_url", "analysis": {"$first": "$analysis"}}},
+    ]
+    return {doc["_id"]: doc.get("analysis") or {} for doc in db[ANALYSIS_COLLECTION].aggregate(pipeline)}
+
 def save_feedback(data):
     # Always set a timestamp if not present, so analytics/plots always have it
     if "timestamp" not in data or not data["timestamp"]:
         data["timestamp"] = pd.Timestamp.now()
     db[FEEDBACK_COLLECTION].insert_one(data)
+    # The feedback is stored: a failure below must not make the caller retry the insert
+    for update in (update_prompt_context_for_feedback, update_feedback_rollup):
+        try:
+            update(data)
+        except Exception as e:
+            print(f"⚠️ {update.__name__} failed for saved feedback {data['_id']}: {e}")
 
 
 def get_feedback_by_profile_url(profile_url):
@@ -89,3 +224,567 @@ def get_feedback_by_profile_url(profile_url):
         return pd.DataFrame(feedback_data)
     return pd.DataFrame()
 
+
+def get_feedback_by_profile_urls(profile_urls):
+    """Feedback for many profiles with one query, as DataFrames grouped by profile URL."""
+    feedback_data = list(db[FEEDBACK_COLLECTION].find({"profile_url": {"$in": list(profile_urls)}}))
+    if not feedback_data:
+        return {}
+    feedback_df = pd.DataFrame(feedback_data)
+    return {
+        profile_url: group.reset_index(drop=True)
+        for profile_url, group in feedback_df.groupby("profile_url", sort=False)
+    }
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Cross-profile benchmarks (see benchmarks.py)
+def save_benchmarks(benchmark_data: dict):
+    doc = dict(benchmark_data)
+    doc["timestamp"] = pd.Timestamp.now()
+    db[BENCHMARKS_COLLECTION].insert_one(doc)
+
+
+def get_latest_benchmarks():
+    benchmarks = db[BENCHMARKS_COLLECTION].find_one({}, {"_id": 0}, sort=[("timestamp", -1)])
+    return benchmarks or {}
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Fitted posting-time models (see posting_time_model.py), one document per profile
+def save_posting_time_model(profile_url: str, model_data: dict):
+    doc = dict(model_data)
+    doc["profile_url"] = profile_url
+    doc["timestamp"] = pd.Timestamp.now()
+    db[POSTING_TIME_MODELS_COLLECTION].replace_one({"profile_url": profile_url}, doc, upsert=True)
+
+
+def get_posting_time_model(profile_url: str, include_stats=True):
+    projection = {"_id": 0} if include_stats else {"_id": 0, "stats": 0}
+    return db[POSTING_TIME_MODELS_COLLECTION].find_one({"profile_url": profile_url}, projection) or {}
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Persisted trending sketches (see trending.py), one document per kind/window/scope
+def ensure_trending_indexes():
+    db[TRENDING_COLLECTION].create_index([("kind", 1), ("window", 1), ("scope", 1)], unique=True)
+
+
+def clear_trending_sketches(kind: str):
+    db[TRENDING_COLLECTION].delete_many({"kind": kind})
+
+
+def get_trending_sketches(kind: str, windows, scope: str):
+    query = {"kind": kind, "window": {"$in": list(windows)}, "scope": scope}
+    return list(db[TRENDING_COLLECTION].find(query, {"_id": 0}))
+
+
+def save_trending_sketch(kind: str, window: str, scope: str, sketch_data: dict, expected_version: int):
+    """
+    Compare-and-swap write of a sketch document. Returns False if another writer
+    updated it since it was read, in which case the caller re-reads and retries.
+    """
+    doc = dict(sketch_data, kind=kind, window=window, scope=scope,
+               version=expected_version + 1, updated_at=pd.Timestamp.now())
+    key = {"kind": kind, "window": window, "scope": scope}
+    try:
+        if expected_version == 0:
+            db[TRENDING_COLLECTION].insert_one(doc)
+            return True
+        result = db[TRENDING_COLLECTION].replace_one(dict(key, version=expected_version), doc)
+        return result.matched_count == 1
+    except DuplicateKeyError:
+        return False
+
+# ────────────────────────────────────────────────────────────────────────────────
+# MinHash/LSH near-duplicate index (see dedup.py)
+def ensure_near_duplicate_indexes():
+    db[NEAR_DUPLICATE_COLLECTION].create_index("bands")
+    db[NEAR_DUPLICATE_COLLECTION].create_index([("source", 1), ("ref", 1)], unique=True)
+
+
+def save_minhash_entries(entries):
+    operations = [
+        UpdateOne({"source": e["source"], "ref": e["ref"]}, {"$set": e}, upsert=True)
+        for e in entries
+    ]
+    if operations:
+        db[NEAR_DUPLICATE_COLLECTION].bulk_write(operations, ordered=False)
+
+
+def find_minhash_candidates(bands, source=None, profile_url=None, feedback=None):
+    query = {"bands": {"$in": list(bands)}}
+    if source:
+        query["source"] = source
+    if profile_url:
+        query["profile_url"] = profile_url
+    if feedback:
+        query["feedback"] = feedback
+    return list(db[NEAR_DUPLICATE_COLLECTION].find(query, {"_id": 0, "bands": 0}))
+
+
+def clear_minhash_entries():
+    db[NEAR_DUPLICATE_COLLECTION].delete_many({})
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Generation response cache (see generation_cache.py)
+def ensure_generation_cache_indexes():
+    # Mongo's TTL monitor removes expired entries; reads also check expires_at since it runs once a minute
+    db[GENERATION_CACHE_COLLECTION].create_index("expires_at", expireAfterSeconds=0)
+    db[GENERATION_CACHE_COLLECTION].create_index("last_access")
+
+
+def get_cached_generation(key: str):
+    now = pd.Timestamp.now()
+    return db[GENERATION_CACHE_COLLECTION].find_one_and_update(
+        {"_id": key, "expires_at": {"$gt": now}},
+        {"$set": {"last_access": now}, "$inc": {"hits": 1}},
+    )
+
+
+def save_cached_generation(key: str, entry: dict, ttl_seconds: int):
+    now = pd.Timestamp.now()
+    doc = dict(entry, created_at=now, last_access=now, hits=0,
+               expires_at=now + pd.Timedelta(seconds=ttl_seconds))
+    db[GENERATION_CACHE_COLLECTION].replace_one({"_id": key}, doc, upsert=True)
+
+
+def evict_cached_generations(max_entries: int):
+    """Deletes least recently used entries beyond max_entries. Returns the number removed."""
+    excess = db[GENERATION_CACHE_COLLECTION].estimated_document_count() - max_entries
+    if excess <= 0:
+        return 0
+    stale = db[GENERATION_CACHE_COLLECTION].find({}, {"_id": 1}).sort("last_access", 1).limit(excess)
+    result = db[GENERATION_CACHE_COLLECTION].delete_many({"_id": {"$in": [d["_id"] for d in stale]}})
+    return result.deleted_count
+
+
+def cached_generation_exists(key: str):
+    """Existence check that does not count as an access (used by pre-generation)."""
+    now = pd.Timestamp.now()
+    return db[GENERATION_CACHE_COLLECTION].count_documents({"_id": key, "expires_at": {"$gt": now}}, limit=1) > 0
+
+
+def get_pregeneration_stats():
+    """How many pre-generated cache entries exist and how many were served to a user."""
+    pipeline = [
+        {"$match": {"pregenerated": True}},
+        {"$group": {
+            "_id": None,
+            "entries": {"$sum": 1},
+            "used": {"$sum": {"$cond": [{"$gt": ["$hits", 0]}, 1, 0]}},
+            "hits": {"$sum": "$hits"},
+        }},
+    ]
+    result = list(db[GENERATION_CACHE_COLLECTION].aggregate(pipeline))
+    return result[0] if result else {"entries": 0, "used": 0, "hits": 0}
+
+
+def ensure_generation_request_indexes(ttl_days: int):
+    db[GENERATION_REQUESTS_COLLECTION].create_index("timestamp", expireAfterSeconds=ttl_days * 24 * 3600)
+
+
+def log_generation_request(request: dict):
+    db[GENERATION_REQUESTS_COLLECTION].insert_one(dict(request, timestamp=pd.Timestamp.now()))
+
+
+def get_recent_generation_requests(since):
+    return list(db[GENERATION_REQUESTS_COLLECTION].find({"timestamp": {"$gte": since}}, {"_id": 0}))
+
+
+def get_recent_feedback_topics(since):
+    """Profile, topic, tone and time of recent feedback on generated posts."""
+    return list(db[FEEDBACK_COLLECTION].find(
+        {"timestamp": {"$gte": since}, "topic": {"$nin": [None, ""]}},
+        {"_id": 0, "profile_url": 1, "topic": 1, "tone": 1, "feedback": 1, "timestamp": 1},
+    ))
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Materialized per-profile prompt context, maintained incrementally on every
+# feedback/analysis write so generation reads one small document
+def update_prompt_context_for_feedback(data):
+    profile_url = data.get("profile_url")
+    if not profile_url:
+        return
+    collection = db[PROMPT_CONTEXT_COLLECTION]
+    update = {"$set": {"updated_at": pd.Timestamp.now()}, "$inc": {"feedback_count": 1}}
+    field = {"positive": "liked", "negative": "disliked"}.get(data.get("feedback"))
+    if field and data.get("content"):
+        snippet = data["content"][:PROMPT_CONTEXT_SNIPPET_CHARS]
+        update["$push"] = {field: {"$each": [snippet], "$slice": -PROMPT_CONTEXT_SNIPPETS}}
+    collection.update_one({"profile_url": profile_url}, update, upsert=True)
+
+    # Only matches when the suggestion is not stored yet, which keeps the list distinct
+    suggestion = (data.get("textual_feedback") or "").strip()
+    if suggestion:
+        collection.update_one(
+            {"profile_url": profile_url, "suggestions": {"$ne": suggestion}},
+            {"$push": {"suggestions": {"$each": [suggestion], "$slice": -PROMPT_CONTEXT_SUGGESTIONS}}},
+        )
+
+
+def update_prompt_context_for_analysis(profile_url: str, analysis_data: dict):
+    db[PROMPT_CONTEXT_COLLECTION].update_one(
+        {"profile_url": profile_url},
+        {"$set": {
+            "top_hashtags": list((analysis_data.get("top_hashtags") or {}).keys()),
+            "optimal_posting_time": analysis_data.get("optimal_posting_time"),
+            "updated_at": pd.Timestamp.now(),
+        }},
+        upsert=True,
+    )
+
+
+def save_prompt_context(profile_url: str, context: dict):
+    doc = dict(context, profile_url=profile_url, updated_at=pd.Timestamp.now())
+    db[PROMPT_CONTEXT_COLLECTION].replace_one({"profile_url": profile_url}, doc, upsert=True)
+
+
+def get_prompt_contexts(profile_urls):
+    contexts = db[PROMPT_CONTEXT_COLLECTION].find({"profile_url": {"$in": list(profile_urls)}}, {"_id": 0})
+    return {context["profile_url"]: context for context in contexts}
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Content embeddings for few-shot example retrieval (see vector_index.py)
+def ensure_embedding_indexes():
+    db[EMBEDDINGS_COLLECTION].create_index([("source", 1), ("ref", 1)], unique=True)
+    db[EMBEDDINGS_COLLECTION].create_index("profile_url")
+
+
+def save_embedding_entries(entries):
+    operations = [
+        UpdateOne({"source": e["source"], "ref": e["ref"]}, {"$set": e}, upsert=True)
+        for e in entries
+    ]
+    if operations:
+        db[EMBEDDINGS_COLLECTION].bulk_write(operations, ordered=False)
+
+
+def get_embedding_entries(profile_url: str):
+    return list(db[EMBEDDINGS_COLLECTION].find({"profile_url": profile_url}, {"_id": 0}))
+
+
+def count_profile_documents(collection: str, profile_url: str):
+    return db[collection].count_documents({"profile_url": profile_url})
+
+
+def clear_embedding_entries():
+    db[EMBEDDINGS_COLLECTION].delete_many({})
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Background analysis job queue (see analysis_jobs.py). One document per profile
+# (_id = profile URL), so a profile can never have two jobs queued or running.
+def ensure_analysis_job_indexes():
+    db[ANALYSIS_JOBS_COLLECTION].create_index([("status", 1), ("requested_at", 1)])
+
+
+def enqueue_analysis_job(profile_url: str):
+    """Queues an analysis; if one is already running it is flagged to run again when it finishes."""
+    now = pd.Timestamp.now()
+    try:
+        db[ANALYSIS_JOBS_COLLECTION].update_one(
+            {"_id": profile_url, "status": {"$ne": "running"}},
+            {"$set": {"status": "queued", "requested_at": now, "error": None},
+             "$setOnInsert": {"attempts": 0}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # A running job exists (the filter did not match, so the upsert collided with it)
+        db[ANALYSIS_JOBS_COLLECTION].update_one(
+            {"_id": profile_url}, {"$set": {"rerun": True, "requested_at": now}}
+        )
+
+
+def claim_analysis_job(worker_id: str, stale_after_seconds: int):
+    """Atomically takes the oldest queued job (or one whose worker stopped responding)."""
+    now = pd.Timestamp.now()
+    return db[ANALYSIS_JOBS_COLLECTION].find_one_and_update(
+        {"$or": [
+            {"status": "queued"},
+            {"status": "running", "started_at": {"$lt": now - pd.Timedelta(seconds=stale_after_seconds)}},
+        ]},
+        {"$set": {"status": "running", "started_at": now, "worker": worker_id, "rerun": False},
+         "$inc": {"attempts": 1}},
+        sort=[("requested_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def finish_analysis_job(profile_url: str, error=None):
+    """Marks a running job done or failed, or re-queues it if new data arrived while it ran."""
+    now = pd.Timestamp.now()
+    jobs = db[ANALYSIS_JOBS_COLLECTION]
+    # Retried once: an enqueue may set the rerun flag between the two conditional updates
+    for _ in range(2):
+        requeued = jobs.update_one(
+            {"_id": profile_url, "status": "running", "rerun": True},
+            {"$set": {"status": "queued", "rerun": False, "finished_at": now, "error": error}},
+        )
+        if requeued.matched_count:
+            return
+        finished = jobs.update_one(
+            {"_id": profile_url, "status": "running", "rerun": {"$ne": True}},
+            {"$set": {"status": "failed" if error else "done", "finished_at": now, "error": error}},
+        )
+        if finished.matched_count:
+            return
+
+
+def get_analysis_job(profile_url: str):
+    return db[ANALYSIS_JOBS_COLLECTION].find_one({"_id": profile_url})
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Paginated, server-side filtered tables for the app. Filtering, sorting and
+# paging run in MongoDB on indexed fields so only the visible page is fetched.
+POST_TABLE_COLUMNS = ['post_url', 'date', 'time', 'content_length_type', 'type', 'likes', 'comments', 'shares', 'engagement']
+POST_TABLE_SORTS = ['date', 'engagement', 'likes', 'comments', 'shares']
+FEEDBACK_TABLE_COLUMNS = ['textual_feedback', 'feedback', 'topic', 'tone', 'timestamp']
+FEEDBACK_TABLE_SORTS = ['timestamp', 'feedback', 'topic', 'tone']
+
+
+def ensure_table_indexes():
+    db[POSTS_COLLECTION].create_index([("profile_url", 1), ("date", -1), ("time", -1)])
+    db[POSTS_COLLECTION].create_index([("profile_url", 1), ("type", 1), ("date", -1)])
+    for field in ("engagement", "likes", "comments", "shares"):
+        db[POSTS_COLLECTION].create_index([("profile_url", 1), (field, -1)])
+    db[FEEDBACK_COLLECTION].create_index([("profile_url", 1), ("timestamp", -1)])
+    db[FEEDBACK_COLLECTION].create_index([("profile_url", 1), ("feedback", 1), ("timestamp", -1)])
+    db[FEEDBACK_COLLECTION].create_index([("profile_url", 1), ("topic", 1), ("timestamp", -1)])
+
+
+def _fetch_page(collection, query, columns, sort, page, page_size):
+    total = db[collection].count_documents(query)
+    cursor = (
+        db[collection].find(query, {"_id": 0, **{c: 1 for c in columns}})
+        .sort(sort)
+        .skip(max(0, page - 1) * page_size)
+        .limit(page_size)
+    )
+    return pd.DataFrame(list(cursor), columns=columns), total
+
+
+def get_posts_page(profile_url: str, start_date=None, end_date=None, types=(), sort_by="date", descending=True,
+                   page=1, page_size=25):
+    """
+    One page of a profile's posts.
+
+    Args:
+        start_date, end_date (str, optional): Inclusive 'YYYY-MM-DD' bounds on the post date
+        types (tuple): Only these post types (all if empty)
+        sort_by (str): One of POST_TABLE_SORTS
+        page (int): 1-based page number
+
+    Returns:
+        tuple: (DataFrame with POST_TABLE_COLUMNS for the page, total matching posts)
+    """
+    query = {"profile_url": profile_url}
+    if start_date or end_date:
+        query["date"] = {**({"$gte": str(start_date)} if start_date else {}),
+                         **({"$lte": str(end_date)} if end_date else {})}
+    if types:
+        query["type"] = {"$in": list(types)}
+    direction = -1 if descending else 1
+    sort = [(sort_by, direction)] + ([("time", direction)] if sort_by == "date" else [])
+    return _fetch_page(POSTS_COLLECTION, query, POST_TABLE_COLUMNS, sort, page, page_size)
+
+
+def get_feedback_page(profile_url: str, start_date=None, end_date=None, feedback_values=(), topic=None,
+                      sort_by="timestamp", descending=True, page=1, page_size=25):
+    """
+    One page of a profile's feedback.
+
+    Args:
+        start_date, end_date (datetime.date, optional): Inclusive bounds on the feedback timestamp
+        feedback_values (tuple): Only these feedback values (all if empty)
+        topic (str, optional): Only feedback on this topic
+        sort_by (str): One of FEEDBACK_TABLE_SORTS
+        page (int): 1-based page number
+
+    Returns:
+        tuple: (DataFrame with FEEDBACK_TABLE_COLUMNS for the page, total matching documents)
+    """
+    query = {"profile_url": profile_url}
+    if start_date or end_date:
+        query["timestamp"] = {
+            **({"$gte": pd.Timestamp(start_date)} if start_date else {}),
+            **({"$lt": pd.Timestamp(end_date) + pd.Timedelta(days=1)} if end_date else {}),
+        }
+    if feedback_values:
+        query["feedback"] = {"$in": list(feedback_values)}
+    if topic:
+        query["topic"] = topic
+    sort = [(sort_by, -1 if descending else 1)]
+    return _fetch_page(FEEDBACK_COLLECTION, query, FEEDBACK_TABLE_COLUMNS, sort, page, page_size)
+
+
+def get_distinct_values(collection: str, field: str, profile_url: str):
+    """Distinct non-empty values of a field for one profile (filter options)."""
+    return sorted(v for v in db[collection].distinct(field, {"profile_url": profile_url}) if v not in (None, ""))
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Per-profile, per-day feedback rollups maintained by save_feedback (see feedback_rollups.py).
+# Day documents hold counts by feedback value and topic/tone crosstabs; a "meta"
+# document marks profiles whose older feedback has been backfilled.
+# Every increment bumps the day's "version", and a rebuilt day records the last feedback
+# _id it counted ("rebuilt_through"), so rebuilds and live increments never lose or
+# double-count a feedback document. ObjectIds order by the inserting client's clock, so
+# this assumes app and worker hosts keep their clocks in sync.
+ROLLUP_REBUILD_ATTEMPTS = 5
+
+def _rollup_increments(data):
+    feedback = to_field_name(data.get("feedback") or "unknown")
+    increments = {"total": 1, f"counts.{feedback}": 1}
+    for dimension in ("topic", "tone"):
+        if data.get(dimension):
+            increments[f"{dimension}s.{to_field_name(data[dimension])}.{feedback}"] = 1
+    return increments
+
+
+def update_feedback_rollup(data):
+    profile_url = data.get("profile_url")
+    if not profile_url:
+        return
+    day = pd.Timestamp(data["timestamp"]).strftime("%Y-%m-%d")
+    query = {"_id": f"{profile_url}|{day}"}
+    if data.get("_id") is not None:
+        # Skip feedback a rebuild of this day already counted
+        query["rebuilt_through"] = {"$not": {"$gte": data["_id"]}}
+    try:
+        db[FEEDBACK_ROLLUPS_COLLECTION].update_one(
+            query,
+            {"$inc": dict(_rollup_increments(data), version=1),
+             "$setOnInsert": {"profile_url": profile_url, "kind": "day", "date": day}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        pass    # the day exists and was rebuilt with this feedback included
+
+
+def get_feedback_rollups(profile_url: str):
+    """Day rollups of a profile sorted by date, and whether older feedback was backfilled."""
+    docs = list(db[FEEDBACK_ROLLUPS_COLLECTION].find({"profile_url": profile_url}).sort("date", 1))
+    backfilled = any(doc.get("kind") == "meta" for doc in docs)
+    return [doc for doc in docs if doc.get("kind") == "day"], backfilled
+
+
+def _aggregate_feedback_days(profile_url: str):
+    """Day rollup documents computed from raw feedback, and the largest feedback _id counted."""
+    pipeline = [
+        {"$match": {"profile_url": profile_url}},
+        {"$group": {
+            "_id": {
+                "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                "feedback": "$feedback", "topic": "$topic", "tone": "$tone",
+            },
+            "count": {"$sum": 1},
+            "last_id": {"$max": "$_id"},
+        }},
+    ]
+    days = {}
+    through = None
+    for group in db[FEEDBACK_COLLECTION].aggregate(pipeline):
+        key = group["_id"]
+        through = group["last_id"] if through is None else max(through, group["last_id"])
+        if not key.get("date"):
+            continue
+        doc = days.setdefault(key["date"], {
+            "_id": f"{profile_url}|{key['date']}", "profile_url": profile_url, "kind": "day", "date": key["date"],
+            "total": 0, "counts": {}, "topics": {}, "tones": {},
+        })
+        feedback = to_field_name(key.get("feedback") or "unknown")
+        doc["total"] += group["count"]
+        doc["counts"][feedback] = doc["counts"].get(feedback, 0) + group["count"]
+        for dimension in ("topic", "tone"):
+            if key.get(dimension):
+                cells = doc[f"{dimension}s"].setdefault(to_field_name(key[dimension]), {})
+                cells[feedback] = cells.get(feedback, 0) + group["count"]
+    return days, through
+
+
+def rebuild_feedback_rollups(profile_url: str):
+    """
+    Recomputes a profile's day rollups from raw feedback with one aggregation.
+
+    Day versions are read before aggregating and each day is replaced only if its version
+    is unchanged; a day that took a live increment in between is rebuilt again. Rebuilt
+    days record the last feedback _id they counted, and later increments for feedback up
+    to that id are skipped, so each feedback document is counted exactly once.
+    """
+    collection = db[FEEDBACK_ROLLUPS_COLLECTION]
+    for _ in range(ROLLUP_REBUILD_ATTEMPTS):
+        versions = {doc["_id"]: doc.get("version")
+                    for doc in collection.find({"profile_url": profile_url, "kind": "day"}, {"version": 1})}
+        days, through = _aggregate_feedback_days(profile_url)
+        conflicts = 0
+        for doc in days.values():
+            doc.update(rebuilt_through=through, version=(versions.get(doc["_id"]) or 0) + 1)
+            if doc["_id"] in versions:
+                conflicts += collection.replace_one({"_id": doc["_id"], "version": versions[doc["_id"]]}, doc).matched_count == 0
+            else:
+                try:
+                    collection.insert_one(doc)
+                except DuplicateKeyError:
+                    conflicts += 1
+        # Days that no longer have any feedback
+        for day_id in set(versions) - set(days):
+            conflicts += collection.delete_one({"_id": day_id, "version": versions[day_id]}).deleted_count == 0
+        if not conflicts:
+            break
+    else:
+        print(f"⚠️ Feedback rollups of {profile_url} changed during {ROLLUP_REBUILD_ATTEMPTS} rebuilds; kept the live counts of the contested days")
+    collection.replace_one({"_id": f"{profile_url}|meta"},
+                           {"profile_url": profile_url, "kind": "meta", "rebuilt_at": pd.Timestamp.now()}, upsert=True)
+    return sorted(collection.find({"profile_url": profile_url, "kind": "day"}), key=lambda doc: doc["date"])
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Learned per-profile preferences (see preference_store.py): one document per profile
+# with feedback counters by tone, length bucket, hashtag use and topic
+def get_user_preference_counts(profile_url: str):
+    return db[USER_PREFERENCES_COLLECTION].find_one({"_id": profile_url})
+
+
+def increment_user_preference_counts(profile_url: str, increments: dict, feedback_id):
+    """
+    Atomically applies the counter increments of one saved feedback document and returns
+    the updated document. Nothing is applied (and None is returned) while the profile is
+    not backfilled, or when its backfill already counted the document.
+    """
+    return db[USER_PREFERENCES_COLLECTION].find_one_and_update(
+        {"_id": profile_url, "backfilled": True, "backfilled_through": {"$not": {"$gte": feedback_id}}},
+        {"$inc": increments, "$set": {"updated_at": datetime.datetime.now()}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def backfill_user_preference_counts(profile_url: str, counts: dict, through_id):
+    """
+    Stores counters recomputed from the profile's raw feedback up to `through_id`, unless
+    another process backfilled the profile first; returns the stored document either way.
+    """
+    doc = dict(counts, _id=profile_url, backfilled=True, backfilled_through=through_id, updated_at=datetime.datetime.now())
+    try:
+        db[USER_PREFERENCES_COLLECTION].replace_one({"_id": profile_url, "backfilled": {"$ne": True}}, doc, upsert=True)
+    except DuplicateKeyError:
+        return get_user_preference_counts(profile_url)
+    return doc
+
+
+def replace_user_preference_counts(profile_url: str, counts: dict, through_id):
+    """Stores counters recomputed from raw feedback up to `through_id`, replacing any existing ones."""
+    doc = dict(counts, _id=profile_url, backfilled=True, backfilled_through=through_id, updated_at=datetime.datetime.now())
+    db[USER_PREFERENCES_COLLECTION].replace_one({"_id": profile_url}, doc, upsert=True)
+    return doc
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Change notifications (see change_feed.py): change streams on replica sets, and an
+# ObjectId watermark for standalone servers where change streams are unavailable
+def find_inserted_since(collection: str, since, projection=None, limit=1000, after_id=None):
+    """Documents whose ObjectId was created at or after `since` (a UTC datetime) and is greater than `after_id`, oldest first."""
+    query = {"_id": {"$gte": ObjectId.from_datetime(since), **({"$gt": after_id} if after_id else {})}}
+    return list(db[collection].find(query, projection).sort("_id", 1).limit(limit))
+
+
+def watch_collections(collections, resume_after=None):
+    """Change stream over inserts, updates and replacements in the given collections."""
+    pipeline = [{"$match": {"ns.coll": {"$in": list(collections)},
+                            "operationType": {"$in": ["insert", "update", "replace"]}}}]
+    return db.watch(pipeline, full_document="updateLookup", resume_after=resume_after)
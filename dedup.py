@@ -0,0 +1,187 @@
+import argparse
+import hashlib
+import re
+
+import numpy as np
+
+from database import (
+    POSTS_COLLECTION,
+    FEEDBACK_COLLECTION,
+    stream_collection,
+    ensure_near_duplicate_indexes,
+    save_minhash_entries,
+    find_minhash_candidates,
+    clear_minhash_entries,
+)
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 Jaccard almost always share a band
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.7
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(1337)  # fixed seed: signatures are persisted, so permutations must never change
+_A = _rng.randint(1, _PRIME, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+_indexes_ready = False
+
+
+def _shingles(text):
+    tokens = re.findall(r'\w+', (text or "").lower())
+    if len(tokens) < SHINGLE_SIZE:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text):
+    """
+    MinHash signature of a text's word 3-gram shingles.
+
+    Returns:
+        np.ndarray: NUM_PERM uint64 values (all max values for empty text)
+    """
+    shingles = _shingles(text)
+    if not shingles:
+        return np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little') % _PRIME for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    permuted = (np.outer(hashes, _A) + _B) % _PRIME
+    return permuted.min(axis=0)
+
+
+def band_keys(signature):
+    """LSH band keys; two texts become candidates when they share any key."""
+    return [
+        f"{band}:{hashlib.blake2b(signature[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).hexdigest()}"
+        for band in range(BANDS)
+    ]
+
+
+def estimated_jaccard(sig_a, sig_b):
+    return float(np.mean(np.asarray(sig_a, dtype=np.uint64) == np.asarray(sig_b, dtype=np.uint64)))
+
+
+def _ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        ensure_near_duplicate_indexes()
+        _indexes_ready = True
+
+
+def _entry(source, ref, profile_url, content, feedback=None):
+    signature = minhash_signature(content)
+    return {
+        "source": source,
+        "ref": str(ref),
+        "profile_url": profile_url,
+        "feedback": feedback,
+        "signature": [int(x) for x in signature],
+        "bands": band_keys(signature),
+    }
+
+
+def index_posts(records):
+    """
+    Adds scraped posts to the index (call at insert time with the new post records).
+
+    Args:
+        records (list): Post dicts with 'post_url', 'profile_url' and 'content'
+    """
+    _ensure_indexes()
+    entries = [
+        _entry("post", r["post_url"], r.get("profile_url"), r.get("content"))
+        for r in records if r.get("post_url") and isinstance(r.get("content"), str)
+    ]
+    save_minhash_entries(entries)
+
+
+def index_feedback(feedback_doc):
+    """Adds a saved feedback document (generated post content) to the index."""
+    if not feedback_doc.get("content"):
+        return
+    _ensure_indexes()
+    save_minhash_entries([_entry(
+        "feedback", feedback_doc.get("_id"), feedback_doc.get("profile_url"),
+        feedback_doc["content"], feedback_doc.get("feedback"),
+    )])
+
+
+def find_near_duplicates(text, threshold=DEFAULT_THRESHOLD, source=None, profile_url=None, feedback=None, exclude_ref=None):
+    """
+    Returns indexed posts/feedback whose content is a near-duplicate of `text`.
+
+    Only documents sharing an LSH band with `text` are fetched (an indexed
+    lookup), then filtered by estimated Jaccard similarity.
+
+    Args:
+        text (str): Content to check
+        threshold (float): Minimum estimated Jaccard similarity of word shingles
+        source (str, optional): 'post' or 'feedback'
+        profile_url (str, optional): Restrict to one profile
+        feedback (str, optional): Restrict feedback entries to this value (e.g. 'negative')
+        exclude_ref (str, optional): Reference to ignore (the document itself)
+
+    Returns:
+        list: Dicts with 'source', 'ref', 'profile_url', 'feedback' and 'similarity', most similar first
+    """
+    signature = minhash_signature(text)
+    candidates = find_minhash_candidates(band_keys(signature), source=source, profile_url=profile_url, feedback=feedback)
+    matches = []
+    for candidate in candidates:
+        if exclude_ref is not None and candidate["ref"] == str(exclude_ref):
+            continue
+        similarity = estimated_jaccard(signature, candidate["signature"])
+        if similarity >= threshold:
+            matches.append({
+                "source": candidate["source"],
+                "ref": candidate["ref"],
+                "profile_url": candidate.get("profile_url"),
+                "feedback": candidate.get("feedback"),
+                "similarity": similarity,
+            })
+    return sorted(matches, key=lambda m: m["similarity"], reverse=True)
+
+
+def disliked_similarity(profile_url, content, threshold=0.0):
+    """Highest estimated similarity of `content` to the profile's disliked feedback (0.0 if nothing matches)."""
+    matches = find_near_duplicates(content, threshold, source="feedback", profile_url=profile_url, feedback="negative")
+    return matches[0]["similarity"] if matches else 0.0
+
+
+def is_similar_to_disliked(profile_url, content, threshold=DEFAULT_THRESHOLD):
+    return bool(find_near_duplicates(content, threshold, source="feedback", profile_url=profile_url, feedback="negative"))
+
+
+def rebuild_index(batch_size=1000):
+    """Rebuilds the whole index from the posts and feedback collections in one streaming pass."""
+    clear_minhash_entries()
+    batch = []
+    for post in stream_collection(POSTS_COLLECTION, {}, {"_id": 0, "post_url": 1, "profile_url": 1, "content": 1}, batch_size):
+        batch.append(post)
+        if len(batch) >= batch_size:
+            index_posts(batch)
+            batch = []
+    if batch:
+        index_posts(batch)
+
+    for fb in stream_collection(FEEDBACK_COLLECTION, {}, {"_id": 1, "profile_url": 1, "content": 1, "feedback": 1}, batch_size):
+        index_feedback(fb)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Near-duplicate index for posts and generated content")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild the index from the raw collections")
+    parser.add_argument('--query', type=str, default=None, help="Text to look up near-duplicates for")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.rebuild:
+        rebuild_index()
+        print("✅ Near-duplicate index rebuilt.")
+    if args.query:
+        for match in find_near_duplicates(args.query, args.threshold):
+            print(f"  {match['similarity']:.2f}  {match['source']}  {match['ref']}")
@@ -0,0 +1,79 @@
+import argparse
+
+import pandas as pd
+
+from database import get_profile_urls, get_feedback_rollups, rebuild_feedback_rollups, from_field_name
+from single_flight import get_group
+
+_backfill_flight = get_group("feedback_rollups")
+
+
+def _crosstab(docs, dimension):
+    rows = {}
+    for doc in docs:
+        for value, cells in (doc.get(dimension) or {}).items():
+            row = rows.setdefault(from_field_name(value), {})
+            for feedback, count in cells.items():
+                row[from_field_name(feedback)] = row.get(from_field_name(feedback), 0) + count
+    return pd.DataFrame.from_dict(rows, orient='index').fillna(0).astype(int).sort_index()
+
+
+def summarize_rollups(docs):
+    """
+    Dashboard metrics from a profile's day rollups.
+
+    Args:
+        docs (list): Day rollup documents (database.get_feedback_rollups)
+
+    Returns:
+        dict: 'total' (int), 'counts' (Series of counts per feedback value, largest first),
+              'trend' (DataFrame of counts indexed by date, one column per feedback value),
+              'topics' and 'tones' (DataFrames of counts, one column per feedback value)
+    """
+    trend = pd.DataFrame.from_dict(
+        {pd.Timestamp(doc["date"]).date(): {from_field_name(k): v for k, v in (doc.get("counts") or {}).items()}
+         for doc in docs},
+        orient='index',
+    ).fillna(0).astype(int).sort_index()
+    counts = trend.sum().sort_values(ascending=False) if not trend.empty else pd.Series(dtype=int)
+    return {
+        "total": int(sum(doc.get("total", 0) for doc in docs)),
+        "counts": counts,
+        "trend": trend,
+        "topics": _crosstab(docs, "topics"),
+        "tones": _crosstab(docs, "tones"),
+    }
+
+
+def get_feedback_summary(profile_url):
+    """
+    Feedback metrics of a profile read from its rollups (one small document per day)
+    instead of its raw feedback; feedback saved before rollups existed is folded in
+    with a one-time rebuild.
+    """
+    docs, backfilled = get_feedback_rollups(profile_url)
+    if not backfilled:
+        docs = _backfill_flight.do(profile_url, rebuild_feedback_rollups, profile_url)
+        docs = sorted(docs, key=lambda doc: doc["date"])
+    return summarize_rollups(docs)
+
+
+def rebuild_all(profile_urls=None):
+    """Recomputes the rollups of the given profiles (all by default) from raw feedback."""
+    for url in profile_urls or get_profile_urls():
+        days = rebuild_feedback_rollups(url)
+        print(f"  ✅ {url}: {len(days)} days, {sum(day['total'] for day in days)} feedback")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-day feedback rollups behind the Feedback Dashboard")
+    parser.add_argument('--rebuild', nargs='*', default=None, help="Rebuild rollups for these profile URLs (all if none given)")
+    parser.add_argument('--profile', type=str, default=None, help="Print the summary of this profile")
+    args = parser.parse_args()
+
+    if args.rebuild is not None:
+        rebuild_all(args.rebuild)
+    if args.profile:
+        summary = get_feedback_summary(args.profile)
+        print(f"Total feedback: {summary['total']}")
+        print(summary["counts"].to_string())
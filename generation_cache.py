@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import threading
+
+from database import (
+    ensure_generation_cache_indexes,
+    get_cached_generation,
+    save_cached_generation,
+    evict_cached_generations,
+    cached_generation_exists,
+    get_pregeneration_stats,
+    ensure_generation_request_indexes,
+    log_generation_request,
+)
+
+GENERATION_CACHE_TTL_SECONDS = int(os.environ.get("GENERATION_CACHE_TTL_SECONDS", 24 * 3600))
+GENERATION_CACHE_MAX_ENTRIES = int(os.environ.get("GENERATION_CACHE_MAX_ENTRIES", 5000))
+# Run size-based eviction once every N stores rather than on every write
+EVICTION_INTERVAL = 50
+# How long interactive requests are kept for predicting pre-generation candidates
+REQUEST_LOG_TTL_DAYS = 30
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bypassed": 0, "errors": 0,
+          "pregenerated_hits": 0, "pregenerated_stores": 0}
+_stores_since_eviction = 0
+_indexes_ready = False
+_request_indexes_ready = False
+
+
+def make_cache_key(prompt, model_name, generation_config):
+    """Hash of the fully rendered prompt plus the model configuration."""
+    payload = json.dumps(
+        {"prompt": prompt, "model": model_name, "config": generation_config},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _count(stat, n=1):
+    with _lock:
+        _stats[stat] += n
+
+
+def _ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        ensure_generation_cache_indexes()
+        _indexes_ready = True
+
+
+def get(key):
+    """
+    Returns the cached posts for a key, or None on a miss.
+    Cache errors are treated as misses so generation never fails because of the cache.
+    """
+    try:
+        entry = get_cached_generation(key)
+    except Exception as e:
+        print(f"⚠️ Generation cache read failed: {e}")
+        _count("errors")
+        return None
+    if entry is None:
+        _count("misses")
+        return None
+    _count("hits")
+    if entry.get("pregenerated"):
+        _count("pregenerated_hits")
+    return entry["posts"]
+
+
+def contains(key):
+    """True if a live entry exists for key; does not touch hit/miss counters or LRU order."""
+    try:
+        return cached_generation_exists(key)
+    except Exception as e:
+        print(f"⚠️ Generation cache read failed: {e}")
+        _count("errors")
+        return False
+
+
+def put(key, posts, metadata=None, ttl_seconds=None):
+    """Stores generated posts under a key and periodically evicts least recently used entries."""
+    global _stores_since_eviction
+    try:
+        _ensure_indexes()
+        save_cached_generation(key, dict(metadata or {}, posts=posts), ttl_seconds or GENERATION_CACHE_TTL_SECONDS)
+        _count("stores")
+        if (metadata or {}).get("pregenerated"):
+            _count("pregenerated_stores")
+        with _lock:
+            _stores_since_eviction += 1
+            run_eviction = _stores_since_eviction >= EVICTION_INTERVAL
+            if run_eviction:
+                _stores_since_eviction = 0
+        if run_eviction:
+            _count("evictions", evict_cached_generations(GENERATION_CACHE_MAX_ENTRIES))
+    except Exception as e:
+        print(f"⚠️ Generation cache write failed: {e}")
+        _count("errors")
+
+
+def record_bypass():
+    """Counts a request that skipped the cache lookup (force_refresh)."""
+    _count("bypassed")
+
+
+def record_request(request):
+    """Logs an interactive generation request (profile, topic, options) for pre-generation."""
+    global _request_indexes_ready
+    try:
+        if not _request_indexes_ready:
+            ensure_generation_request_indexes(REQUEST_LOG_TTL_DAYS)
+            _request_indexes_ready = True
+        log_generation_request(request)
+    except Exception as e:
+        print(f"⚠️ Generation request log write failed: {e}")
+
+
+def get_cache_stats():
+    """Hit/miss counters for this process plus the hit rate over cache lookups."""
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def get_pregeneration_hit_rate():
+    """Share of stored pre-generated entries that were later served to a user (across processes)."""
+    stats = get_pregeneration_stats()
+    stats.pop("_id", None)
+    stats["hit_rate"] = stats["used"] / stats["entries"] if stats["entries"] else 0.0
+    return stats
@@ -7,7 +7,7 @@ from datetime import datetime
 from dotenv import load_dotenv
 import json
 import os
-from pymongo import MongoClient, UpdateOne
+from pymongo import UpdateOne
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -543,10 +543,19 @@ def scrape_single_profile_and_posts(profile_url, max_posts_to_scrape=15):
         return pd.DataFrame(), profile_summary
 
 def save_to_mongodb(posts_dataframe, profile_summary, db_name='linkedin_data', posts_collection='posts', profiles_collection='profiles'):
-    load_dotenv()
-    connection_string = os.getenv("MONGO_URI")
-    client = MongoClient(connection_string)
-    db = client[db_name]
+    """
+    Upserts the profile and its posts (matched by post_url). When they are written to the
+    app's database, the indexes and caches derived from posts are updated afterwards.
+
+    Returns:
+        BulkWriteResult: Result of the posts upsert, or None if no posts were written
+    """
+    import database
+
+    # The derived-data hooks below read and write database.db, so posts bound for the
+    # app's collections go through that same handle
+    app_collections = db_name == database.DB_NAME and posts_collection == database.POSTS_COLLECTION
+    db = database.db if db_name == database.DB_NAME else database.get_client()[db_name]
 
     # Save profile info to Profiles collection
     profile_collection = db[profiles_collection]
@@ -564,10 +573,12 @@ def save_to_mongodb(posts_dataframe, profile_summary, db_name='linkedin_data', p
     post_collection = db[posts_collection]
     records = posts_dataframe.to_dict(orient='records')
     operations = []
+    operation_records = []
 
     for record in records:
         if 'post_url' not in record:
             continue
+        operation_records.append(record)
         operations.append(
             UpdateOne(
                 {'post_url': record['post_url']},  # match condition
@@ -576,12 +587,53 @@ def save_to_mongodb(posts_dataframe, profile_summary, db_name='linkedin_data', p
             )
         )
 
+    if not operations:
+        return None
     try:
-        if operations:
-            result = post_collection.bulk_write(operations)
-            print(f"✅ MongoDB upsert complete: {result.bulk_api_result}")
+        result = post_collection.bulk_write(operations)
+        print(f"✅ MongoDB upsert complete: {result.bulk_api_result}")
     except Exception as e:
         print(f"❌ Error during MongoDB upsert: {e}")
+        return None
+    if not app_collections:
+        print(f"⚠️ Posts saved to {db_name}.{posts_collection}: the app's indexes and caches were not updated")
+        return result
+
+    profile_url = profile_summary['profile_url']
+
+    def record_trending():
+        # Only posts that were inserted (not updated) count towards trending hashtags
+        if result.upserted_ids:
+            from trending import record_post_hashtags
+            record_post_hashtags(pd.DataFrame([operation_records[i] for i in result.upserted_ids]))
+
+    def index_near_duplicates():
+        # Upserts by post_url, so updates are safe
+        from dedup import index_posts
+        index_posts(operation_records)
+
+    def embed_posts():
+        # For few-shot example retrieval in generation prompts
+        from vector_index import index_posts
+        index_posts(operation_records)
+
+    def invalidate_cache():
+        # Cached app reads for this profile (and the profile list) are now stale
+        from data_cache import invalidate
+        invalidate(profile_url)
+
+    def enqueue_analysis():
+        # Recompute the profile's analysis in the background
+        from analysis_jobs import enqueue
+        enqueue(profile_url)
+
+    # The posts are stored: each hook runs on its own, so one failing does not skip the rest
+    for hook in (record_trending, index_near_duplicates, embed_posts, invalidate_cache, enqueue_analysis):
+        try:
+            hook()
+        except Exception as e:
+            print(f"⚠️ Posts saved, but {hook.__name__} failed: {e}")
+    return result
 
 def main(profile_url):
     posts_df, profile_summary = scrape_single_profile_and_posts(profile_url)
@@ -594,7 +646,15 @@ def main(profile_url):
         print(f"\nDataFrame shape: {posts_df.shape}")
         print("\nColumns:", posts_df.columns.tolist())
 
-        save_to_mongodb(posts_df, profile_summary)
+        result = save_to_mongodb(posts_df, profile_summary)
+
+        # Fold the new posts into the cached posting-time model. Posts updated in place
+        # keep their _id, so new engagement on them needs a full refit
+        try:
+            from posting_time_model import fit_posting_time_model
+            fit_posting_time_model(profile_url, full=bool(result and result.modified_count))
+        except Exception as e:
+            print(f"⚠️ Could not refit posting-time model: {e}")
 
     else:
         print("❌ No detailed post data was scraped.")
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class LLMBackend:
+    """
+    Interface for text-generation backends used by content_generator.
+
+    Backends must be safe to call from several threads at once.
+    """
+
+    name = "base"
+
+    def generate(self, prompt, model_name, generation_config):
+        """Returns the full response text for a prompt."""
+        raise NotImplementedError
+
+    def generate_with_usage(self, prompt, model_name, generation_config):
+        """
+        Returns (text, usage) where usage is {'prompt_tokens', 'output_tokens'} as
+        reported by the provider, or None if the backend does not report it.
+        """
+        return self.generate(prompt, model_name, generation_config), None
+
+    def stream(self, prompt, model_name, generation_config):
+        """Yields response text chunks; backends without streaming yield the full text once."""
+        yield self.generate(prompt, model_name, generation_config)
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Google Gemini backend. The SDK is configured once on first use and one
+    GenerativeModel is kept per (model, config); the SDK shares a single
+    underlying client between them, so connections stay warm across requests.
+    """
+
+    name = "gemini"
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key or os.environ.get("GOOGLE_API_KEY")
+        self._genai = None
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _get_model(self, model_name, generation_config):
+        key = (model_name, json.dumps(generation_config, sort_keys=True))
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            if self._genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._genai = genai
+            if key not in self._models:
+                self._models[key] = self._genai.GenerativeModel(
+                    model_name=model_name,
+                    generation_config=generation_config
+                )
+            return self._models[key]
+
+    def generate(self, prompt, model_name, generation_config):
+        return self._get_model(model_name, generation_config).generate_content(prompt).text
+
+    def generate_with_usage(self, prompt, model_name, generation_config):
+        response = self._get_model(model_name, generation_config).generate_content(prompt)
+        metadata = getattr(response, "usage_metadata", None)
+        usage = None
+        if metadata is not None:
+            usage = {
+                "prompt_tokens": metadata.prompt_token_count,
+                "output_tokens": metadata.candidates_token_count,
+            }
+        return response.text, usage
+
+    def stream(self, prompt, model_name, generation_config):
+        response = self._get_model(model_name, generation_config).generate_content(prompt, stream=True)
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class StubBackend(LLMBackend):
+    """
+    Local deterministic backend for tests and benchmarks: the same prompt always
+    produces the same posts, with an optional simulated latency.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency_seconds=None, num_variations=3):
+        if latency_seconds is None:
+            latency_seconds = float(os.environ.get("STUB_LLM_LATENCY_MS", 0)) / 1000
+        self.latency_seconds = latency_seconds
+        self.num_variations = num_variations
+
+    def _response(self, prompt):
+        topic_match = re.search(r'LinkedIn posts? about (.+?)\.\s', prompt)
+        topic = topic_match.group(1) if topic_match else "this topic"
+        seed = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest(), 16)
+        posts = [
+            {
+                "content": f"Variation {i + 1} on {topic}: here is what I have learned and why it matters. What is your take?",
+                "estimated_engagement": 40 + (seed >> (8 * i)) % 60,
+            }
+            for i in range(self.num_variations)
+        ]
+        return json.dumps({"posts": posts})
+
+    def generate(self, prompt, model_name, generation_config):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self._response(prompt)
+
+    def stream(self, prompt, model_name, generation_config):
+        text = self._response(prompt)
+        chunk_size = 32
+        delay = self.latency_seconds / max(1, len(text) // chunk_size)
+        for i in range(0, len(text), chunk_size):
+            if delay:
+                time.sleep(delay)
+            yield text[i:i + chunk_size]
+
+
+# Backend factories by name; register_backend adds more (e.g. another provider)
+_backend_factories = {
+    "gemini": GeminiBackend,
+    "stub": StubBackend,
+}
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def register_backend(name, factory):
+    _backend_factories[name] = factory
+
+
+def set_backend(backend):
+    """Replaces the process-wide backend (an LLMBackend instance or a registered name)."""
+    global _backend
+    with _backend_lock:
+        _backend = _backend_factories[backend]() if isinstance(backend, str) else backend
+
+
+def get_backend():
+    """Returns the process-wide backend, created on first use from the LLM_BACKEND env var (default: gemini)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _backend_factories[os.environ.get("LLM_BACKEND", "gemini")]()
+    return _backend
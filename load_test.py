@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlencode
+
+import numpy as np
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+from tornado.ioloop import IOLoop
+from tornado.iostream import StreamClosedError
+
+# Request mix of a read-heavy client (relative weights); generation is opt-in since it calls the LLM
+DEFAULT_MIX = {"profiles": 1, "profile": 3, "posts": 4, "analysis": 3, "feedback_summary": 2, "feedback": 1}
+
+
+def _request(kind, profile_url, topic):
+    """(method, path, body) of one request of the given kind."""
+    query = urlencode({"profile_url": profile_url})
+    if kind == "profiles":
+        return "GET", "/profiles", None
+    if kind == "profile":
+        return "GET", f"/profile?{query}", None
+    if kind == "posts":
+        return "GET", f"/posts?{query}&page={random.randint(1, 3)}", None
+    if kind == "analysis":
+        return "GET", f"/analysis?{query}", None
+    if kind == "feedback_summary":
+        return "GET", f"/feedback/summary?{query}", None
+    if kind == "feedback":
+        return "GET", f"/feedback?{query}", None
+    if kind == "generate":
+        return "POST", "/generate", json.dumps({"profile_url": profile_url, "topic": topic})
+    raise ValueError(f"Unknown request kind: {kind}")
+
+
+async def run_load(base_url, requests=1000, concurrency=50, mix=None, topics=("leadership",)):
+    """
+    Sends requests to a running api_server.py with a fixed number of concurrent clients.
+
+    Args:
+        base_url (str): e.g. 'http://localhost:8888'
+        requests (int): Total requests to send
+        concurrency (int): Requests in flight at once
+        mix (dict, optional): Request kind -> weight (DEFAULT_MIX by default)
+        topics (tuple): Topics used for 'generate' requests
+
+    Returns:
+        dict: 'requests', 'seconds', 'throughput' (req/s), 'statuses' (count per status code or connection error)
+              and per-kind latency percentiles in milliseconds
+    """
+    mix = mix or DEFAULT_MIX
+    client = AsyncHTTPClient(max_clients=concurrency)
+    profiles = json.loads((await client.fetch(f"{base_url}/profiles")).body)["profiles"]
+    if not profiles:
+        raise RuntimeError("The API has no profiles to query")
+
+    kinds = random.choices(list(mix), weights=list(mix.values()), k=requests)
+    latencies = {kind: [] for kind in mix}
+    statuses = {}
+    remaining = iter(kinds)
+
+    async def client_loop():
+        for kind in remaining:
+            method, path, body = _request(kind, random.choice(profiles), random.choice(topics))
+            start = time.perf_counter()
+            try:
+                response = await client.fetch(f"{base_url}{path}", method=method, body=body, request_timeout=120)
+                status = response.code
+            except HTTPClientError as e:
+                status = e.code
+            except (OSError, StreamClosedError) as e:
+                # Refused or reset connections are counted as errors, not fatal
+                status = type(e).__name__
+            latencies[kind].append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+
+    report = {"requests": requests, "seconds": seconds, "throughput": requests / seconds, "statuses": statuses}
+    for kind, values in latencies.items():
+        if values:
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            report[kind] = {"count": len(values), "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load generator for api_server.py")
+    parser.add_argument('--url', type=str, default="http://localhost:8888")
+    parser.add_argument('-n', '--requests', type=int, default=1000)
+    parser.add_argument('-c', '--concurrency', type=int, default=50)
+    parser.add_argument('--generate', type=int, default=0, help="Weight of /generate requests in the mix (calls the LLM)")
+    parser.add_argument('--json', type=str, default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    request_mix = dict(DEFAULT_MIX, **({"generate": args.generate} if args.generate else {}))
+    result = IOLoop.current().run_sync(lambda: run_load(args.url, args.requests, args.concurrency, request_mix))
+    print(f"{result['requests']} requests in {result['seconds']:.2f}s ({result['throughput']:.0f} req/s), "
+          f"statuses: {result['statuses']}")
+    for name in request_mix:
+        if name in result:
+            r = result[name]
+            print(f"  {name:18} n={r['count']:5}  p50={r['p50_ms']:7.1f} ms  p95={r['p95_ms']:7.1f} ms  p99={r['p99_ms']:7.1f} ms")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
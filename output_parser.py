@@ -0,0 +1,312 @@
+import json
+import re
+
+
+class IncrementalPostParser:
+    """
+    Incremental JSON scanner for streamed model output.
+
+    Feed text chunks as they arrive; every object that is a direct element of a
+    JSON array (e.g. each entry of "posts") is returned as soon as its closing
+    brace has been seen. Tracks string/escape state so braces inside post text
+    are ignored, and skips anything outside the JSON (such as ``` fences).
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.position = 0       # absolute index of the next character to scan
+        self.stack = []         # open containers: '{' or '['
+        self.in_string = False
+        self.escaped = False
+        self.element_start = None
+        self.element_depth = None
+
+    def feed(self, chunk):
+        """
+        Scans a chunk of streamed text.
+
+        Returns:
+            list: Objects completed by this chunk, in order
+        """
+        self.text += chunk
+        completed = []
+        while self.position < len(self.text):
+            ch = self.text[self.position]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"' and self.stack:
+                self.in_string = True
+            elif ch in '{[':
+                if ch == '{' and self.element_start is None and self.stack and self.stack[-1] == '[':
+                    self.element_start = self.position
+                    self.element_depth = len(self.stack)
+                self.stack.append(ch)
+            elif ch in '}]' and self.stack:
+                self.stack.pop()
+                if ch == '}' and self.element_start is not None and len(self.stack) == self.element_depth:
+                    element = self._load(self.text[self.element_start:self.position + 1])
+                    if element is not None:
+                        completed.append(element)
+                    self.element_start = None
+                    self.element_depth = None
+            self.position += 1
+        return completed
+
+    @staticmethod
+    def _load(fragment):
+        try:
+            value = json.loads(fragment)
+        except json.JSONDecodeError:
+            return None
+        return value if isinstance(value, dict) else None
+
+
+class OutputParseError(ValueError):
+    """Raised when no usable JSON can be recovered from model output."""
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Locating and repairing the JSON document in a full response
+
+def _top_level_spans(text):
+    """
+    Single pass over text yielding (start, end) of each top-level JSON object or
+    array, string/escape aware so braces inside post text are ignored. A span
+    that is still open when the text ends (truncated output) yields end=None.
+    """
+    depth = 0
+    in_string = escaped = False
+    start = None
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"' and depth:
+            in_string = True
+        elif ch in '{[':
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch in '}]' and depth:
+            depth -= 1
+            if depth == 0:
+                yield start, i + 1
+    if depth:
+        yield start, None
+
+
+def _repair(fragment):
+    """
+    Fixes common defects in model JSON in one pass: raw newlines/tabs inside
+    strings, trailing commas before a closing bracket, and output cut off
+    mid-document (the open string and containers are closed).
+    """
+    out = []
+    stack = []
+    in_string = escaped = False
+    for ch in fragment:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            elif ch in '\n\r\t':
+                out.append({'\n': '\\n', '\r': '\\r', '\t': '\\t'}[ch])
+                continue
+        elif ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+        elif ch in '}]':
+            while out and out[-1] in ' \n\r\t':
+                out.pop()
+            if out and out[-1] == ',':
+                out.pop()
+            if stack:
+                stack.pop()
+        out.append(ch)
+    if in_string:
+        out.append('"')
+    repaired = "".join(out).rstrip()
+    while repaired.endswith((',', ':')):
+        repaired = repaired[:-1].rstrip()
+    return repaired + "".join(reversed(stack))
+
+
+def _load(fragment):
+    try:
+        return json.loads(fragment)
+    except json.JSONDecodeError:
+        return None
+
+
+def _is_posts_document(value):
+    if isinstance(value, dict):
+        value = value.get("posts")
+    return isinstance(value, list) and bool(value) and all(isinstance(v, dict) for v in value)
+
+
+def _decode_span(text, start, end):
+    """(value, repaired, truncated) for one span, or None if it cannot be decoded."""
+    if end is None:
+        elements = IncrementalPostParser().feed(text[start:])
+        if elements:
+            return {"posts": elements}, True, True
+        value = _load(_repair(text[start:]))
+        return (value, True, True) if value is not None else None
+    value = _load(text[start:end])
+    if value is not None:
+        return value, False, False
+    value = _load(_repair(text[start:end]))
+    return (value, True, False) if value is not None else None
+
+
+def extract_json(text):
+    """
+    Locates and decodes the JSON document in a model response.
+
+    Tries each complete top-level object/array as-is, then repaired. Output that
+    was cut off keeps only the array elements that were completed before the cut.
+    The first span shaped like the posts document (a list of objects, or an object
+    with a "posts" list) wins over other JSON-like text such as "[3] posts".
+
+    Returns:
+        tuple: (value, repaired, truncated); repaired is True if the text needed fixing
+
+    Raises:
+        OutputParseError: If no JSON can be recovered
+    """
+    text = text or ""
+    first = None
+    for start, end in _top_level_spans(text):
+        decoded = _decode_span(text, start, end)
+        if decoded is None:
+            continue
+        if _is_posts_document(decoded[0]):
+            return decoded
+        first = first or decoded
+    if first is not None:
+        return first
+    raise OutputParseError("Could not parse JSON from model response")
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Schema validation
+
+# Field rules for one post variation: type, whether it is required, default, range
+POST_SCHEMA = {
+    "content": {"type": str, "required": True},
+    "estimated_engagement": {"type": int, "required": False, "default": 50, "min": 0, "max": 100},
+}
+
+
+def _coerce_int(value):
+    if isinstance(value, bool):
+        raise ValueError("expected a number")
+    if isinstance(value, (int, float)):
+        return int(round(value))
+    match = re.search(r'-?\d+(?:\.\d+)?', str(value))
+    if not match:
+        raise ValueError("expected a number")
+    return int(round(float(match.group(0))))
+
+
+def compile_schema(schema):
+    """
+    Compiles field rules into a validator, so the per-field checks are built once.
+
+    Returns:
+        callable: validate(item) -> (cleaned item or None, list of error messages).
+            Fixable defects (numbers as strings, out-of-range values, missing
+            optional fields) are repaired; missing or empty required fields are errors.
+    """
+    checks = []
+    for field, rule in schema.items():
+        if rule["type"] is int:
+            def check(value, field=field, rule=rule):
+                value = _coerce_int(value)
+                return min(max(value, rule.get("min", value)), rule.get("max", value))
+        else:
+            def check(value, field=field, rule=rule):
+                if not isinstance(value, str):
+                    raise ValueError("expected text")
+                if rule["required"] and not value.strip():
+                    raise ValueError("is empty")
+                return value.strip()
+        checks.append((field, rule, check))
+
+    def validate(item):
+        if not isinstance(item, dict):
+            return None, ["expected an object"]
+        cleaned, errors = {}, []
+        for field, rule, check in checks:
+            if item.get(field) is None:
+                if rule["required"]:
+                    errors.append(f"'{field}' is missing")
+                else:
+                    cleaned[field] = rule.get("default")
+                continue
+            try:
+                cleaned[field] = check(item[field])
+            except (ValueError, TypeError) as e:
+                if rule["required"]:
+                    errors.append(f"'{field}' {e}")
+                else:
+                    cleaned[field] = rule.get("default")
+        return (None, errors) if errors else (cleaned, [])
+
+    return validate
+
+
+validate_post = compile_schema(POST_SCHEMA)
+
+
+class ParseResult:
+    """Valid posts from a response plus field-level errors for the variations that failed."""
+
+    def __init__(self, posts, errors, repaired):
+        self.posts = posts
+        self.errors = errors
+        self.repaired = repaired
+
+
+def parse_posts(text):
+    """
+    Extracts, repairs and validates the post variations in a model response.
+
+    Returns:
+        ParseResult: 'posts' that passed validation, 'errors' such as
+            "variation 2: 'content' is missing", and whether 'repaired' was needed
+
+    Raises:
+        OutputParseError: If no JSON can be recovered
+    """
+    value, repaired, truncated = extract_json(text)
+    if isinstance(value, dict):
+        items = value.get("posts")
+    else:
+        items = value
+    if not isinstance(items, list):
+        raise OutputParseError("Model response has no 'posts' list")
+
+    posts, errors = [], []
+    for position, item in enumerate(items, start=1):
+        cleaned, item_errors = validate_post(item)
+        if cleaned is None:
+            errors.extend(f"variation {position}: {message}" for message in item_errors)
+        else:
+            posts.append(cleaned)
+    if truncated:
+        errors.append(f"response was cut off after {len(items)} complete variation(s)")
+    return ParseResult(posts, errors, repaired)
@@ -0,0 +1,320 @@
+"""
+Incremental Parquet export of posts, feedback and analyses.
+
+Runs are insert-only: the watermark is the last exported ObjectId, so posts that a later
+scrape updates in place (new like counts, edited content) keep the values they had when
+first exported until the collection is re-exported with --full.
+"""
+import argparse
+import ast
+import datetime
+import json
+import os
+import re
+import shutil
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from bson import ObjectId
+
+from database import POSTS_COLLECTION, FEEDBACK_COLLECTION, ANALYSIS_COLLECTION, stream_inserted_between
+
+EXPORT_DIR = os.environ.get("EXPORT_DIR", "exports")
+ROWS_PER_FILE = 100_000
+# Rows buffered per partition before they are written out as a row group
+ROW_GROUP_ROWS = 10_000
+# Rows buffered across all partitions before every buffer is written out, bounding memory
+MAX_BUFFERED_ROWS = 100_000
+# Parquet files held open at once; the least recently written one is closed beyond this,
+# and its partition continues in a new file
+MAX_OPEN_WRITERS = 64
+# Documents newer than this are left for the next run: inserts from other processes may
+# still be in flight with slightly older ObjectIds than ones already visible
+SETTLE_SECONDS = 5
+STATE_FILE = "_export_state.json"
+STAGING_DIR = "_staging"
+
+# Column order and types of the scraper's posts DataFrame (cols_order in linkedin_scraper.py)
+POSTS_SCHEMA = pa.schema([
+    ("profile_url", pa.string()),
+    ("profile_name", pa.string()),
+    ("date", pa.date32()),
+    ("time", pa.string()),
+    ("content", pa.string()),
+    ("type", pa.string()),
+    ("content_length", pa.int64()),
+    ("content_length_type", pa.string()),
+    ("likes", pa.int64()),
+    ("comments", pa.int64()),
+    ("shares", pa.int64()),
+    ("engagement", pa.int64()),
+    ("has_hashtags", pa.bool_()),
+    ("hashtags_list", pa.list_(pa.string())),
+    ("has_links", pa.bool_()),
+    ("has_questions", pa.bool_()),
+    ("has_mentions", pa.bool_()),
+    ("post_url", pa.string()),
+])
+FEEDBACK_SCHEMA = pa.schema([
+    ("profile_url", pa.string()),
+    ("content", pa.string()),
+    ("feedback", pa.string()),
+    ("textual_feedback", pa.string()),
+    ("topic", pa.string()),
+    ("tone", pa.string()),
+    ("generation_time", pa.timestamp("ms")),
+    ("scheduled_time", pa.timestamp("ms")),
+    ("timestamp", pa.timestamp("ms")),
+])
+# Analyses are nested documents whose keys vary per profile, so they are exported as JSON text
+ANALYSIS_SCHEMA = pa.schema([
+    ("profile_url", pa.string()),
+    ("timestamp", pa.timestamp("ms")),
+    ("analysis", pa.string()),
+])
+
+# collection -> (schema, field whose month partitions the rows)
+EXPORTS = {
+    POSTS_COLLECTION: (POSTS_SCHEMA, "date"),
+    FEEDBACK_COLLECTION: (FEEDBACK_SCHEMA, "timestamp"),
+    ANALYSIS_COLLECTION: (ANALYSIS_SCHEMA, "timestamp"),
+}
+
+
+def _profile_partition(profile_url):
+    """Directory-safe profile key, e.g. 'jaspar-carmichael-jack' for .../in/jaspar-carmichael-jack/."""
+    slug = (profile_url or "").rstrip("/").rsplit("/", 1)[-1] or "unknown"
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', slug)
+
+
+def _hashtags(value):
+    # Lists in MongoDB; CSV round trips leave their string form
+    if isinstance(value, str):
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return []
+    return [str(tag) for tag in value] if isinstance(value, (list, tuple)) else None
+
+
+def _bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() == "true"
+    return None if value is None or pd.isna(value) else bool(value)
+
+
+def _text(value):
+    return None if value is None or (isinstance(value, float) and pd.isna(value)) else str(value)
+
+
+def to_table(docs, schema):
+    """
+    Converts raw documents to a table with the given schema. Missing fields and values
+    that cannot be converted (e.g. a malformed date) become nulls.
+    """
+    df = pd.DataFrame(docs)
+    columns = {}
+    for field in schema:
+        values = df[field.name] if field.name in df.columns else pd.Series([None] * len(df), dtype=object)
+        if field.name == "analysis":
+            values = values.map(lambda v: None if v is None else json.dumps(v, default=str))
+        elif pa.types.is_date(field.type):
+            values = pd.to_datetime(values, errors="coerce").dt.date
+        elif pa.types.is_timestamp(field.type):
+            values = pd.to_datetime(values, errors="coerce")
+        elif pa.types.is_integer(field.type):
+            values = pd.to_numeric(values, errors="coerce").round().astype("Int64")
+        elif pa.types.is_boolean(field.type):
+            values = values.map(_bool)
+        elif pa.types.is_list(field.type):
+            values = values.map(_hashtags)
+        else:
+            values = values.map(_text)
+        columns[field.name] = values
+    return pa.Table.from_pandas(pd.DataFrame(columns), schema=schema, preserve_index=False)
+
+
+def _month(value):
+    value = pd.to_datetime(value, errors="coerce")
+    return "unknown" if pd.isna(value) else f"{value:%Y-%m}"
+
+
+class _PartitionWriter:
+    """
+    Streams rows into Parquet files per (profile, month) partition, writing a row group
+    whenever a partition buffers ROW_GROUP_ROWS rows or all partitions together buffer
+    MAX_BUFFERED_ROWS, and starting a new file every ROWS_PER_FILE rows. At most
+    MAX_OPEN_WRITERS files are open at once; the least recently written is closed first.
+    """
+
+    def __init__(self, root, schema, run_id):
+        self.root = root
+        self.schema = schema
+        self.run_id = run_id
+        self.buffers = {}
+        self.writers = OrderedDict()  # partition -> (ParquetWriter, rows written to it), least recent first
+        self.files = {}
+        self.buffered = 0
+        self.rows = 0
+
+    def add(self, partition, doc):
+        buffer = self.buffers.setdefault(partition, [])
+        buffer.append(doc)
+        self.buffered += 1
+        if len(buffer) >= ROW_GROUP_ROWS:
+            self._flush(partition)
+        elif self.buffered >= MAX_BUFFERED_ROWS:
+            for name in list(self.buffers):
+                self._flush(name)
+
+    def _open(self, partition):
+        profile, month = partition
+        directory = os.path.join(self.root, f"profile={profile}", f"month={month}")
+        os.makedirs(directory, exist_ok=True)
+        number = self.files.get(partition, 0)
+        self.files[partition] = number + 1
+        path = os.path.join(directory, f"part-{self.run_id}-{number:04d}.parquet")
+        return pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def _flush(self, partition):
+        docs = self.buffers.pop(partition, [])
+        self.buffered -= len(docs)
+        while docs:
+            if partition in self.writers:
+                writer, written = self.writers.pop(partition)
+            else:
+                while len(self.writers) >= MAX_OPEN_WRITERS:
+                    self.writers.popitem(last=False)[1][0].close()
+                writer, written = self._open(partition), 0
+            chunk, docs = docs[:ROWS_PER_FILE - written], docs[ROWS_PER_FILE - written:]
+            writer.write_table(to_table(chunk, self.schema))
+            written += len(chunk)
+            self.rows += len(chunk)
+            if written >= ROWS_PER_FILE:
+                writer.close()
+            else:
+                self.writers[partition] = (writer, written)
+
+    def close(self):
+        for partition in list(self.buffers):
+            self._flush(partition)
+        for writer, _ in self.writers.values():
+            writer.close()
+        self.writers.clear()
+        return self.rows
+
+
+def _load_state(output_dir):
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_state(output_dir, state):
+    path = os.path.join(output_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _publish(staging, target):
+    """Moves staged files into the export; files already moved by an interrupted call are simply gone from staging."""
+    files = 0
+    for directory, _, names in os.walk(staging):
+        for name in names:
+            destination = os.path.join(target, os.path.relpath(directory, staging))
+            os.makedirs(destination, exist_ok=True)
+            os.replace(os.path.join(directory, name), os.path.join(destination, name))
+            files += 1
+    shutil.rmtree(staging, ignore_errors=True)
+    try:
+        os.rmdir(os.path.dirname(staging))
+    except OSError:
+        pass    # another collection is being staged
+    return files
+
+
+def export_collection(collection, output_dir=EXPORT_DIR, full=False, batch_size=1000):
+    """
+    Exports documents inserted since the collection's last watermark to Parquet
+    files partitioned as <collection>/profile=<profile>/month=<YYYY-MM>/.
+
+    Files are staged first. Once the whole run is staged, the new watermark is saved
+    together with a 'publishing' marker and the files are moved into place; a run
+    interrupted while moving finishes the move on the next call instead of exporting
+    the same documents again, and a run that fails before that leaves the export
+    unchanged and is simply repeated.
+
+    Args:
+        collection (str): One of EXPORTS
+        output_dir (str): Export root
+        full (bool): Discard earlier exports of the collection and export everything
+        batch_size (int): Documents per database batch
+
+    Returns:
+        dict: 'collection', 'rows', 'files' and the new 'watermark'
+    """
+    schema, month_field = EXPORTS[collection]
+    state = _load_state(output_dir)
+    target = os.path.join(output_dir, collection)
+    staging = os.path.join(output_dir, STAGING_DIR, collection)
+    if full:
+        # Forget the watermark before deleting, so an interrupted run restarts from scratch
+        state.pop(collection, None)
+        _save_state(output_dir, state)
+        shutil.rmtree(target, ignore_errors=True)
+    elif state.get(collection, {}).get("publishing"):
+        # The previous run was interrupted after its watermark was saved: finish moving its files
+        print(f"  ⚠️ {collection}: completing the interrupted export {state[collection]['publishing']}")
+        _publish(staging, target)
+        state[collection].pop("publishing")
+        _save_state(output_dir, state)
+
+    after_id = ObjectId(state[collection]["watermark"]) if collection in state else None
+    before_id = ObjectId.from_datetime(datetime.datetime.now(datetime.timezone.utc)
+                                       - datetime.timedelta(seconds=SETTLE_SECONDS))
+    run_id = str(before_id)
+    shutil.rmtree(staging, ignore_errors=True)   # leftovers of a run that failed while staging
+
+    writer = _PartitionWriter(staging, schema, run_id)
+    last_id = after_id
+    for doc in stream_inserted_between(collection, after_id, before_id, batch_size):
+        last_id = doc.pop("_id")
+        writer.add((_profile_partition(doc.get("profile_url")), _month(doc.get(month_field))), doc)
+    rows = writer.close()
+    if last_id is None:
+        return {"collection": collection, "rows": 0, "files": 0, "watermark": None}
+
+    state[collection] = {"watermark": str(last_id), "exported_at": datetime.datetime.now().isoformat(),
+                         "rows": state.get(collection, {}).get("rows", 0) + rows, "publishing": run_id}
+    _save_state(output_dir, state)
+    files = _publish(staging, target)
+    state[collection].pop("publishing")
+    _save_state(output_dir, state)
+    return {"collection": collection, "rows": rows, "files": files, "watermark": str(last_id)}
+
+
+def export_all(output_dir=EXPORT_DIR, collections=None, full=False, batch_size=1000):
+    """Exports each collection (posts, feedback and analyses by default) incrementally."""
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    for collection in collections or EXPORTS:
+        result = export_collection(collection, output_dir, full, batch_size)
+        print(f"  ✅ {collection}: {result['rows']} rows in {result['files']} files")
+        results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export posts, feedback and analyses to partitioned Parquet")
+    parser.add_argument('--out', type=str, default=EXPORT_DIR, help="Export directory")
+    parser.add_argument('--collections', nargs='*', choices=list(EXPORTS), default=None)
+    parser.add_argument('--full', action='store_true', help="Re-export everything instead of only new documents")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    export_all(args.out, args.collections, args.full, args.batch_size)
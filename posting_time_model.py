@@ -0,0 +1,266 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+
+from data_analyzer import get_post_hours
+from database import (
+    get_profile_urls,
+    get_posts_by_profile_url,
+    get_posts_inserted_after,
+    get_latest_benchmarks,
+    save_posting_time_model,
+    get_posting_time_model,
+)
+from single_flight import get_group
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+GRID_SHAPE = (7, 24)  # weekday x hour
+Z_95 = 1.96
+
+# Bounds for the shrinkage strength (pseudo-posts pulled toward the prior per cell)
+MIN_PRIOR_STRENGTH = 1.0
+MAX_PRIOR_STRENGTH = 50.0
+# Used when the between-cell spread cannot be estimated (one occupied cell, or no spread
+# beyond noise): a weak prior, so a few posts still move a cell away from it
+DEFAULT_PRIOR_STRENGTH = 2.0
+
+# In-process cache of recommendations: profile_url -> (loaded_at, recommendation)
+RECOMMENDATION_TTL_SECONDS = 300
+_recommendation_cache = {}
+_recommendation_flight = get_group("posting_time")
+
+
+def _empty_stats():
+    return {"n": np.zeros(GRID_SHAPE), "sum": np.zeros(GRID_SHAPE), "sumsq": np.zeros(GRID_SHAPE)}
+
+
+def _stats_from_doc(doc_stats):
+    if not doc_stats:
+        return _empty_stats()
+    return {key: np.asarray(doc_stats[key], dtype=float) for key in ("n", "sum", "sumsq")}
+
+
+def accumulate_posts(stats, posts_df):
+    """
+    Adds posts to the per-cell sufficient statistics (count, sum, sum of squares).
+
+    Engagement is modelled on a log1p scale so a single viral post does not
+    dominate its cell.
+
+    Args:
+        stats (dict): Arrays 'n', 'sum' and 'sumsq' of shape (7, 24), updated in place
+        posts_df (pd.DataFrame): Posts with 'date', 'time' and 'engagement' columns
+
+    Returns:
+        int: Number of posts that were added
+    """
+    if posts_df.empty or not {'date', 'time', 'engagement'}.issubset(posts_df.columns):
+        return 0
+
+    hours = get_post_hours(posts_df)
+    weekdays = pd.to_datetime(posts_df['date'], errors='coerce').dt.weekday
+    y = np.log1p(pd.to_numeric(posts_df['engagement'], errors='coerce').clip(lower=0))
+    valid = hours.between(0, 23) & weekdays.notna() & y.notna()
+
+    cells = (weekdays[valid].astype(int).to_numpy(), hours[valid].astype(int).to_numpy())
+    values = y[valid].to_numpy()
+    np.add.at(stats["n"], cells, 1)
+    np.add.at(stats["sum"], cells, values)
+    np.add.at(stats["sumsq"], cells, values ** 2)
+    return int(valid.sum())
+
+
+def _hour_prior_effect(benchmark_data):
+    """
+    Cross-profile hour effect on the log1p scale: how much better or worse peers
+    do at each hour relative to their overall average. Zero when no benchmarks exist.
+    """
+    effect = np.zeros(24)
+    benchmarks = (benchmark_data or {}).get("benchmarks", {})
+    overall = benchmarks.get("avg_engagement", {}).get("p50")
+    if not overall:
+        return effect
+    for hour, summary in benchmarks.get("engagement_by_hour", {}).items():
+        if summary.get("p50") is not None and 0 <= int(hour) < 24:
+            effect[int(hour)] = np.log1p(summary["p50"]) - np.log1p(overall)
+    return effect
+
+
+def _posterior(n, s, ss, prior_mean):
+    """
+    Normal empirical-Bayes shrinkage of cell means toward prior_mean.
+
+    The prior strength is sigma^2 / tau^2 (within-cell noise over between-cell
+    spread), estimated by the method of moments and clipped to a sane range. When
+    tau^2 is not positive the estimate is meaningless and DEFAULT_PRIOR_STRENGTH is used.
+
+    Returns:
+        tuple: (posterior mean, posterior standard deviation) arrays
+    """
+    total_n = n.sum()
+    occupied = n > 0
+    cell_mean = np.divide(s, n, out=np.zeros_like(s), where=occupied)
+
+    within_ss = (ss - np.divide(s ** 2, n, out=np.zeros_like(s), where=occupied))[occupied].sum()
+    dof = total_n - occupied.sum()
+    if dof > 0:
+        sigma2 = within_ss / dof
+    else:
+        sigma2 = ss.sum() / total_n - (s.sum() / total_n) ** 2
+    sigma2 = max(sigma2, 1e-6)
+
+    if occupied.sum() > 1:
+        tau2 = np.var(cell_mean[occupied]) - sigma2 * np.mean(1 / n[occupied])
+    else:
+        tau2 = 0.0
+    if tau2 > 0:
+        prior_strength = float(np.clip(sigma2 / tau2, MIN_PRIOR_STRENGTH, MAX_PRIOR_STRENGTH))
+    else:
+        prior_strength = DEFAULT_PRIOR_STRENGTH
+
+    post_mean = (s + prior_strength * prior_mean) / (n + prior_strength)
+    post_sd = np.sqrt(sigma2 / (n + prior_strength))
+    return post_mean, post_sd
+
+
+def compute_recommendation(stats, benchmark_data=None):
+    """
+    Derives the posting-time recommendation and the smoothed hour x weekday grid.
+
+    Args:
+        stats (dict): Sufficient statistics from accumulate_posts
+        benchmark_data (dict, optional): Cross-profile benchmarks used as the prior
+
+    Returns:
+        tuple: (recommendation dict, grid dict) or ({}, {}) if there is no data
+    """
+    n, s, ss = stats["n"], stats["sum"], stats["sumsq"]
+    total_n = n.sum()
+    if total_n == 0:
+        return {}, {}
+
+    hour_effect = _hour_prior_effect(benchmark_data)
+    grand_mean = s.sum() / total_n
+
+    cell_prior = grand_mean + np.broadcast_to(hour_effect, GRID_SHAPE)
+    cell_mean, cell_sd = _posterior(n, s, ss, cell_prior)
+
+    hour_mean, hour_sd = _posterior(n.sum(axis=0), s.sum(axis=0), ss.sum(axis=0), grand_mean + hour_effect)
+
+    # Rank by the lower 95% credible bound so sparsely observed cells need stronger evidence to win
+    weekday, hour = np.unravel_index(np.argmax(cell_mean - Z_95 * cell_sd), GRID_SHAPE)
+    best_hour = int(np.argmax(hour_mean - Z_95 * hour_sd))
+
+    recommendation = {
+        "weekday": WEEKDAYS[weekday],
+        "hour": int(hour),
+        "label": f"{WEEKDAYS[weekday]} {int(hour):02d}:00",
+        "expected_engagement": float(np.expm1(cell_mean[weekday, hour])),
+        "ci_low": float(np.expm1(cell_mean[weekday, hour] - Z_95 * cell_sd[weekday, hour])),
+        "ci_high": float(np.expm1(cell_mean[weekday, hour] + Z_95 * cell_sd[weekday, hour])),
+        "cell_posts": int(n[weekday, hour]),
+        "optimal_posting_time": f"{best_hour}:00",
+        "best_hour_expected_engagement": float(np.expm1(hour_mean[best_hour])),
+        "best_hour_ci_low": float(np.expm1(hour_mean[best_hour] - Z_95 * hour_sd[best_hour])),
+        "best_hour_ci_high": float(np.expm1(hour_mean[best_hour] + Z_95 * hour_sd[best_hour])),
+        "n_posts": int(total_n),
+    }
+    grid = {
+        "expected": np.round(np.expm1(cell_mean), 2).tolist(),
+        "ci_low": np.round(np.expm1(cell_mean - Z_95 * cell_sd), 2).tolist(),
+        "ci_high": np.round(np.expm1(cell_mean + Z_95 * cell_sd), 2).tolist(),
+    }
+    return recommendation, grid
+
+
+def fit_posting_time_model(profile_url, full=False, benchmark_data=None):
+    """
+    Fits (or incrementally refits) the posting-time model for a profile and stores it.
+
+    Incremental fits only read posts inserted after the stored watermark (the
+    largest post _id fitted so far) and add them to the stored sufficient
+    statistics. Use full=True after a re-scrape that updated engagement on
+    existing posts.
+
+    Args:
+        profile_url (str): Profile to fit
+        full (bool): Rebuild from all posts instead of only new ones
+        benchmark_data (dict, optional): Benchmarks for the prior (defaults to the latest stored)
+
+    Returns:
+        dict: The stored recommendation ({} if the profile has no usable posts)
+    """
+    existing = {} if full else get_posting_time_model(profile_url)
+    if existing and "fitted_through" not in existing:
+        existing = {}   # fitted before watermarks were stored: refit from scratch once
+    stats = _stats_from_doc(existing.get("stats"))
+    fitted_through = ObjectId(existing["fitted_through"]) if existing.get("fitted_through") else None
+
+    if full:
+        new_posts = get_posts_by_profile_url(profile_url)
+    else:
+        new_posts = get_posts_inserted_after(profile_url, fitted_through)
+
+    if new_posts.empty and existing:
+        return existing.get("recommendation", {})
+
+    accumulate_posts(stats, new_posts)
+    if '_id' in new_posts.columns and not new_posts.empty:
+        fitted_through = max(new_posts['_id'])
+
+    recommendation, grid = compute_recommendation(stats, benchmark_data or get_latest_benchmarks())
+    save_posting_time_model(profile_url, {
+        "stats": {key: value.tolist() for key, value in stats.items()},
+        "fitted_through": str(fitted_through) if fitted_through else None,
+        "recommendation": recommendation,
+        "grid": grid,
+    })
+    _recommendation_cache[profile_url] = (time.time(), recommendation)
+    return recommendation
+
+
+def get_posting_time_recommendation(profile_url, fit_if_missing=True):
+    """
+    Returns the precomputed posting-time recommendation for a profile.
+
+    Reads from an in-process cache, then from the stored model; the model is
+    only fitted here if nothing has been stored for the profile yet.
+
+    Returns:
+        dict: Recommendation (see compute_recommendation) or {} if unavailable
+    """
+    cached = _recommendation_cache.get(profile_url)
+    if cached and time.time() - cached[0] < RECOMMENDATION_TTL_SECONDS:
+        return cached[1]
+
+    # Concurrent misses for the same profile share one read (and any fit)
+    return _recommendation_flight.do((profile_url, fit_if_missing), _load_recommendation, profile_url, fit_if_missing)
+
+
+def _load_recommendation(profile_url, fit_if_missing):
+    model = get_posting_time_model(profile_url, include_stats=False)
+    recommendation = model.get("recommendation")
+    if recommendation is None:
+        recommendation = fit_posting_time_model(profile_url) if fit_if_missing else {}
+    _recommendation_cache[profile_url] = (time.time(), recommendation)
+    return recommendation
+
+
+def get_posting_time_grid(profile_url):
+    """Smoothed hour x weekday engagement grid with confidence bounds for the dashboard."""
+    return get_posting_time_model(profile_url, include_stats=False).get("grid", {})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit posting-time models for stored profiles")
+    parser.add_argument('--full', action='store_true', help="Refit from all posts instead of only new ones")
+    parser.add_argument('--profiles', nargs='*', default=None, help="Only fit these profile URLs")
+    args = parser.parse_args()
+
+    benchmark_data = get_latest_benchmarks()
+    for url in args.profiles or get_profile_urls():
+        rec = fit_posting_time_model(url, full=args.full, benchmark_data=benchmark_data)
+        print(f"  {url}: {rec.get('label', 'no data')}")
@@ -0,0 +1,233 @@
+import argparse
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from bson import ObjectId
+
+from database import (
+    get_profile_urls,
+    get_feedback_by_profile_url,
+    get_user_preference_counts,
+    increment_user_preference_counts,
+    backfill_user_preference_counts,
+    replace_user_preference_counts,
+    to_field_name,
+    from_field_name,
+)
+
+# Used until a profile has enough rated posts to learn from
+DEFAULT_PREFERENCES = {
+    'preferred_tone': 'Conversational',
+    'optimal_length': 'medium',
+    'preferred_content_types': ['professional development', 'industry trends'],
+    'hashtag_preference': True,
+}
+# Post length buckets (characters) and the generator's max_length suggested for each
+LENGTH_BUCKETS = [("short", 300), ("medium", 700), ("long", None)]
+SUGGESTED_MAX_LENGTH = {"short": 300, "medium": 500, "long": 800}
+MIN_RATINGS = 2            # ratings an option needs before it can be preferred
+TOP_TOPICS = 3
+POSITIVE_FEEDBACK = {"positive", "saved"}
+
+PREFERENCE_CACHE_MAX_ENTRIES = int(os.environ.get("PREFERENCE_CACHE_MAX_ENTRIES", 1000))
+# Entries are refreshed after this long so feedback saved by other processes is picked up
+PREFERENCE_CACHE_TTL_SECONDS = int(os.environ.get("PREFERENCE_CACHE_TTL_SECONDS", 300))
+
+# Backfill watermark of a profile that had no feedback yet
+NO_FEEDBACK_ID = ObjectId("0" * 24)
+
+_HASHTAG = re.compile(r'#\w+')
+
+
+def _length_bucket(content):
+    for name, limit in LENGTH_BUCKETS:
+        if limit is None or len(content) <= limit:
+            return name
+
+
+def _signals(feedback_doc):
+    """Counter paths a feedback document increments, or {} if it carries no rating."""
+    feedback = feedback_doc.get("feedback")
+    if feedback not in POSITIVE_FEEDBACK and feedback != "negative":
+        return {}
+    outcome = "positive" if feedback in POSITIVE_FEEDBACK else "negative"
+    content = feedback_doc.get("content") or ""
+    increments = {
+        f"lengths.{_length_bucket(content)}.{outcome}": 1,
+        f"hashtags.{'with' if _HASHTAG.search(content) else 'without'}.{outcome}": 1,
+    }
+    if feedback_doc.get("tone"):
+        increments[f"tones.{to_field_name(feedback_doc['tone'])}.{outcome}"] = 1
+    if feedback_doc.get("topic") and outcome == "positive":
+        increments[f"topics.{to_field_name(feedback_doc['topic'].strip().lower())}"] = 1
+    return increments
+
+
+def _best(options):
+    """Option with the highest smoothed approval rate among those rated at least MIN_RATINGS times."""
+    rated = {
+        name: (cells.get("positive", 0) + 1) / (cells.get("positive", 0) + cells.get("negative", 0) + 2)
+        for name, cells in (options or {}).items()
+        if cells.get("positive", 0) + cells.get("negative", 0) >= MIN_RATINGS
+    }
+    return max(rated, key=rated.get) if rated else None
+
+
+def derive_preferences(counts):
+    """
+    Learned preferences from a profile's feedback counters.
+
+    Args:
+        counts (dict): Counter document (see _signals), or None
+
+    Returns:
+        dict: DEFAULT_PREFERENCES keys, each learned value replacing the default once there
+              is enough feedback, plus 'suggested_max_length' and 'ratings'
+    """
+    counts = counts or {}
+    preferences = dict(DEFAULT_PREFERENCES)
+    tone = _best(counts.get("tones"))
+    preferences["preferred_tone"] = from_field_name(tone) if tone else preferences["preferred_tone"]
+    preferences["optimal_length"] = _best(counts.get("lengths")) or preferences["optimal_length"]
+    hashtags = counts.get("hashtags") or {}
+    if _best(hashtags):
+        preferences["hashtag_preference"] = _best(hashtags) == "with"
+    topics = sorted((counts.get("topics") or {}).items(), key=lambda item: item[1], reverse=True)
+    if topics:
+        preferences["preferred_content_types"] = [from_field_name(topic) for topic, _ in topics[:TOP_TOPICS]]
+    preferences["suggested_max_length"] = SUGGESTED_MAX_LENGTH[preferences["optimal_length"]]
+    preferences["ratings"] = sum(sum(cells.values()) for cells in (counts.get("lengths") or {}).values())
+    return preferences
+
+
+def _feedback_watermark(feedback_df):
+    """Largest feedback ObjectId included in a backfill, so later feedback is counted exactly once."""
+    if feedback_df is None or feedback_df.empty or "_id" not in feedback_df.columns:
+        return NO_FEEDBACK_ID
+    return max(feedback_df["_id"])
+
+
+def counts_from_feedback(feedback_df):
+    """Counter document built from a profile's raw feedback (same fields record_feedback maintains)."""
+    counts = {}
+    for doc in ([] if feedback_df is None or feedback_df.empty else feedback_df.to_dict(orient='records')):
+        for path, amount in _signals({k: v for k, v in doc.items() if isinstance(v, str)}).items():
+            *parents, leaf = path.split(".")
+            node = counts
+            for part in parents:
+                node = node.setdefault(part, {})
+            node[leaf] = node.get(leaf, 0) + amount
+    return counts
+
+
+class PreferenceStore:
+    """
+    Per-profile learned preferences with an in-memory LRU in front of the database.
+
+    Feedback updates the stored counters with one atomic $inc that returns the new
+    document, so concurrent sessions never overwrite each other and the cache is
+    refreshed without re-reading raw feedback. Counters are first backfilled from raw
+    feedback once per profile; the backfill records the last feedback _id it counted,
+    and increments apply only to newer feedback, so a rating saved while another
+    process backfills is counted exactly once.
+    """
+
+    def __init__(self, max_entries=PREFERENCE_CACHE_MAX_ENTRIES, ttl_seconds=PREFERENCE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()     # profile_url -> (expires_at, preferences)
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "updates": 0, "backfills": 0}
+
+    def _put(self, profile_url, counts):
+        preferences = derive_preferences(counts)
+        with self.lock:
+            self.entries[profile_url] = (time.monotonic() + self.ttl_seconds, preferences)
+            self.entries.move_to_end(profile_url)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return preferences
+
+    def _backfill(self, profile_url):
+        # Fold in feedback saved before preferences were tracked, once per profile
+        feedback_df = get_feedback_by_profile_url(profile_url)
+        counts = backfill_user_preference_counts(profile_url, counts_from_feedback(feedback_df),
+                                                 _feedback_watermark(feedback_df))
+        with self.lock:
+            self.stats["backfills"] += 1
+        return counts
+
+    def get(self, profile_url):
+        """Learned preferences of a profile (a copy, safe to modify)."""
+        with self.lock:
+            entry = self.entries.get(profile_url)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(profile_url)
+                self.stats["hits"] += 1
+                return copy.deepcopy(entry[1])
+            self.stats["misses"] += 1
+        counts = get_user_preference_counts(profile_url)
+        if not counts or not counts.get("backfilled"):
+            counts = self._backfill(profile_url)
+        return copy.deepcopy(self._put(profile_url, counts))
+
+    def record_feedback(self, feedback_doc):
+        """Updates the profile's counters with one rated feedback document (already saved, so it has an _id)."""
+        increments = _signals(feedback_doc)
+        if not increments or not feedback_doc.get("profile_url"):
+            return
+        profile_url = feedback_doc["profile_url"]
+        counts = increment_user_preference_counts(profile_url, increments, feedback_doc["_id"])
+        if counts is None:
+            # Not backfilled yet: backfill now (the raw feedback includes this document), then
+            # apply the increment in case a concurrent backfill read the feedback before it was saved
+            self._backfill(profile_url)
+            counts = increment_user_preference_counts(profile_url, increments, feedback_doc["_id"]) \
+                or get_user_preference_counts(profile_url)
+        with self.lock:
+            self.stats["updates"] += 1
+        self._put(profile_url, counts)
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, entries=len(self.entries))
+
+
+_store = PreferenceStore()
+
+
+def get_preferences(profile_url):
+    return _store.get(profile_url)
+
+
+def record_feedback(feedback_doc):
+    _store.record_feedback(feedback_doc)
+
+
+def get_preference_stats():
+    return _store.get_stats()
+
+
+def rebuild_preferences(profile_urls=None):
+    """Recomputes stored counters from raw feedback for the given profiles (all by default)."""
+    for url in profile_urls or get_profile_urls():
+        feedback_df = get_feedback_by_profile_url(url)
+        counts = replace_user_preference_counts(url, counts_from_feedback(feedback_df), _feedback_watermark(feedback_df))
+        _store._put(url, counts)
+        print(f"  ✅ {url}: {derive_preferences(counts)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-profile preferences learned from feedback")
+    parser.add_argument('--rebuild', nargs='*', default=None, help="Rebuild from raw feedback for these profile URLs (all if none given)")
+    parser.add_argument('--profile', type=str, default=None, help="Print the preferences of this profile")
+    args = parser.parse_args()
+
+    if args.rebuild is not None:
+        rebuild_preferences(args.rebuild)
+    if args.profile:
+        print(get_preferences(args.profile))
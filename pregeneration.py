@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+
+from database import get_recent_generation_requests, get_recent_feedback_topics
+from batch_generation import DEFAULT_OPTIONS, run_batch_generation
+from generation_cache import get_cache_stats, get_pregeneration_hit_rate
+
+# Maximum generation attempts (successful or not) per pre-generation run; already cached candidates cost nothing
+PREGENERATION_BUDGET = int(os.environ.get("PREGENERATION_BUDGET", 20))
+PREGENERATION_INTERVAL_SECONDS = int(os.environ.get("PREGENERATION_INTERVAL_SECONDS", 3600))
+LOOKBACK_DAYS = 14
+HALF_LIFE_DAYS = 3.0
+MIN_SCORE = 0.5
+
+# Weight of each signal: an interactive request counts fully, rated posts slightly less
+REQUEST_WEIGHT = 1.0
+FEEDBACK_WEIGHTS = {"positive": 0.8, "neutral": 0.5, "negative": 0.2}
+
+GENERATION_OPTIONS = ("include_cta", "max_length", "include_hashtags", "num_hashtags")
+
+
+def _decay(timestamp, now):
+    age_days = max(0.0, (now - pd.Timestamp(timestamp)).total_seconds() / 86400)
+    return 0.5 ** (age_days / HALF_LIFE_DAYS)
+
+
+def predict_requests(lookback_days=LOOKBACK_DAYS, min_score=MIN_SCORE, now=None):
+    """
+    Predicts likely (profile, topic, tone, options) generation requests.
+
+    Recent interactive requests and feedback on generated posts are scored with
+    exponential time decay; candidates from feedback reuse the profile's most
+    recent request options so their cache keys match what the app will send.
+
+    Returns:
+        list: Job dicts ({'profile_url', 'topic', 'options'}) with a 'score', best first
+    """
+    now = now or pd.Timestamp.now()
+    since = now - pd.Timedelta(days=lookback_days)
+    requests = sorted(get_recent_generation_requests(since), key=lambda r: r["timestamp"])
+
+    latest_options = {}
+    for request in requests:
+        latest_options[request["profile_url"]] = request.get("options") or {}
+
+    scores = {}
+
+    def add(profile_url, topic, tone, options, weight):
+        topic = (topic or "").strip()
+        if not profile_url or not topic:
+            return
+        options = dict({k: DEFAULT_OPTIONS[k] for k in GENERATION_OPTIONS}, **options, tone=tone or DEFAULT_OPTIONS["tone"])
+        key = (profile_url, topic, json.dumps(options, sort_keys=True))
+        scores[key] = scores.get(key, 0.0) + weight
+
+    for request in requests:
+        add(request["profile_url"], request.get("topic"), request.get("tone"), request.get("options") or {},
+            REQUEST_WEIGHT * _decay(request["timestamp"], now))
+    for fb in get_recent_feedback_topics(since):
+        add(fb["profile_url"], fb.get("topic"), fb.get("tone"), latest_options.get(fb["profile_url"], {}),
+            FEEDBACK_WEIGHTS.get(fb.get("feedback"), 0.5) * _decay(fb["timestamp"], now))
+
+    candidates = [
+        {"profile_url": profile_url, "topic": topic, "options": json.loads(options), "score": score}
+        for (profile_url, topic, options), score in scores.items() if score >= min_score
+    ]
+    return sorted(candidates, key=lambda c: c["score"], reverse=True)
+
+
+def run_pregeneration(budget=PREGENERATION_BUDGET, max_concurrency=4, rate_per_second=None):
+    """
+    Fills the generation cache for the most likely requests, making at most
+    `budget` generation attempts; failed attempts count too, so a failing model
+    cannot make a run walk through every candidate. Candidates are taken best
+    first; ones already cached are skipped without a model call.
+
+    Returns:
+        dict: 'candidates', 'generated', 'already_cached', 'failed' and 'seconds'
+    """
+    start = time.perf_counter()
+    candidates = predict_requests()
+    summary = {"candidates": len(candidates), "generated": 0, "already_cached": 0, "failed": 0}
+
+    position = 0
+    while position < len(candidates) and summary["generated"] + summary["failed"] < budget:
+        # Each round sends no more jobs than the remaining budget could pay for
+        chunk = candidates[position:position + budget - summary["generated"] - summary["failed"]]
+        position += len(chunk)
+        jobs = [
+            {"profile_url": c["profile_url"], "topic": c["topic"], "options": dict(c["options"], pregenerate=True)}
+            for c in chunk
+        ]
+        for result in run_batch_generation(jobs, max_concurrency, rate_per_second):
+            if result["error"]:
+                summary["failed"] += 1
+                print(f"  ❌ Pre-generation failed for {result['job']['topic']!r}: {result['error']}")
+            elif result["posts"] is None:
+                summary["already_cached"] += 1
+            else:
+                summary["generated"] += 1
+
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def run_worker(interval_seconds=PREGENERATION_INTERVAL_SECONDS, budget=PREGENERATION_BUDGET, max_concurrency=4,
+               rate_per_second=None):
+    """Runs pre-generation every interval_seconds until interrupted."""
+    while True:
+        summary = run_pregeneration(budget, max_concurrency, rate_per_second)
+        hit_rate = get_pregeneration_hit_rate()
+        print(f"[pregeneration] {summary['generated']} generated, {summary['already_cached']} already cached, "
+              f"{summary['failed']} failed of {summary['candidates']} candidates in {summary['seconds']:.1f}s; "
+              f"{hit_rate['used']}/{hit_rate['entries']} pre-generated entries used ({hit_rate['hit_rate']:.0%})")
+        time.sleep(interval_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate posts for likely topics to warm the generation cache")
+    parser.add_argument('--budget', type=int, default=PREGENERATION_BUDGET, help="Max generation attempts per run")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=None, help="Max LLM calls per second")
+    parser.add_argument('--loop', action='store_true', help="Keep running every --interval seconds")
+    parser.add_argument('--interval', type=int, default=PREGENERATION_INTERVAL_SECONDS)
+    parser.add_argument('--predict-only', action='store_true', help="Print predicted requests without generating")
+    args = parser.parse_args()
+
+    if args.predict_only:
+        for candidate in predict_requests()[:args.budget]:
+            print(f"  {candidate['score']:.2f}  {candidate['profile_url']}  {candidate['topic']!r}  {candidate['options']['tone']}")
+    elif args.loop:
+        run_worker(args.interval, args.budget, args.concurrency, args.rate)
+    else:
+        result = run_pregeneration(args.budget, args.concurrency, args.rate)
+        print(f"✅ Pre-generated {result['generated']} requests ({result['already_cached']} already cached, "
+              f"{result['failed']} failed) in {result['seconds']:.1f}s")
+        print(f"Pre-generated entries used: {get_pregeneration_hit_rate()}")
+        print(f"Cache stats (this process): {get_cache_stats()}")
@@ -0,0 +1,133 @@
+import argparse
+
+import pandas as pd
+
+from database import (
+    PROMPT_CONTEXT_SNIPPETS,
+    PROMPT_CONTEXT_SUGGESTIONS,
+    PROMPT_CONTEXT_SNIPPET_CHARS,
+    get_profile_urls,
+    get_analyses_by_profile_urls,
+    get_feedback_by_profile_urls,
+    get_prompt_contexts,
+    save_prompt_context,
+)
+from token_budget import ContextItem
+from single_flight import get_group
+
+_context_flight = get_group("prompt_context")
+
+
+def build_context_from_raw(analysis, feedback_df):
+    """
+    Builds a prompt context document from a profile's raw analysis and feedback.
+    Produces the same fields that save_feedback/save_analysis_result maintain incrementally.
+    """
+    context = {
+        "materialized": True,
+        "top_hashtags": list((analysis or {}).get("top_hashtags", {}).keys()),
+        "optimal_posting_time": (analysis or {}).get("optimal_posting_time"),
+        "liked": [],
+        "disliked": [],
+        "suggestions": [],
+        "feedback_count": 0,
+    }
+    if feedback_df is None or feedback_df.empty:
+        return context
+
+    if "timestamp" in feedback_df.columns:
+        feedback_df = feedback_df.sort_values("timestamp", kind="stable")
+    context["feedback_count"] = len(feedback_df)
+
+    for value, field in (("positive", "liked"), ("negative", "disliked")):
+        contents = feedback_df.loc[feedback_df["feedback"] == value, "content"].dropna()
+        context[field] = [c[:PROMPT_CONTEXT_SNIPPET_CHARS] for c in contents.tail(PROMPT_CONTEXT_SNIPPETS)]
+
+    if "textual_feedback" in feedback_df.columns:
+        suggestions = feedback_df["textual_feedback"].dropna().astype(str).str.strip()
+        suggestions = suggestions[suggestions != ""]
+        # First occurrence order, newest kept, matching the incremental conditional $push
+        context["suggestions"] = list(dict.fromkeys(suggestions.tolist()))[-PROMPT_CONTEXT_SUGGESTIONS:]
+
+    return context
+
+
+def rebuild_prompt_contexts(profile_urls):
+    """Rebuilds and stores contexts for many profiles from raw data using two bulk reads."""
+    profile_urls = list(profile_urls)
+    analyses = get_analyses_by_profile_urls(profile_urls)
+    feedback = get_feedback_by_profile_urls(profile_urls)
+    contexts = {}
+    for url in profile_urls:
+        contexts[url] = build_context_from_raw(analyses.get(url), feedback.get(url, pd.DataFrame()))
+        save_prompt_context(url, contexts[url])
+    return contexts
+
+
+def get_contexts(profile_urls):
+    """
+    Returns the materialized prompt context for each profile.
+
+    Profiles whose context was never fully built (no document yet, or one only
+    created by incremental updates) are rebuilt from raw data once.
+    """
+    contexts = get_prompt_contexts(profile_urls)
+    missing = [url for url in profile_urls if not contexts.get(url, {}).get("materialized")]
+    if missing:
+        contexts.update(rebuild_prompt_contexts(missing))
+    return contexts
+
+
+def get_context(profile_url):
+    # Concurrent generations for the same profile share one read (and any rebuild)
+    return _context_flight.do(profile_url, lambda: get_contexts([profile_url])[profile_url])
+
+
+# Relative value of each kind of feedback context in a prompt; older entries decay
+SUGGESTION_VALUE = 4.0
+LIKED_VALUE = 3.0
+DISLIKED_VALUE = 2.5
+AGE_DECAY = 0.7
+
+
+def feedback_context_items(context):
+    """
+    Turns a context document into ContextItems ranked by expected value, so the
+    prompt can be packed within a token budget (newest entries are worth most).
+    """
+    items = []
+    for section, field, value in (("liked", "liked", LIKED_VALUE),
+                                  ("disliked", "disliked", DISLIKED_VALUE),
+                                  ("suggestions", "suggestions", SUGGESTION_VALUE)):
+        entries = context.get(field, [])
+        for position, entry in enumerate(entries):
+            age = len(entries) - 1 - position
+            text = f"- {entry}...\n" if section != "suggestions" else f"- {entry}\n"
+            items.append(ContextItem(section, text, value * AGE_DECAY ** age))
+    return items
+
+
+def format_feedback_insights(context, items):
+    """Renders the feedback section of the generation prompt from the selected context items."""
+    if not context.get("feedback_count"):
+        return ""
+
+    by_section = {"liked": [], "disliked": [], "suggestions": []}
+    for item in items:
+        if item.section in by_section:
+            by_section[item.section].append(item.text)
+
+    feedback_insights = "\nUser prefers content like:\n" + "".join(by_section["liked"])
+    if by_section["disliked"]:
+        feedback_insights += "\nAvoid content like:\n" + "".join(by_section["disliked"])
+    if by_section["suggestions"]:
+        feedback_insights += "\nDirect user suggestions:\n" + "".join(by_section["suggestions"])
+    return feedback_insights
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild materialized prompt contexts from raw feedback/analysis")
+    parser.add_argument('--profiles', nargs='*', default=None, help="Only rebuild these profile URLs")
+    args = parser.parse_args()
+    rebuilt = rebuild_prompt_contexts(args.profiles or get_profile_urls())
+    print(f"✅ Rebuilt prompt context for {len(rebuilt)} profiles.")
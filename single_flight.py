@@ -0,0 +1,107 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for a key is in flight,
+    other callers with the same key wait for it and share its result (or its
+    exception) instead of running the function again. Nothing is cached after
+    the call completes.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"calls": 0, "executed": 0, "coalesced": 0, "errors": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs) unless a call with the same key is already running.
+
+        Args:
+            key (hashable): Identity of the request (e.g. the generation cache key)
+            fn (callable): Function producing the result
+
+        Returns:
+            The result of the single in-flight call for this key
+        """
+        leader, call = self.try_lead(key)
+        if not leader:
+            return self.wait(call)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.complete(key, call, error=e)
+            raise
+        self.complete(key, call, result)
+        return result
+
+    def try_lead(self, key):
+        """
+        Registers the caller as the key's leader unless a call is already in flight.
+        For callers that produce the result incrementally (e.g. a token stream) instead of in one function call.
+
+        Returns:
+            tuple: (True, call) for the leader, who must pass call to complete() when done,
+                   or (False, call) for a follower, who passes it to wait()
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self._stats["executed"] += 1
+                return True, call
+            self._stats["coalesced"] += 1
+            return False, call
+
+    def complete(self, key, call, result=None, error=None):
+        """Publishes the leader's result (or exception) to the waiting followers."""
+        call.result, call.error = result, error
+        with self._lock:
+            if error is not None:
+                self._stats["errors"] += 1
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.done.set()
+
+    @staticmethod
+    def wait(call):
+        """Waits for a leader's call and returns its result, or raises its exception."""
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats, in_flight=len(self._calls))
+        stats["coalesced_rate"] = stats["coalesced"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def get_group(name):
+    """Returns the process-wide SingleFlight group with this name, creating it on first use."""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+
+def get_single_flight_stats():
+    """Telemetry for every group: calls, executed, coalesced, errors, in_flight and coalesced_rate."""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.get_stats() for group in groups}
@@ -0,0 +1,148 @@
+import hashlib
+import math
+
+import numpy as np
+
+
+def _hash64(item, seed=0):
+    """Stable 64-bit hash (Python's hash() is randomized per process, so it cannot be persisted)."""
+    digest = hashlib.blake2b(str(item).encode('utf-8'), digest_size=8, salt=seed.to_bytes(8, 'little')).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters summary: tracks at most `capacity` items and
+    guarantees every item with frequency above total/capacity is present.
+    Counts are overestimates by at most the stored error.
+    """
+
+    def __init__(self, capacity=200):
+        self.capacity = capacity
+        self.counters = {}  # item -> [count, error]
+        self.total = 0
+
+    def add(self, item, count=1):
+        self.total += count
+        if item in self.counters:
+            self.counters[item][0] += count
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [count, 0]
+        else:
+            victim = min(self.counters, key=lambda key: self.counters[key][0])
+            min_count = self.counters.pop(victim)[0]
+            self.counters[item] = [min_count + count, min_count]
+
+    def _floor(self):
+        # Untracked items in a full summary may have occurred up to the minimum count
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def merge(self, other):
+        """Merges another summary into this one (mergeable summaries, Agarwal et al. 2012)."""
+        floor_self, floor_other = self._floor(), other._floor()
+        merged = {}
+        for item in set(self.counters) | set(other.counters):
+            count_a, error_a = self.counters.get(item, [floor_self, floor_self])
+            count_b, error_b = other.counters.get(item, [floor_other, floor_other])
+            merged[item] = [count_a + count_b, error_a + error_b]
+        top = sorted(merged.items(), key=lambda kv: kv[1][0], reverse=True)[:self.capacity]
+        self.counters = {item: counts for item, counts in top}
+        self.total += other.total
+        return self
+
+    def top_k(self, k=10):
+        """Returns [(item, estimated_count, max_error)] sorted by estimated count."""
+        ranked = sorted(self.counters.items(), key=lambda kv: kv[1][0], reverse=True)[:k]
+        return [(item, count, error) for item, (count, error) in ranked]
+
+    def to_dict(self):
+        return {
+            "capacity": self.capacity,
+            "total": self.total,
+            "counters": [[item, count, error] for item, (count, error) in self.counters.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data.get("capacity", 200))
+        summary.total = data.get("total", 0)
+        summary.counters = {item: [count, error] for item, count, error in data.get("counters", [])}
+        return summary
+
+
+class CountMinSketch:
+    """Count-Min sketch for frequency estimates of arbitrary items (never underestimates)."""
+
+    def __init__(self, width=2048, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.uint32)
+
+    def _indexes(self, item):
+        return [_hash64(item, seed=row) % self.width for row in range(self.depth)]
+
+    def add(self, item, count=1):
+        for row, index in enumerate(self._indexes(item)):
+            self.table[row, index] += count
+
+    def estimate(self, item):
+        return int(min(self.table[row, index] for row, index in enumerate(self._indexes(item))))
+
+    def merge(self, other):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Cannot merge Count-Min sketches with different dimensions")
+        self.table += other.table
+        return self
+
+    def to_dict(self):
+        return {"width": self.width, "depth": self.depth, "table": self.table.tobytes()}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data.get("width", 2048), data.get("depth", 4))
+        if data.get("table"):
+            sketch.table = np.frombuffer(bytes(data["table"]), dtype=np.uint32).reshape(sketch.depth, sketch.width).copy()
+        return sketch
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter; 2**precision one-byte registers (~1.04 / sqrt(m) relative error)."""
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add(self, item):
+        x = _hash64(item)
+        index = x >> (64 - self.precision)
+        remaining = x & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.power(2.0, -self.registers.astype(float)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+    def merge(self, other):
+        if self.precision != other.precision:
+            raise ValueError("Cannot merge HyperLogLogs with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def to_dict(self):
+        return {"precision": self.precision, "registers": self.registers.tobytes()}
+
+    @classmethod
+    def from_dict(cls, data):
+        hll = cls(data.get("precision", 12))
+        if data.get("registers"):
+            hll.registers = np.frombuffer(bytes(data["registers"]), dtype=np.uint8).copy()
+        return hll
@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+# Modules imported by the app shell and by each page of app.py (see the page branches there)
+APP_SHELL = ["streamlit", "pandas", "numpy", "database", "data_cache", "change_feed"]
+PAGE_IMPORTS = {
+    "Profile Analysis": [],
+    "Content Insights": ["posting_time_model", "charts", "analysis_jobs"],
+    "Post Generator": ["content_generator", "generation_cache", "single_flight", "preference_store"],
+    "Feedback Dashboard": ["matplotlib.pyplot", "feedback_rollups"],
+}
+
+_IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def profile_imports(modules, preloaded=()):
+    """
+    Imports modules in a fresh interpreter with `-X importtime`.
+
+    Args:
+        modules (list): Modules whose import cost is measured
+        preloaded (list): Modules imported first and excluded from the measurement
+
+    Returns:
+        dict: 'seconds' (wall time for importing modules), 'modules' (per-module
+              self/cumulative microseconds, slowest first) and 'error' if the import failed
+    """
+    code = (
+        "import time\n"
+        + "".join(f"import {m}\n" for m in preloaded)
+        + "import sys; sys.stderr.write('--- measure ---\\n'); start = time.perf_counter()\n"
+        + "".join(f"import {m}\n" for m in modules)
+        + "print(time.perf_counter() - start)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        return {"seconds": None, "modules": [], "error": result.stderr.strip().splitlines()[-1:]}
+
+    timings = []
+    stderr = result.stderr.split('--- measure ---', 1)[-1]
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            timings.append({"module": name, "self_us": int(self_us), "cumulative_us": int(cumulative_us),
+                            "depth": len(indent) // 2})
+    timings.sort(key=lambda t: t["cumulative_us"], reverse=True)
+    return {"seconds": float(result.stdout.strip().splitlines()[-1]), "modules": timings, "error": None}
+
+
+def startup_report(top=10):
+    """Import cost of the app shell and of each page on top of it, as on a cold start."""
+    report = {"App shell": profile_imports(APP_SHELL)}
+    for page, modules in PAGE_IMPORTS.items():
+        report[page] = profile_imports(modules, preloaded=APP_SHELL) if modules else {"seconds": 0.0, "modules": [], "error": None}
+    for entry in report.values():
+        entry["modules"] = entry["modules"][:top]
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time profile of the Streamlit app's cold start")
+    parser.add_argument('--top', type=int, default=10, help="Slowest modules to list per page")
+    parser.add_argument('--json', type=str, default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    startup = startup_report(args.top)
+    for name, entry in startup.items():
+        if entry["error"]:
+            print(f"{name}: import failed: {entry['error']}")
+            continue
+        print(f"{name}: {entry['seconds'] * 1000:.0f} ms")
+        for timing in entry["modules"]:
+            print(f"    {timing['cumulative_us'] / 1000:8.1f} ms  {'  ' * timing['depth']}{timing['module']}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(startup, f, indent=2)
@@ -0,0 +1,61 @@
+import json
+
+import content_generator
+from batch_generation import RateLimitedBackend, RateLimiter, is_transient_error
+from llm_client import LLMBackend, StubBackend
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+
+
+class OneBadAnswerBackend(LLMBackend):
+    """Answers with unparseable text first and with valid posts after that."""
+
+    name = "scripted"
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt, model_name, generation_config):
+        self.calls += 1
+        if self.calls == 1:
+            return "Sorry, here you go: [3]"
+        return json.dumps({"posts": [{"content": f"Post {i} about leadership and teams.", "estimated_engagement": 50}
+                                     for i in range(3)]})
+
+
+def test_every_model_call_takes_a_token_including_re_asks():
+    limiter = CountingLimiter()
+    backend = RateLimitedBackend(OneBadAnswerBackend(), limiter)
+    posts = content_generator._generate_validated("prompt", backend, {})
+    assert len(posts) == 3
+    assert limiter.acquired == backend.backend.calls == 2
+
+
+def test_wrapper_keeps_the_cache_key_and_streams():
+    limiter = CountingLimiter()
+    backend = RateLimitedBackend(StubBackend(), limiter)
+    assert backend.name == "stub"
+    assert "posts" in "".join(backend.stream("Write 3 LinkedIn posts about AI. ", "model", {}))
+    assert limiter.acquired == 1
+
+
+def test_rate_limiter_allows_a_burst_then_waits():
+    limiter = RateLimiter(rate=1000, burst=2)
+    for _ in range(3):
+        limiter.acquire()
+    assert limiter.tokens < 1
+
+
+def test_transient_errors_are_recognised_by_name():
+    class ResourceExhausted(Exception):
+        pass
+
+    assert is_transient_error(ResourceExhausted())
+    assert is_transient_error(TimeoutError())
+    assert not is_transient_error(ValueError())
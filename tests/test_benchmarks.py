@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+import benchmarks
+from database import from_field_name
+
+
+def _posts(engagements, hashtags=None):
+    return pd.DataFrame({
+        "engagement": engagements,
+        "type": ["Text"] * len(engagements),
+        "time": ["09:00"] * len(engagements),
+        "hashtags_list": hashtags or [[] for _ in engagements],
+    })
+
+
+def test_summaries_have_a_fixed_size():
+    summary = benchmarks._summarize(np.arange(10_000))
+    assert summary["n"] == 10_000
+    assert len(summary["quantiles"]) == benchmarks.QUANTILE_POINTS
+    assert summary["p50"] == 4999.5
+
+
+def test_percentile_rank_interpolates_between_quantiles():
+    values = np.random.default_rng(0).lognormal(3, 1, 5000)
+    quantiles = benchmarks._summarize(values)["quantiles"]
+    for value in np.percentile(values, [5, 37, 50, 88]):
+        exact = (values <= value).mean() * 100
+        assert abs(benchmarks._percentile_rank(quantiles, value) - exact) < 1
+    assert benchmarks._percentile_rank(quantiles, values.min() - 1) == 0
+    assert benchmarks._percentile_rank(quantiles, values.max()) == 100
+    # Benchmarks stored before quantiles held every sorted peer value
+    assert benchmarks._percentile_rank([1.0, 2.0, 3.0, 4.0, 5.0], 3.0) == 50
+
+
+def test_profile_is_ranked_against_merged_peers():
+    partials = [benchmarks.compute_profile_aggregates(f"p{i}", _posts([i * 10, i * 10]), followers="1,000")
+                for i in range(1, 6)]
+    data = {"benchmarks": benchmarks.merge_profile_aggregates(partials)}
+    assert data["benchmarks"]["avg_engagement"]["p50"] == 30
+
+    ranking = benchmarks.rank_profile_against_peers("me", _posts([30, 30]), followers=1000, benchmark_data=data)
+    assert ranking["avg_engagement"]["percentile_rank"] == 50
+    assert ranking["engagement_by_type"]["Text"]["peer_median"] == 30
+
+
+def test_keys_are_escaped_with_the_shared_field_name_helper():
+    aggregates = benchmarks.compute_profile_aggregates("p", _posts([5], [["#web3.0", "$money"]]))
+    keys = aggregates["engagement_by_hashtag"]
+    assert not any("." in key or key.startswith("$") for key in keys)
+    assert sorted(from_field_name(key) for key in keys) == ["#web3.0", "$money"]
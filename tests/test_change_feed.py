@@ -0,0 +1,27 @@
+from bson import ObjectId
+
+import change_feed
+
+
+def test_poll_drains_a_backlog_larger_than_one_page(monkeypatch):
+    posts = [{"_id": ObjectId(), "profile_url": "p"} for _ in range(25)]
+    first_id = min(doc["_id"] for doc in posts)
+
+    def find_inserted_since(collection, since, projection=None, limit=1000, after_id=None):
+        docs = posts if collection == change_feed.POSTS_COLLECTION else []
+        docs = [d for d in sorted(docs, key=lambda d: d["_id"]) if after_id is None or d["_id"] > after_id]
+        return docs[:limit]
+
+    log = change_feed.ChangeLog()
+    monkeypatch.setattr(change_feed, "_log", log)
+    monkeypatch.setattr(change_feed, "POLL_PAGE_SIZE", 10)
+    monkeypatch.setattr(change_feed, "find_inserted_since", find_inserted_since)
+    monkeypatch.setattr(change_feed.data_cache, "invalidate", lambda profile_url: None)
+
+    now = first_id.generation_time
+    watermarks = {collection: now for collection in change_feed.WATCHED_FIELDS}
+    seen = {collection: set() for collection in change_feed.WATCHED_FIELDS}
+    assert change_feed.poll_once(watermarks, seen) == 25
+    assert change_feed.poll_once(watermarks, seen) == 0
+    events, seq = log.since("p", 0)
+    assert len(events) == 25 and seq == 25
@@ -0,0 +1,136 @@
+import threading
+import time
+
+import content_generator
+
+
+def test_near_duplicates_of_disliked_content_are_never_cached(monkeypatch):
+    batches = iter([
+        [{"content": "a1"}, {"content": "a2"}],
+        [{"content": "b1"}, {"content": "b2"}],
+        [{"content": "c1"}, {"content": "c2"}],
+    ])
+    similarity = {"a1": 0.9, "a2": 0.75, "b1": 0.8, "b2": 0.95, "c1": 0.72, "c2": 0.85}
+    cached = []
+    monkeypatch.setattr(content_generator, "DUPLICATE_REGENERATION_ATTEMPTS", 2)
+    monkeypatch.setattr(content_generator, "_generate_validated", lambda *args: next(batches))
+    monkeypatch.setattr(content_generator, "is_similar_to_disliked", lambda url, content: True)
+    monkeypatch.setattr(content_generator, "disliked_similarity", lambda url, content: similarity[content])
+    monkeypatch.setattr(content_generator.generation_cache, "get", lambda key: None)
+    monkeypatch.setattr(content_generator.generation_cache, "put", lambda *args: cached.append(args))
+
+    posts = content_generator._lookup_or_generate("url", "topic", "tone", "prompt", None, {}, "key", False, False)
+
+    assert [p["content"] for p in posts] == ["c1", "a2", "b1"]
+    assert cached == []
+
+
+def test_fresh_variations_are_cached(monkeypatch):
+    cached = []
+    monkeypatch.setattr(content_generator, "_generate_validated", lambda *args: [{"content": "x"}, {"content": "y"}])
+    monkeypatch.setattr(content_generator, "is_similar_to_disliked", lambda url, content: content == "x")
+    monkeypatch.setattr(content_generator.generation_cache, "get", lambda key: None)
+    monkeypatch.setattr(content_generator.generation_cache, "put", lambda key, posts, meta: cached.append(posts))
+
+    posts = content_generator._lookup_or_generate("url", "topic", "tone", "prompt", None, {}, "key", False, False)
+
+    assert posts == [{"content": "y"}]
+    assert cached == [[{"content": "y"}]]
+
+
+def test_pregeneration_and_interactive_requests_share_one_call(monkeypatch):
+    calls = []
+
+    def slow_generation(*args):
+        calls.append(1)
+        time.sleep(0.2)
+        return [{"content": "fresh"}]
+
+    monkeypatch.setattr(content_generator, "build_prompt", lambda *args, **kwargs: "prompt")
+    monkeypatch.setattr(content_generator, "_generate_validated", slow_generation)
+    monkeypatch.setattr(content_generator, "is_similar_to_disliked", lambda url, content: False)
+    monkeypatch.setattr(content_generator.generation_cache, "contains", lambda key: False)
+    monkeypatch.setattr(content_generator.generation_cache, "get", lambda key: None)
+    monkeypatch.setattr(content_generator.generation_cache, "put", lambda *args: None)
+    backend = type("Backend", (), {"name": "fake"})()
+
+    results = {}
+    pregenerate = threading.Thread(target=lambda: results.setdefault("pregenerate", content_generator.generate_post_variations(
+        "url", "topic", pregenerate=True, backend=backend)))
+    pregenerate.start()
+    time.sleep(0.05)
+    results["interactive"] = content_generator.generate_post_variations("url", "topic", backend=backend)
+    pregenerate.join()
+
+    assert len(calls) == 1
+    assert results == {"pregenerate": [{"content": "fresh"}], "interactive": [{"content": "fresh"}]}
+
+
+def test_feedback_is_saved_when_a_derived_update_fails(monkeypatch):
+    saved, indexed = [], []
+    monkeypatch.setattr(content_generator, "save_feedback", saved.append)
+    monkeypatch.setattr(content_generator.data_cache, "invalidate", lambda url: None)
+    monkeypatch.setattr(content_generator.preference_store, "record_feedback", lambda doc: None)
+    monkeypatch.setattr(content_generator, "index_feedback", lambda doc: None)
+    monkeypatch.setattr(content_generator.vector_index, "index_feedback", indexed.append)
+
+    def broken(doc):
+        raise RuntimeError("sketch update failed")
+
+    monkeypatch.setattr(content_generator, "record_feedback_topic", broken)
+
+    failed = content_generator.save_post_feedback("post", "positive", "url")
+
+    assert failed == ["trending"]
+    assert len(saved) == 1
+    assert len(indexed) == 1                                     # later updates still run
+
+
+def test_fallback_offers_each_rejected_text_once(monkeypatch):
+    monkeypatch.setattr(content_generator, "DUPLICATE_REGENERATION_ATTEMPTS", 1)
+    monkeypatch.setattr(content_generator, "_generate_validated",
+                        lambda *args: [{"content": "Variation 3"}, {"content": "Variation 1"}])
+    monkeypatch.setattr(content_generator, "is_similar_to_disliked", lambda url, content: True)
+    monkeypatch.setattr(content_generator, "disliked_similarity", lambda url, content: {"Variation 3": 0.7}.get(content, 0.9))
+    monkeypatch.setattr(content_generator.generation_cache, "get", lambda key: None)
+
+    posts = content_generator._lookup_or_generate("url", "topic", "tone", "prompt", None, {}, "key", False, False)
+
+    assert [p["content"] for p in posts] == ["Variation 3", "Variation 1"]
+
+
+def _streaming(monkeypatch, text, cached):
+    backend = type("Backend", (), {"name": "fake", "stream": lambda self, prompt, model, config: iter([text])})()
+    monkeypatch.setattr(content_generator, "get_backend", lambda: backend)
+    monkeypatch.setattr(content_generator, "build_prompt", lambda *args, **kwargs: "prompt")
+    monkeypatch.setattr(content_generator, "record_usage", lambda *args, **kwargs: None)
+    monkeypatch.setattr(content_generator.generation_cache, "record_request", lambda doc: None)
+    monkeypatch.setattr(content_generator.generation_cache, "get", lambda key: None)
+    monkeypatch.setattr(content_generator.generation_cache, "put", lambda key, posts, meta: cached.append(posts))
+
+
+def test_stream_regenerates_when_every_variation_resembles_disliked_content(monkeypatch):
+    cached = []
+    _streaming(monkeypatch, '{"posts": [{"content": "disliked a"}, {"content": "disliked b"}]}', cached)
+    monkeypatch.setattr(content_generator, "_validate_response", lambda *args: [])
+    monkeypatch.setattr(content_generator, "_generate_validated", lambda *args: [{"content": "new"}])
+    monkeypatch.setattr(content_generator, "is_similar_to_disliked", lambda url, content: content.startswith("disliked"))
+
+    posts = list(content_generator.stream_post_variations("url", "topic"))
+
+    assert [p["content"] for p in posts] == ["new"]
+    assert cached == [posts]
+
+
+def test_stream_falls_back_to_the_least_similar_variations(monkeypatch):
+    cached = []
+    _streaming(monkeypatch, '{"posts": [{"content": "a"}, {"content": "b"}]}', cached)
+    monkeypatch.setattr(content_generator, "_validate_response", lambda *args: [])
+    monkeypatch.setattr(content_generator, "_generate_validated", lambda *args: [{"content": "b"}, {"content": "c"}])
+    monkeypatch.setattr(content_generator, "is_similar_to_disliked", lambda url, content: True)
+    monkeypatch.setattr(content_generator, "disliked_similarity", lambda url, content: {"a": 0.9, "b": 0.7, "c": 0.8}[content])
+
+    posts = list(content_generator.stream_post_variations("url", "topic"))
+
+    assert [p["content"] for p in posts] == ["b", "c", "a"][:content_generator.NUM_VARIATIONS]
+    assert cached == []
@@ -0,0 +1,32 @@
+import data_cache
+
+
+def test_entries_are_bounded_least_recently_used_first(monkeypatch):
+    monkeypatch.setattr(data_cache, "DATA_CACHE_MAX_ENTRIES", 3)
+    data_cache.invalidate()
+    loads = []
+
+    def load(n):
+        loads.append(n)
+        return n
+
+    for n in range(3):
+        data_cache.cached_read("item", "scope", load, n)
+    data_cache.cached_read("item", "scope", load, 0)    # 0 is now the most recently used
+    data_cache.cached_read("item", "scope", load, 3)    # evicts 1
+    assert len(data_cache._entries) == 3
+
+    loads.clear()
+    for n in (0, 2, 3, 1):
+        data_cache.cached_read("item", "scope", load, n)
+    assert loads == [1]
+    assert data_cache.get_data_cache_stats()["evictions"] >= 2
+
+
+def test_invalidate_drops_only_the_profile_and_shared_reads():
+    data_cache.invalidate()
+    data_cache.cached_read("posts", "a", lambda: "a")
+    data_cache.cached_read("posts", "b", lambda: "b")
+    data_cache.cached_read("profiles", data_cache.ALL_PROFILES, lambda: "all")
+    data_cache.invalidate("a")
+    assert [key[1] for key in data_cache._entries] == ["b"]
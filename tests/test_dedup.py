@@ -0,0 +1,24 @@
+import dedup
+from dedup import band_keys, estimated_jaccard, minhash_signature
+
+POST = ("Leadership is not about having every answer. It is about asking better questions, "
+        "listening to your team and making room for them to grow. What did your best manager do differently?")
+
+
+def test_near_duplicates_score_high_and_share_a_band():
+    edited = POST.replace("best manager", "best boss")
+    a, b = minhash_signature(POST), minhash_signature(edited)
+    assert estimated_jaccard(a, b) >= 0.5
+    assert set(band_keys(a)) & set(band_keys(b))
+
+
+def test_unrelated_texts_score_low():
+    other = "Quarterly results are in: revenue grew twelve percent while churn fell to a record low this spring."
+    assert estimated_jaccard(minhash_signature(POST), minhash_signature(other)) < 0.2
+
+
+def test_disliked_similarity_is_the_best_match(monkeypatch):
+    monkeypatch.setattr(dedup, "find_near_duplicates",
+                        lambda text, threshold, **filters: [{"similarity": 0.8}, {"similarity": 0.4}] if text == "dup" else [])
+    assert dedup.disliked_similarity("url", "dup") == 0.8
+    assert dedup.disliked_similarity("url", "new") == 0.0
@@ -0,0 +1,70 @@
+import mongomock
+import pandas as pd
+import pytest
+
+import database
+
+
+@pytest.fixture(autouse=True)
+def mongo(monkeypatch):
+    monkeypatch.setattr(database, "db", mongomock.MongoClient().db)
+
+
+def _feedback(day, feedback="positive", topic="AI"):
+    return {"profile_url": "p", "timestamp": pd.Timestamp(day).to_pydatetime(), "feedback": feedback, "topic": topic}
+
+
+def test_incremental_rollups_match_a_rebuild():
+    for doc in [_feedback("2026-01-01"), _feedback("2026-01-01", "negative"), _feedback("2026-01-02", topic="Career")]:
+        database.db[database.FEEDBACK_COLLECTION].insert_one(dict(doc))
+        database.update_feedback_rollup(doc)
+    incremental, backfilled = database.get_feedback_rollups("p")
+    assert not backfilled
+
+    database.rebuild_feedback_rollups("p")
+    rebuilt, backfilled = database.get_feedback_rollups("p")
+    assert backfilled
+    assert [(d["date"], d["total"], d["counts"], d["topics"]) for d in rebuilt] == \
+           [(d["date"], d["total"], d["counts"], d["topics"]) for d in incremental]
+
+
+def test_rebuild_replaces_days_in_place_and_drops_empty_ones():
+    database.db[database.FEEDBACK_COLLECTION].insert_one(_feedback("2026-01-01"))
+    database.update_feedback_rollup(_feedback("2025-12-31"))     # no raw feedback on this day
+    database.rebuild_feedback_rollups("p")
+    database.rebuild_feedback_rollups("p")                       # meta and days are upserted, not duplicated
+    days, _ = database.get_feedback_rollups("p")
+    assert [(d["date"], d["total"]) for d in days] == [("2026-01-01", 1)]
+    assert database.db[database.FEEDBACK_ROLLUPS_COLLECTION].count_documents({"kind": "meta"}) == 1
+
+
+def _save(doc):
+    database.db[database.FEEDBACK_COLLECTION].insert_one(doc)    # sets doc["_id"], as save_feedback does
+    database.update_feedback_rollup(doc)
+
+
+def test_increment_during_a_rebuild_is_not_lost(monkeypatch):
+    _save(_feedback("2026-01-01"))
+    aggregate = database._aggregate_feedback_days
+    live = [_feedback("2026-01-01", "negative")]
+
+    def aggregate_then_save(profile_url):
+        result = aggregate(profile_url)
+        if live:
+            _save(live.pop())                                    # lands between the aggregation and the replace
+        return result
+
+    monkeypatch.setattr(database, "_aggregate_feedback_days", aggregate_then_save)
+    database.rebuild_feedback_rollups("p")
+    days, _ = database.get_feedback_rollups("p")
+    assert [(d["date"], d["total"], d["counts"]) for d in days] == [("2026-01-01", 2, {"positive": 1, "negative": 1})]
+
+
+def test_increment_for_feedback_a_rebuild_counted_is_skipped():
+    late = _feedback("2026-01-01")
+    database.db[database.FEEDBACK_COLLECTION].insert_one(late)  # its increment arrives after the rebuild
+    database.rebuild_feedback_rollups("p")
+    database.update_feedback_rollup(late)
+    _save(_feedback("2026-01-01", "negative"))
+    days, _ = database.get_feedback_rollups("p")
+    assert [(d["total"], d["counts"]) for d in days] == [(2, {"positive": 1, "negative": 1})]
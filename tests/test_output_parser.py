@@ -0,0 +1,47 @@
+import pytest
+
+from output_parser import IncrementalPostParser, OutputParseError, extract_json, parse_posts
+
+POSTS = '{"posts": [{"content": "First post", "estimated_engagement": 70}, {"content": "Second post"}]}'
+
+
+def test_prefers_posts_document_over_earlier_json_like_text():
+    result = parse_posts('Here are [3] posts:\n' + POSTS)
+    assert [p["content"] for p in result.posts] == ["First post", "Second post"]
+    assert result.errors == []
+
+
+def test_bare_list_of_posts_is_accepted():
+    value, repaired, truncated = extract_json('```json\n[{"content": "A"}]\n```')
+    assert value == [{"content": "A"}] and not repaired and not truncated
+
+
+def test_repairs_trailing_commas_and_raw_newlines():
+    result = parse_posts('{"posts": [{"content": "Line one\nLine two",},]}')
+    assert result.repaired
+    assert result.posts[0]["content"] == "Line one\nLine two"
+
+
+def test_truncated_output_keeps_completed_variations():
+    result = parse_posts('{"posts": [{"content": "Done"}, {"content": "Cut of')
+    assert [p["content"] for p in result.posts] == ["Done"]
+    assert any("cut off" in e for e in result.errors)
+
+
+def test_invalid_variation_is_reported_and_defaults_applied():
+    result = parse_posts('{"posts": [{"content": "Ok"}, {"estimated_engagement": 5}]}')
+    assert result.posts == [{"content": "Ok", "estimated_engagement": 50}]
+    assert result.errors and result.errors[0].startswith("variation 2")
+
+
+def test_no_json_raises():
+    with pytest.raises(OutputParseError):
+        parse_posts("Sorry, I can't help with that.")
+
+
+def test_incremental_parser_ignores_braces_inside_strings():
+    parser = IncrementalPostParser()
+    completed = []
+    for chunk in ['{"posts": [{"content": "use {braces', '} freely"}, ', '{"content": "two"}]}']:
+        completed += parser.feed(chunk)
+    assert [c["content"] for c in completed] == ["use {braces} freely", "two"]
@@ -0,0 +1,59 @@
+import glob
+import os
+
+import pyarrow.parquet as pq
+
+import parquet_export
+from parquet_export import POSTS_SCHEMA, _PartitionWriter, _publish
+
+
+def _post(i, profile="a"):
+    return {"profile_url": f"https://www.linkedin.com/in/{profile}/", "date": "2024-01-15", "content": f"post {i}", "likes": i}
+
+
+def test_writer_streams_row_groups_and_rolls_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(parquet_export, "ROW_GROUP_ROWS", 3)
+    monkeypatch.setattr(parquet_export, "MAX_BUFFERED_ROWS", 5)
+    monkeypatch.setattr(parquet_export, "ROWS_PER_FILE", 4)
+    writer = _PartitionWriter(str(tmp_path), POSTS_SCHEMA, "run")
+    for i in range(10):
+        writer.add(("a", "2024-01"), _post(i))
+        writer.add(("b", "2024-01"), _post(i, "b"))
+        assert writer.buffered < 5
+    assert writer.close() == 20
+
+    files = sorted(glob.glob(str(tmp_path / "profile=a" / "month=2024-01" / "*.parquet")))
+    assert [pq.read_metadata(f).num_rows for f in files] == [4, 4, 2]
+    assert pq.read_table(str(tmp_path / "profile=a")).column("likes").to_pylist() == list(range(10))
+
+
+def test_publish_resumes_a_partial_move(tmp_path):
+    staging, target = tmp_path / "_staging" / "posts", tmp_path / "posts"
+    writer = _PartitionWriter(str(staging), POSTS_SCHEMA, "run")
+    writer.add(("a", "2024-01"), _post(1))
+    writer.add(("b", "2024-01"), _post(2, "b"))
+    writer.close()
+    # Simulate a crash after the first file was moved
+    first = glob.glob(str(staging / "profile=a" / "*" / "*.parquet"))[0]
+    os.makedirs(target / "profile=a" / "month=2024-01")
+    os.replace(first, target / "profile=a" / "month=2024-01" / os.path.basename(first))
+
+    assert _publish(str(staging), str(target)) == 1
+    assert pq.read_table(str(target)).num_rows == 2
+    assert not staging.exists()
+
+
+def test_writer_caps_open_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(parquet_export, "ROW_GROUP_ROWS", 1)
+    monkeypatch.setattr(parquet_export, "MAX_OPEN_WRITERS", 2)
+    writer = _PartitionWriter(str(tmp_path), POSTS_SCHEMA, "run")
+    for i in range(3):
+        for profile in "abc":
+            writer.add((profile, "2024-01"), _post(i, profile))
+            assert len(writer.writers) <= 2
+    assert writer.close() == 9
+
+    # Each partition reopened after being closed continues in a new file
+    for profile in "abc":
+        assert pq.read_table(str(tmp_path / f"profile={profile}")).column("likes").to_pylist() == [0, 1, 2]
+    assert len(glob.glob(str(tmp_path / "profile=a" / "month=2024-01" / "*.parquet"))) == 3
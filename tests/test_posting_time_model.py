@@ -0,0 +1,50 @@
+import mongomock
+import numpy as np
+import pandas as pd
+import pytest
+
+import database
+import posting_time_model
+from posting_time_model import DEFAULT_PRIOR_STRENGTH, _empty_stats, _posterior, accumulate_posts, compute_recommendation
+
+
+def _posts(rows):
+    """rows: (date, hour, engagement)"""
+    return pd.DataFrame([{"date": date, "time": f"{hour}:00", "engagement": engagement} for date, hour, engagement in rows])
+
+
+def test_weak_default_prior_when_cells_do_not_vary():
+    n, s = np.array([2.0, 2.0]), np.array([2.0, 2.0])
+    mean, _ = _posterior(n, s, np.array([2.0, 2.0]), np.array([0.0, 0.0]))
+    # Two posts at 1.0 against a prior of 0 with the default pseudo-count
+    assert mean == pytest.approx(np.full(2, 2.0 / (2 + DEFAULT_PRIOR_STRENGTH)))
+
+
+def test_one_lucky_post_does_not_beat_a_consistent_slot():
+    stats = _empty_stats()
+    # Mondays (2024-01-01 is a Monday) at 9:00 are consistently good; one Tuesday 18:00 post did better
+    monday_9 = [(f"2024-01-{day:02d}", 9, engagement) for day, engagement in zip((1, 8, 15, 22, 29), (350, 600, 400, 700, 450))]
+    wednesday_13 = [(f"2024-02-{day:02d}", 13, engagement) for day, engagement in zip((7, 14, 21, 28), (20, 90, 40, 150))]
+    accumulate_posts(stats, _posts(monday_9 + [("2024-01-02", 18, 1200)] + wednesday_13))
+    recommendation, grid = compute_recommendation(stats)
+    expected = np.array(grid["expected"])
+    assert expected[1, 18] > expected[0, 9]     # higher mean, but one post only
+    assert recommendation["label"] == "Monday 09:00"
+    assert recommendation["n_posts"] == 10
+
+
+def test_incremental_fit_reads_only_posts_after_the_watermark(monkeypatch):
+    monkeypatch.setattr(database, "db", mongomock.MongoClient().db)
+    monkeypatch.setattr(posting_time_model, "get_latest_benchmarks", lambda: None)
+    posts = database.db[database.POSTS_COLLECTION]
+    posts.insert_many([dict(row, profile_url="p") for row in _posts([("2024-01-01", 9, 100), ("2024-01-08", 9, 120)]).to_dict("records")])
+    posting_time_model.fit_posting_time_model("p")
+    first = posting_time_model.get_posting_time_model("p")
+
+    posts.insert_one(dict(_posts([("2024-01-15", 9, 140)]).iloc[0].to_dict(), profile_url="p"))
+    recommendation = posting_time_model.fit_posting_time_model("p")
+    second = posting_time_model.get_posting_time_model("p")
+    assert recommendation["n_posts"] == 3
+    assert second["fitted_through"] > first["fitted_through"]
+    # Nothing new: the stored model is returned unchanged
+    assert posting_time_model.fit_posting_time_model("p")["n_posts"] == 3
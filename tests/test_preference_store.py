@@ -0,0 +1,58 @@
+import mongomock
+import pandas as pd
+import pytest
+from bson import ObjectId
+
+import database
+import preference_store
+from preference_store import PreferenceStore, counts_from_feedback, derive_preferences, DEFAULT_PREFERENCES
+
+
+def _feedback(feedback, content="Short post", tone="Bold", topic="AI"):
+    return {"_id": ObjectId(), "profile_url": "p", "feedback": feedback, "content": content, "tone": tone, "topic": topic}
+
+
+def test_defaults_until_enough_ratings():
+    preferences = derive_preferences(counts_from_feedback(pd.DataFrame([_feedback("positive")])))
+    assert preferences["preferred_tone"] == DEFAULT_PREFERENCES["preferred_tone"]
+    assert preferences["preferred_content_types"] == ["ai"]
+    assert preferences["ratings"] == 1
+
+
+def test_learns_the_best_rated_options():
+    docs = [_feedback("positive"), _feedback("saved"), _feedback("negative", tone="Formal", content="x" * 900),
+            _feedback("negative", tone="Formal", content="#tag " + "x" * 900)]
+    preferences = derive_preferences(counts_from_feedback(pd.DataFrame(docs)))
+    assert preferences["preferred_tone"] == "Bold"
+    assert preferences["optimal_length"] == "short"
+    assert preferences["suggested_max_length"] == 300
+    assert preferences["hashtag_preference"] is False
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(database, "db", mongomock.MongoClient().db)
+    return PreferenceStore()
+
+
+def _save(doc):
+    database.db[database.FEEDBACK_COLLECTION].insert_one(doc)
+    return doc
+
+
+def test_feedback_is_counted_once_around_the_backfill(store):
+    _save(_feedback("positive"))
+    store.record_feedback(_save(_feedback("positive")))       # triggers the backfill, which counts both
+    assert store.get("p")["ratings"] == 2
+    store.record_feedback(_save(_feedback("negative")))
+    assert store.get("p")["ratings"] == 3
+
+
+def test_feedback_saved_during_a_concurrent_backfill_is_not_lost(store, monkeypatch):
+    _save(_feedback("positive"))
+    stale_read = database.get_feedback_by_profile_url("p")
+    late = _save(_feedback("positive"))
+    # Another process backfills from a read taken before `late` was saved
+    database.backfill_user_preference_counts("p", counts_from_feedback(stale_read), preference_store._feedback_watermark(stale_read))
+    store.record_feedback(late)
+    assert store.get("p")["ratings"] == 2
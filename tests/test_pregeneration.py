@@ -0,0 +1,46 @@
+import pandas as pd
+
+import pregeneration
+
+
+def test_failed_attempts_count_against_the_budget(monkeypatch):
+    candidates = [{"profile_url": "p", "topic": f"topic {i}", "options": {}, "score": 1.0} for i in range(10)]
+    sent = []
+
+    def failing_batch(jobs, max_concurrency, rate_per_second):
+        sent.extend(jobs)
+        for job in jobs:
+            yield {"job": job, "posts": [], "error": "ServiceUnavailable: down"}
+
+    monkeypatch.setattr(pregeneration, "predict_requests", lambda: candidates)
+    monkeypatch.setattr(pregeneration, "run_batch_generation", failing_batch)
+    summary = pregeneration.run_pregeneration(budget=3)
+    assert len(sent) == 3
+    assert summary["failed"] == 3 and summary["generated"] == 0
+
+
+def test_cached_candidates_are_free(monkeypatch):
+    candidates = [{"profile_url": "p", "topic": f"topic {i}", "options": {}, "score": 1.0} for i in range(5)]
+
+    def batch(jobs, max_concurrency, rate_per_second):
+        for job in jobs:
+            cached = job["topic"] in ("topic 0", "topic 1")
+            yield {"job": job, "posts": None if cached else [{"content": "x"}], "error": None}
+
+    monkeypatch.setattr(pregeneration, "predict_requests", lambda: candidates)
+    monkeypatch.setattr(pregeneration, "run_batch_generation", batch)
+    summary = pregeneration.run_pregeneration(budget=3)
+    assert (summary["already_cached"], summary["generated"]) == (2, 3)
+
+
+def test_recent_requests_outrank_old_ones(monkeypatch):
+    now = pd.Timestamp("2026-01-15")
+    requests = [
+        {"profile_url": "p", "topic": "AI", "tone": "Bold", "options": {}, "timestamp": now - pd.Timedelta(hours=1)},
+        {"profile_url": "p", "topic": "Hiring", "tone": "Bold", "options": {}, "timestamp": now - pd.Timedelta(days=6)},
+    ]
+    monkeypatch.setattr(pregeneration, "get_recent_generation_requests", lambda since: requests)
+    monkeypatch.setattr(pregeneration, "get_recent_feedback_topics", lambda since: [])
+    candidates = pregeneration.predict_requests(now=now, min_score=0.1)
+    assert [c["topic"] for c in candidates] == ["AI", "Hiring"]
+    assert candidates[0]["options"]["tone"] == "Bold"
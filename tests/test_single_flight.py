@@ -0,0 +1,54 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    group = SingleFlight("test")
+    calls = []
+
+    def slow(value):
+        calls.append(value)
+        time.sleep(0.1)
+        return value * 2
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(group.do("k", slow, 21))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [42] * 8
+    assert len(calls) == 1
+    assert group.get_stats()["coalesced"] == 7
+
+
+def test_errors_are_shared_and_not_remembered():
+    group = SingleFlight("test")
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        group.do("k", fail)
+    assert group.do("k", lambda: "ok") == "ok"
+
+
+def test_incremental_leader_publishes_to_followers():
+    group = SingleFlight("test")
+    leader, call = group.try_lead("stream")
+    assert leader
+    follower, same_call = group.try_lead("stream")
+    assert not follower and same_call is call
+
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(group.wait(same_call)))
+    waiter.start()
+    group.complete("stream", call, ["a", "b"])
+    waiter.join()
+    assert results == [["a", "b"]]
+    # The key is free again once the leader completed
+    assert group.try_lead("stream")[0]
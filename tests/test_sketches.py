@@ -0,0 +1,46 @@
+import random
+
+from sketches import CountMinSketch, HyperLogLog, SpaceSaving
+
+
+def _stream(seed=0):
+    rng = random.Random(seed)
+    heavy = ["#ai"] * 300 + ["#leadership"] * 200 + ["#hiring"] * 100
+    tail = [f"#tag{rng.randrange(2000)}" for _ in range(1500)]
+    items = heavy + tail
+    rng.shuffle(items)
+    return items
+
+
+def test_space_saving_finds_heavy_hitters_after_a_merge():
+    items = _stream()
+    a, b = SpaceSaving(capacity=50), SpaceSaving(capacity=50)
+    for i, item in enumerate(items):
+        (a if i % 2 else b).add(item)
+    merged = SpaceSaving.from_dict(a.to_dict()).merge(b)
+    top = merged.top_k(3)
+    assert [item for item, _, _ in top] == ["#ai", "#leadership", "#hiring"]
+    for item, count, error in top:
+        assert count - error <= items.count(item) <= count
+    assert merged.total == len(items)
+
+
+def test_count_min_never_underestimates_and_round_trips():
+    items = _stream(1)
+    sketch = CountMinSketch(width=256, depth=4)
+    for item in items:
+        sketch.add(item)
+    restored = CountMinSketch.from_dict(sketch.to_dict())
+    for item in ("#ai", "#hiring", "#tag7"):
+        assert restored.estimate(item) >= items.count(item)
+    assert restored.estimate("#ai") <= 300 + len(items) // 64
+
+
+def test_hyperloglog_counts_distinct_items_across_merges():
+    a, b = HyperLogLog(), HyperLogLog()
+    for i in range(6000):
+        a.add(f"user{i}")
+    for i in range(4000, 10000):
+        b.add(f"user{i}")
+    merged = HyperLogLog.from_dict(a.to_dict()).merge(b)
+    assert abs(merged.count() - 10000) < 10000 * 0.05
@@ -0,0 +1,24 @@
+from token_budget import ContextItem, MAX_OUTPUT_TOKENS, OUTPUT_TOKEN_BUCKET, estimate_tokens, output_token_limit, pack_context
+
+
+def test_estimates_are_in_a_plausible_range():
+    text = "Leadership is about listening first, then deciding. What do you think?"
+    assert 12 <= estimate_tokens(text) <= 25
+    assert estimate_tokens("") == 0
+
+
+def test_output_limits_are_bucketed_and_capped():
+    limit = output_token_limit(500, 3)
+    assert limit % OUTPUT_TOKEN_BUCKET == 0
+    assert limit >= 3 * 500 / 4
+    assert output_token_limit(501, 3) == limit
+    assert output_token_limit(100_000, 3) == MAX_OUTPUT_TOKENS
+
+
+def test_packing_prefers_value_per_token_and_keeps_order():
+    cheap = ContextItem("insights", "Best time: Tuesday 9:00.", 5)
+    bulky = ContextItem("feedback", "liked " * 200, 6)
+    useful = ContextItem("feedback", "Readers liked short posts with a question.", 4)
+    packed = pack_context([bulky, cheap, useful], budget=40)
+    assert packed == [cheap, useful]
+    assert pack_context([bulky], budget=0) == []
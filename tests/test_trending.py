@@ -0,0 +1,53 @@
+import pytest
+
+import trending
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """In-memory sketch store with the same compare-and-swap contract as database.save_trending_sketch."""
+    docs, writes = {}, []
+
+    def save(kind, window, scope, data, version):
+        writes.append((kind, window, scope))
+        if docs.get((kind, window, scope), {}).get("version", 0) != version:
+            return False
+        docs[(kind, window, scope)] = dict(data, version=version + 1)
+        return True
+
+    monkeypatch.setattr(trending, "_indexes_ready", True)
+    monkeypatch.setattr(trending, "_pending", {})
+    monkeypatch.setattr(trending, "_start_flusher", lambda: None)
+    monkeypatch.setattr(trending, "get_trending_sketches",
+                        lambda kind, windows, scope: [docs[(kind, w, scope)] for w in windows if (kind, w, scope) in docs])
+    monkeypatch.setattr(trending, "save_trending_sketch", save)
+    return docs, writes
+
+
+def _feedback(topic):
+    return {"profile_url": "p", "timestamp": "2026-03-04 10:00", "topic": topic}
+
+
+def test_feedback_topics_are_batched_off_the_request_path(store):
+    docs, writes = store
+    for topic in ["AI", "AI", "Careers"]:
+        trending.record_feedback_topic(_feedback(topic))
+    assert writes == []
+
+    assert trending.flush() == 6                                 # 3 windows x (profile, all profiles)
+    assert len(writes) == 6
+    top = trending.get_trending("topics", "week", when="2026-03-04")["top"]
+    assert [(item, count) for item, count, _ in top] == [("ai", 2), ("careers", 1)]
+
+
+def test_conflicting_updates_are_retried_instead_of_dropped(store, monkeypatch):
+    docs, writes = store
+    save = trending.save_trending_sketch
+    monkeypatch.setattr(trending, "save_trending_sketch", lambda *args: False)
+    trending.record_items("topics", [("p", "2026-03-04", ["AI"])])
+    assert docs == {} and len(trending._pending) == 6
+
+    monkeypatch.setattr(trending, "save_trending_sketch", save)
+    trending.flush()
+    assert trending.get_trending("topics", "day", when="2026-03-04", profile_url="p")["total"] == 1
+    assert trending._pending == {}
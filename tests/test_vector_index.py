@@ -0,0 +1,101 @@
+import mongomock
+import numpy as np
+import pytest
+
+import database
+import vector_index
+from vector_index import ProfileIndex, embed_text, _entry
+
+
+def _post(ref, content, engagement):
+    return _entry("post", ref, "https://www.linkedin.com/in/p/", content, engagement)
+
+
+def test_empty_profile_index_returns_no_matches():
+    for backend in ("numpy", "lsh"):
+        index = ProfileIndex(backend)
+        assert index.search(embed_text("leadership"), 3) == []
+        assert index.high_performing_mask().dtype == bool
+
+
+def test_feedback_only_index_uses_liked_entries():
+    index = ProfileIndex("numpy")
+    index.add([_entry("feedback", "f1", "u", "leadership lessons from my first team", feedback="positive"),
+               _entry("feedback", "f2", "u", "leadership lessons I regret", feedback="negative")])
+    matches = index.search(embed_text("leadership lessons"), 3)
+    assert [m["ref"] for m in matches] == ["f1"]
+
+
+def test_mask_is_kept_in_sync_with_added_entries():
+    index = ProfileIndex("numpy")
+    index.add([_post("a", "remote work tips", 10), _post("b", "remote work myths", 100)])
+    assert index.mask.tolist() == [False, True]
+    index.add([_post("c", "remote work tools", 1000)])
+    assert len(index.mask) == len(index.entries) == len(index.index.vectors)
+    matches = index.search(embed_text("remote work"), 3)
+    assert sorted(m["ref"] for m in matches) == ["b", "c"]
+
+
+def test_duplicate_entries_are_ignored():
+    index = ProfileIndex("lsh")
+    index.add([_post("a", "hiring engineers", 5)])
+    index.add([_post("a", "hiring engineers", 5)])
+    assert len(index.entries) == 1
+    assert np.isfinite(index.engagement).all()
+
+
+def test_reindexing_a_post_updates_its_engagement():
+    index = ProfileIndex("numpy")
+    index.add([_post("a", "remote work tips", 10), _post("b", "remote work myths", 100)])
+    index.add([_post("a", "remote work tips", 1000)])
+    assert len(index.entries) == 2
+    assert index.mask.tolist() == [True, False]
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    monkeypatch.setattr(database, "db", mongomock.MongoClient().db)
+
+    def save_embedding_entries(entries):
+        # mongomock's bulk_write does not accept the current pymongo operation objects
+        for e in entries:
+            database.db[database.EMBEDDINGS_COLLECTION].update_one({"source": e["source"], "ref": e["ref"]}, {"$set": e}, upsert=True)
+
+    monkeypatch.setattr(vector_index, "save_embedding_entries", save_embedding_entries)
+    vector_index.invalidate()
+    yield
+    vector_index.invalidate()
+
+
+def _store_posts(profile_url, n):
+    database.db[database.POSTS_COLLECTION].insert_many([
+        {"profile_url": profile_url, "post_url": f"{profile_url}post{i}", "content": f"Hiring lesson {i}: hire for curiosity", "engagement": 10 * i}
+        for i in range(n)
+    ])
+
+
+def test_posts_are_backfilled_when_feedback_was_indexed_first(mongo):
+    _store_posts("p", 6)
+    feedback = {"profile_url": "p", "content": "Hiring lessons from my startup", "feedback": "negative"}
+    database.db[database.FEEDBACK_COLLECTION].insert_one(feedback)
+    vector_index.index_feedback(feedback)
+
+    examples = vector_index.retrieve_examples("p", "hiring lessons")
+    assert examples and all(e["source"] == "post" for e in examples)
+    assert len(database.get_embedding_entries("p")) == 7
+
+
+def test_changes_from_other_processes_reach_a_loaded_index(mongo):
+    _store_posts("p", 2)
+    assert len(vector_index.get_profile_index("p").entries) == 2
+    # Another process stores and embeds a post; its change event drops the loaded index
+    database.db[database.POSTS_COLLECTION].insert_one({"profile_url": "p", "post_url": "new", "content": "Hiring again", "engagement": 5})
+    vector_index.invalidate("p")
+    assert len(vector_index.get_profile_index("p").entries) == 3
+
+
+def test_loaded_indexes_are_bounded(mongo, monkeypatch):
+    monkeypatch.setattr(vector_index, "VECTOR_INDEX_MAX_PROFILES", 2)
+    for profile_url in ("a", "b", "a", "c"):
+        vector_index.get_profile_index(profile_url)
+    assert list(vector_index._indexes) == ["a", "c"]
@@ -0,0 +1,104 @@
+import math
+import os
+import re
+import threading
+
+# Token budget for the profile-specific context (insights + feedback) in a generation prompt
+PROMPT_CONTEXT_TOKEN_BUDGET = int(os.environ.get("PROMPT_CONTEXT_TOKEN_BUDGET", 300))
+
+CHARS_PER_TOKEN = 4.0            # typical for English text with Gemini/SentencePiece tokenizers
+OUTPUT_SAFETY_FACTOR = 1.25      # headroom so posts are not cut off mid-JSON
+JSON_OVERHEAD_PER_VARIATION = 24  # keys, quotes and the engagement estimate for one variation
+JSON_OVERHEAD_BASE = 16           # {"posts": [ ... ]}
+OUTPUT_TOKEN_BUCKET = 64          # round limits so model configs and cache keys stay few and stable
+MAX_OUTPUT_TOKENS = 2048
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """
+    Local token count estimate without a tokenizer download: the average of a
+    characters/4 estimate and a word-and-punctuation piece count.
+    """
+    if not text:
+        return 0
+    by_chars = len(text) / CHARS_PER_TOKEN
+    by_pieces = len(_PIECES.findall(text))
+    return max(1, int(math.ceil((by_chars + by_pieces) / 2)))
+
+
+def output_token_limit(max_length, num_variations):
+    """
+    max_output_tokens sized for num_variations posts of at most max_length characters.
+
+    Args:
+        max_length (int): Maximum characters per post
+        num_variations (int): Number of variations requested
+
+    Returns:
+        int: Output token limit, rounded up to OUTPUT_TOKEN_BUCKET
+    """
+    per_variation = max_length / CHARS_PER_TOKEN * OUTPUT_SAFETY_FACTOR + JSON_OVERHEAD_PER_VARIATION
+    limit = per_variation * num_variations + JSON_OVERHEAD_BASE
+    limit = int(math.ceil(limit / OUTPUT_TOKEN_BUCKET) * OUTPUT_TOKEN_BUCKET)
+    return min(limit, MAX_OUTPUT_TOKENS)
+
+
+class ContextItem:
+    """One piece of prompt context competing for the token budget."""
+
+    def __init__(self, section, text, value):
+        self.section = section
+        self.text = text
+        self.value = value
+        self.tokens = estimate_tokens(text)
+
+
+def pack_context(items, budget=None):
+    """
+    Selects the context items with the highest value per token that fit in the budget.
+
+    Args:
+        items (list): ContextItem candidates
+        budget (int, optional): Token budget (defaults to PROMPT_CONTEXT_TOKEN_BUDGET)
+
+    Returns:
+        list: Selected items, in their original order
+    """
+    budget = PROMPT_CONTEXT_TOKEN_BUDGET if budget is None else budget
+    ranked = sorted(enumerate(items), key=lambda pair: pair[1].value / max(1, pair[1].tokens), reverse=True)
+    selected, used = [], 0
+    for index, item in ranked:
+        if used + item.tokens <= budget:
+            selected.append((index, item))
+            used += item.tokens
+    return [item for _, item in sorted(selected, key=lambda pair: pair[0])]
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Per-call token accounting
+_lock = threading.Lock()
+_usage = {"calls": 0, "prompt_tokens": 0, "output_tokens": 0, "reported_calls": 0}
+
+
+def record_usage(prompt, response_text, usage=None, label="generate"):
+    """
+    Logs prompt and output tokens for one model call and adds them to the process totals.
+    Uses the counts reported by the backend when available, local estimates otherwise.
+    """
+    if usage:
+        prompt_tokens, output_tokens, source = usage["prompt_tokens"], usage["output_tokens"], "reported"
+    else:
+        prompt_tokens, output_tokens, source = estimate_tokens(prompt), estimate_tokens(response_text), "estimated"
+    with _lock:
+        _usage["calls"] += 1
+        _usage["prompt_tokens"] += prompt_tokens
+        _usage["output_tokens"] += output_tokens
+        _usage["reported_calls"] += source == "reported"
+    print(f"[tokens] {label}: prompt={prompt_tokens} output={output_tokens} ({source})")
+
+
+def get_token_stats():
+    with _lock:
+        return dict(_usage)
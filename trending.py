@@ -0,0 +1,300 @@
+import argparse
+import atexit
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from sketches import SpaceSaving, CountMinSketch, HyperLogLog
+from database import (
+    POSTS_COLLECTION,
+    FEEDBACK_COLLECTION,
+    stream_collection,
+    clear_trending_sketches,
+    ensure_trending_indexes,
+    get_trending_sketches,
+    save_trending_sketch,
+)
+
+ALL_PROFILES = "__all__"
+KINDS = ("hashtags", "topics")
+MAX_WRITE_RETRIES = 5
+# Feedback topics are merged into the stored sketches in the background at this interval
+TRENDING_FLUSH_SECONDS = float(os.environ.get("TRENDING_FLUSH_SECONDS", 5))
+
+_indexes_ready = False
+# (kind, window, scope) -> TrendingSketch not yet merged into the store
+_pending = {}
+_pending_lock = threading.Lock()
+_flusher_thread = None
+
+
+class TrendingSketch:
+    """Heavy hitters + Count-Min + HyperLogLog for one kind/window/scope. Mergeable."""
+
+    def __init__(self, heavy_hitters=None, cms=None, hll=None):
+        self.heavy_hitters = heavy_hitters or SpaceSaving()
+        self.cms = cms or CountMinSketch()
+        self.hll = hll or HyperLogLog()
+
+    def add(self, item, count=1):
+        self.heavy_hitters.add(item, count)
+        self.cms.add(item, count)
+        self.hll.add(item)
+
+    def merge(self, other):
+        self.heavy_hitters.merge(other.heavy_hitters)
+        self.cms.merge(other.cms)
+        self.hll.merge(other.hll)
+        return self
+
+    def to_dict(self):
+        return {"heavy_hitters": self.heavy_hitters.to_dict(), "cms": self.cms.to_dict(), "hll": self.hll.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            SpaceSaving.from_dict(data.get("heavy_hitters", {})),
+            CountMinSketch.from_dict(data.get("cms", {})),
+            HyperLogLog.from_dict(data.get("hll", {})),
+        )
+
+
+def windows_for(timestamp):
+    """Day, ISO week and month window keys that a timestamp falls into."""
+    ts = pd.Timestamp(timestamp)
+    iso = ts.isocalendar()
+    return [f"day:{ts:%Y-%m-%d}", f"week:{iso.year}-W{iso.week:02d}", f"month:{ts:%Y-%m}"]
+
+
+def _normalize(item):
+    return str(item).strip().lstrip('#').lower()
+
+
+def _ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        ensure_trending_indexes()
+        _indexes_ready = True
+
+
+def _merge_into_store(kind, window, scope, delta):
+    """Merges an in-memory sketch into the stored one with optimistic concurrency."""
+    for _ in range(MAX_WRITE_RETRIES):
+        stored = get_trending_sketches(kind, [window], scope)
+        version = stored[0]["version"] if stored else 0
+        sketch = TrendingSketch.from_dict(stored[0]) if stored else TrendingSketch()
+        sketch.merge(delta)
+        if save_trending_sketch(kind, window, scope, sketch.to_dict(), version):
+            return True
+    print(f"⚠️ Trending sketch {kind}/{window}/{scope} conflicted {MAX_WRITE_RETRIES} times; retrying on the next flush")
+    return False
+
+
+def _queue(kind, deltas):
+    with _pending_lock:
+        for (window, scope), delta in deltas.items():
+            pending = _pending.get((kind, window, scope))
+            _pending[(kind, window, scope)] = pending.merge(delta) if pending else delta
+
+
+def _store(kind, deltas):
+    """Merges deltas into the store; ones that keep conflicting are queued for the next flush instead of dropped."""
+    _ensure_indexes()
+    failed = {key: delta for key, delta in deltas.items() if not _merge_into_store(kind, *key, delta)}
+    if failed:
+        _queue(kind, failed)
+        _start_flusher()
+
+
+def flush():
+    """Merges all queued updates into the stored sketches. Returns the number of sketches written."""
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+    by_kind = {}
+    for (kind, window, scope), delta in pending.items():
+        by_kind.setdefault(kind, {})[(window, scope)] = delta
+    for kind, deltas in by_kind.items():
+        _store(kind, deltas)
+    return len(pending)
+
+
+def _run_flusher():
+    while True:
+        time.sleep(TRENDING_FLUSH_SECONDS)
+        try:
+            flush()
+        except Exception as e:
+            print(f"⚠️ Trending flush error: {e}")
+
+
+def _start_flusher():
+    global _flusher_thread
+    with _pending_lock:
+        if _flusher_thread is None or not _flusher_thread.is_alive():
+            _flusher_thread = threading.Thread(target=_run_flusher, name="trending-flush", daemon=True)
+            _flusher_thread.start()
+
+
+def _deltas(events):
+    deltas = {}
+    for profile_url, timestamp, items in events:
+        items = [_normalize(i) for i in items if i]
+        if not items or pd.isna(timestamp):
+            continue
+        for window in windows_for(timestamp):
+            for scope in (profile_url, ALL_PROFILES):
+                if scope is None:
+                    continue
+                delta = deltas.setdefault((window, scope), TrendingSketch())
+                for item in items:
+                    delta.add(item)
+    return deltas
+
+
+def record_items(kind, events, background=False):
+    """
+    Adds (profile_url, timestamp, items) events to the persisted sketches.
+
+    Every event is counted in its day/week/month window, both for its profile
+    and for the all-profiles scope. Events are grouped first so each stored
+    sketch is read and written once per call.
+
+    Args:
+        kind (str): 'hashtags' or 'topics'
+        events (iterable): (profile_url, timestamp, list of items) tuples
+        background (bool): Queue the updates for the flusher thread instead of writing
+            them now, so many small calls share one write per sketch
+    """
+    deltas = _deltas(events)
+    if not deltas:
+        return
+    if background:
+        _queue(kind, deltas)
+        _start_flusher()
+    else:
+        _store(kind, deltas)
+
+
+def record_post_hashtags(posts_df):
+    """Records hashtags of newly stored posts (call only with posts that were not stored before)."""
+    if posts_df.empty or 'hashtags_list' not in posts_df.columns:
+        return
+    events = [
+        (row.get('profile_url'), pd.to_datetime(row.get('date'), errors='coerce'), row.get('hashtags_list'))
+        for row in posts_df.to_dict(orient='records')
+        if isinstance(row.get('hashtags_list'), list)
+    ]
+    record_items("hashtags", events)
+
+
+def record_feedback_topic(feedback_doc):
+    """Queues the topic of a newly saved feedback document; it reaches the stored sketches within TRENDING_FLUSH_SECONDS."""
+    if feedback_doc.get("topic"):
+        timestamp = feedback_doc.get("timestamp") or datetime.now()
+        record_items("topics", [(feedback_doc.get("profile_url"), timestamp, [feedback_doc["topic"]])], background=True)
+
+
+# Queued updates are written before the process exits
+atexit.register(flush)
+
+
+def _load_merged(kind, windows, scope):
+    merged = TrendingSketch()
+    for doc in get_trending_sketches(kind, windows, scope):
+        merged.merge(TrendingSketch.from_dict(doc))
+    return merged
+
+
+def get_trending(kind="hashtags", period="week", when=None, k=10, profile_url=None):
+    """
+    Trending items for the day/week/month containing `when` (defaults to now).
+
+    Args:
+        kind (str): 'hashtags' or 'topics'
+        period (str): 'day', 'week' or 'month'
+        when (datetime, optional): Any moment inside the wanted window
+        k (int): Number of items to return
+        profile_url (str, optional): Restrict to one profile (default: all profiles)
+
+    Returns:
+        dict: 'top' as [(item, estimated_count, max_error)], 'distinct' estimate and 'total'
+    """
+    window = next(w for w in windows_for(when or datetime.now()) if w.startswith(period + ":"))
+    sketch = _load_merged(kind, [window], profile_url or ALL_PROFILES)
+    return {
+        "window": window,
+        "top": sketch.heavy_hitters.top_k(k),
+        "distinct": sketch.hll.count(),
+        "total": sketch.heavy_hitters.total,
+    }
+
+
+def get_trending_last_days(kind="hashtags", days=7, k=10, profile_url=None, end=None):
+    """Trending items over a rolling range of days, merged from the per-day sketches."""
+    end = pd.Timestamp(end or datetime.now())
+    windows = [f"day:{end - timedelta(days=i):%Y-%m-%d}" for i in range(days)]
+    sketch = _load_merged(kind, windows, profile_url or ALL_PROFILES)
+    return {
+        "windows": windows,
+        "top": sketch.heavy_hitters.top_k(k),
+        "distinct": sketch.hll.count(),
+        "total": sketch.heavy_hitters.total,
+    }
+
+
+def estimate_count(item, kind="hashtags", period="week", when=None, profile_url=None):
+    """Count-Min frequency estimate for any item, including ones outside the top-k."""
+    window = next(w for w in windows_for(when or datetime.now()) if w.startswith(period + ":"))
+    return _load_merged(kind, [window], profile_url or ALL_PROFILES).cms.estimate(_normalize(item))
+
+
+def backfill(kind, batch_size=1000):
+    """
+    Rebuilds the sketches for one kind from the raw collections in a single
+    streaming pass. Drops the existing sketches for that kind first.
+    """
+    clear_trending_sketches(kind)
+    if kind == "hashtags":
+        cursor = stream_collection(
+            POSTS_COLLECTION,
+            {"hashtags_list.0": {"$exists": True}},
+            {"_id": 0, "profile_url": 1, "date": 1, "hashtags_list": 1},
+            batch_size=batch_size,
+        )
+        events = ((d.get("profile_url"), pd.to_datetime(d.get("date"), errors='coerce'), d["hashtags_list"]) for d in cursor)
+    else:
+        cursor = stream_collection(
+            FEEDBACK_COLLECTION,
+            {"topic": {"$nin": [None, ""]}},
+            {"_id": 0, "profile_url": 1, "timestamp": 1, "topic": 1},
+            batch_size=batch_size,
+        )
+        events = ((d.get("profile_url"), d.get("timestamp"), [d["topic"]]) for d in cursor)
+
+    chunk = []
+    for event in events:
+        chunk.append(event)
+        if len(chunk) >= batch_size:
+            record_items(kind, chunk)
+            chunk = []
+    if chunk:
+        record_items(kind, chunk)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trending hashtags/topics across all profiles")
+    parser.add_argument('--kind', choices=KINDS, default="hashtags")
+    parser.add_argument('--period', choices=["day", "week", "month"], default="week")
+    parser.add_argument('--backfill', action='store_true', help="Rebuild sketches from the raw collections first")
+    args = parser.parse_args()
+
+    if args.backfill:
+        backfill(args.kind)
+    result = get_trending(args.kind, args.period)
+    print(f"Trending {args.kind} ({result['window']}, ~{result['distinct']} distinct):")
+    for item, count, error in result["top"]:
+        print(f"  {item}: {count} (±{error})")
@@ -1,5 +1,6 @@
 import re
 import pandas as pd
+import numpy as np
 import os
 from datetime import datetime
 import urllib.parse
@@ -164,3 +165,26 @@ def format_date_time(date_str, time_str=None):
     except Exception as e:
         print(f"Error formatting date/time: {str(e)}")
         return str(date_str), time_str
+
+def make_serializable(obj):
+    """
+    Converts analysis output (numpy scalars, Series, Timestamps, NaN) into
+    values that can be stored in MongoDB.
+
+    Args:
+        obj: Analysis value, possibly nested in dicts
+
+    Returns:
+        The same value using only BSON-friendly types
+    """
+    if isinstance(obj, dict):
+        return {str(k): make_serializable(v) for k, v in obj.items()}
+    elif isinstance(obj, (np.float64, np.int64, np.int32, np.float32)):
+        return float(obj)
+    elif isinstance(obj, (np.ndarray, pd.Series)):
+        return make_serializable(obj.tolist())
+    elif isinstance(obj, pd.Timestamp):
+        return obj.to_pydatetime()
+    elif isinstance(obj, float) and np.isnan(obj):
+        return None
+    return obj
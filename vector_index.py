@@ -0,0 +1,373 @@
+import argparse
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from database import (
+    POSTS_COLLECTION,
+    FEEDBACK_COLLECTION,
+    stream_collection,
+    get_posts_by_profile_url,
+    get_feedback_by_profile_url,
+    ensure_embedding_indexes,
+    save_embedding_entries,
+    get_embedding_entries,
+    clear_embedding_entries,
+    count_profile_documents,
+)
+from single_flight import get_group
+
+EMBEDDING_DIM = 256
+EXAMPLE_CHARS = 300          # content stored per entry and shown as a few-shot example
+DEFAULT_K = 3
+MIN_SIMILARITY = 0.05
+
+# "numpy" (exact brute force) or "lsh" (random-hyperplane ANN); ANN pays off for large profiles
+VECTOR_INDEX_BACKEND = os.environ.get("VECTOR_INDEX_BACKEND", "numpy")
+LSH_BITS = 12
+LSH_TABLES = 8
+# Profile indexes kept in memory; the least recently used are dropped and reloaded on demand
+VECTOR_INDEX_MAX_PROFILES = int(os.environ.get("VECTOR_INDEX_MAX_PROFILES", 200))
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "i", "in", "is", "it",
+    "its", "my", "of", "on", "or", "our", "so", "that", "the", "this", "to", "was", "we", "what", "with", "you",
+}
+
+
+def _hash(feature):
+    digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+    value = int.from_bytes(digest, 'little')
+    return value % EMBEDDING_DIM, 1.0 if (value >> 32) & 1 else -1.0
+
+
+def embed_text(text):
+    """
+    Local text embedding without a model download: signed feature hashing of
+    words, word bigrams and hashtags with sublinear term frequency, L2-normalized.
+
+    Returns:
+        np.ndarray: EMBEDDING_DIM float32 vector (all zeros for empty text)
+    """
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    words = [w for w in re.findall(r'#?\w+', (text or "").lower()) if w.lstrip('#') not in _STOPWORDS]
+    features = {}
+    for i, word in enumerate(words):
+        for feature in (word.lstrip('#'), f"{words[i - 1]} {word}" if i else None):
+            if feature:
+                features[feature] = features.get(feature, 0) + 1
+    for feature, count in features.items():
+        index, sign = _hash(feature)
+        vector[index] += sign * (1.0 + math.log(count))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class BruteForceIndex:
+    """Exact cosine search with one matrix-vector product over all vectors."""
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+
+    def add(self, vectors):
+        self.vectors = np.vstack([self.vectors, np.asarray(vectors, dtype=np.float32).reshape(-1, self.vectors.shape[1])])
+
+    def search(self, query, k, mask=None):
+        """
+        Returns (positions, scores) of the k most similar vectors, best first.
+        mask (np.ndarray of bool, optional) restricts the search to eligible rows.
+        """
+        if not len(self.vectors):
+            return np.array([], dtype=int), np.array([], dtype=np.float32)
+        scores = self.vectors @ query
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        top = top[np.isfinite(scores[top])]
+        return top, scores[top]
+
+
+class LSHIndex(BruteForceIndex):
+    """
+    Approximate search with random-hyperplane LSH: vectors are bucketed by the
+    sign pattern of LSH_BITS projections in LSH_TABLES tables, and only vectors
+    sharing a bucket with the query are scored exactly.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM, bits=LSH_BITS, tables=LSH_TABLES, seed=7):
+        super().__init__(dim)
+        rng = np.random.RandomState(seed)
+        self.planes = rng.randn(tables, bits, dim).astype(np.float32)
+        self.weights = 1 << np.arange(bits)
+        self.buckets = [{} for _ in range(tables)]
+
+    def _keys(self, vectors):
+        # (tables, n) bucket ids from the sign bits of each projection
+        bits = np.einsum('tbd,nd->tnb', self.planes, vectors) > 0
+        return bits @ self.weights
+
+    def add(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.vectors.shape[1])
+        start = len(self.vectors)
+        super().add(vectors)
+        for table, keys in enumerate(self._keys(vectors)):
+            for offset, key in enumerate(keys):
+                self.buckets[table].setdefault(int(key), []).append(start + offset)
+
+    def search(self, query, k, mask=None):
+        keys = self._keys(query.reshape(1, -1))[:, 0]
+        candidates = set()
+        for table, key in enumerate(keys):
+            candidates.update(self.buckets[table].get(int(key), ()))
+        candidates = np.fromiter(candidates, dtype=int, count=len(candidates))
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+        # Too few bucket hits to fill k results: fall back to the exact search
+        if len(candidates) < k:
+            return super().search(query, k, mask)
+        scores = self.vectors[candidates] @ query
+        top = np.argsort(-scores)[:k]
+        return candidates[top], scores[top]
+
+
+_backends = {"numpy": BruteForceIndex, "lsh": LSHIndex}
+
+
+class ProfileIndex:
+    """In-memory vector index over one profile's posts and feedback, with entry metadata."""
+
+    def __init__(self, backend=None):
+        self.index = _backends[backend or VECTOR_INDEX_BACKEND]()
+        self.entries = []
+        self.positions = {}                           # (source, ref) -> row
+        self.engagement = np.zeros(0, dtype=float)   # NaN for feedback entries
+        self.liked = np.zeros(0, dtype=bool)
+        self.mask = np.zeros(0, dtype=bool)
+        # Vectors, entries and the mask must change together for concurrent searches
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _engagement(entry):
+        return entry.get("engagement") if entry["source"] == "post" and entry.get("engagement") is not None else np.nan
+
+    def add(self, entries):
+        """Adds new entries; entries already present (e.g. re-scraped posts) update their engagement and rating."""
+        with self.lock:
+            new = []
+            for entry in entries:
+                position = self.positions.get((entry["source"], entry["ref"]))
+                if position is None:
+                    new.append(entry)
+                    continue
+                self.entries[position] = entry
+                self.engagement[position] = self._engagement(entry)
+                self.liked[position] = entry.get("feedback") == "positive"
+            new = list({(e["source"], e["ref"]): e for e in new}.values())
+            if new:
+                self.index.add(np.array([e["vector"] for e in new], dtype=np.float32))
+                for entry in new:
+                    self.positions[(entry["source"], entry["ref"])] = len(self.entries)
+                    self.entries.append(entry)
+                self.engagement = np.concatenate([self.engagement, np.array([self._engagement(e) for e in new], dtype=float)])
+                self.liked = np.concatenate([self.liked, np.array([e.get("feedback") == "positive" for e in new], dtype=bool)])
+            self.mask = self.high_performing_mask()
+
+    def high_performing_mask(self):
+        """Posts at or above the profile's median engagement, and positively rated generated posts."""
+        if not len(self.engagement):
+            return np.zeros(0, dtype=bool)
+        median = np.nanmedian(self.engagement) if np.isfinite(self.engagement).any() else np.inf
+        with np.errstate(invalid='ignore'):
+            return (self.engagement >= median) | self.liked
+
+    def search(self, query_vector, k):
+        with self.lock:
+            if not self.entries:
+                return []
+            positions, scores = self.index.search(query_vector, k, self.mask)
+            return [dict(self.entries[p], similarity=float(s)) for p, s in zip(positions, scores)]
+
+
+_indexes = OrderedDict()    # profile_url -> ProfileIndex, least recently used first
+_lock = threading.Lock()
+_load_flight = get_group("vector_index")
+_indexes_ready = False
+
+
+def _ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        ensure_embedding_indexes()
+        _indexes_ready = True
+
+
+def _entry(source, ref, profile_url, content, engagement=None, feedback=None):
+    engagement = None if engagement is None or (isinstance(engagement, float) and math.isnan(engagement)) else float(engagement)
+    return {
+        "source": source,
+        "ref": str(ref),
+        "profile_url": profile_url,
+        "content": content[:EXAMPLE_CHARS],
+        "engagement": engagement,
+        "feedback": feedback,
+        "vector": [float(x) for x in embed_text(content)],
+    }
+
+
+def _store(entries):
+    """Persists entries and appends them to any in-memory profile index already loaded."""
+    if not entries:
+        return
+    _ensure_indexes()
+    save_embedding_entries(entries)
+    with _lock:
+        loaded = [(_indexes[e["profile_url"]], e) for e in entries if e["profile_url"] in _indexes]
+    for index, entry in loaded:
+        index.add([entry])
+
+
+def index_posts(records):
+    """
+    Embeds scraped posts (call at insert time with the new post records).
+
+    Args:
+        records (list): Post dicts with 'post_url', 'profile_url', 'content' and 'engagement'
+    """
+    _store([
+        _entry("post", r["post_url"], r.get("profile_url"), r["content"], r.get("engagement"))
+        for r in records if r.get("post_url") and isinstance(r.get("content"), str) and r["content"].strip()
+    ])
+
+
+def index_feedback(feedback_doc):
+    """Embeds a saved feedback document (generated post content)."""
+    if not feedback_doc.get("content"):
+        return
+    _store([_entry(
+        "feedback", feedback_doc.get("_id"), feedback_doc.get("profile_url"),
+        feedback_doc["content"], feedback=feedback_doc.get("feedback"),
+    )])
+
+
+def _index_missing_from_raw(profile_url, entries):
+    """
+    Embeds the profile's posts and feedback that have no entry yet: everything on first
+    use, and posts or feedback saved before embedding began when newer ones were indexed
+    first. Counts are compared first, so a fully indexed profile costs two count queries.
+    """
+    present = {(e["source"], e["ref"]) for e in entries}
+    added = False
+    if count_profile_documents(POSTS_COLLECTION, profile_url) > sum(source == "post" for source, _ in present):
+        posts_df = get_posts_by_profile_url(profile_url)
+        if not posts_df.empty:
+            missing = [p for p in posts_df.to_dict(orient='records') if ("post", str(p.get("post_url"))) not in present]
+            index_posts(missing)
+            added = added or bool(missing)
+    if count_profile_documents(FEEDBACK_COLLECTION, profile_url) > sum(source == "feedback" for source, _ in present):
+        for fb in get_feedback_by_profile_url(profile_url).to_dict(orient='records'):
+            if ("feedback", str(fb.get("_id"))) not in present:
+                index_feedback(fb)
+                added = True
+    return added
+
+
+def get_profile_index(profile_url):
+    """Returns the profile's in-memory index, loading it (and embedding raw data not indexed yet)."""
+    with _lock:
+        index = _indexes.get(profile_url)
+        if index is not None:
+            _indexes.move_to_end(profile_url)
+            return index
+    return _load_flight.do(profile_url, _load_profile_index, profile_url)
+
+
+def _load_profile_index(profile_url):
+    entries = get_embedding_entries(profile_url)
+    if _index_missing_from_raw(profile_url, entries):
+        entries = get_embedding_entries(profile_url)
+    index = ProfileIndex()
+    index.add(entries)
+    with _lock:
+        if profile_url not in _indexes:
+            _indexes[profile_url] = index
+            while len(_indexes) > VECTOR_INDEX_MAX_PROFILES:
+                _indexes.popitem(last=False)
+        _indexes.move_to_end(profile_url)
+        return _indexes[profile_url]
+
+
+def invalidate(profile_url=None):
+    """
+    Drops a profile's in-memory index (every index if profile_url is None) so the next
+    retrieval reloads it, picking up entries and engagement written by other processes.
+    """
+    with _lock:
+        if profile_url is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(profile_url, None)
+
+
+def retrieve_examples(profile_url, topic, k=DEFAULT_K, min_similarity=MIN_SIMILARITY):
+    """
+    Finds the profile's high-performing posts (and liked generated posts) most similar to a topic.
+
+    Args:
+        profile_url (str): Profile whose content is searched
+        topic (str): Topic of the post being generated
+        k (int): Number of examples
+        min_similarity (float): Minimum cosine similarity for an example to be used
+
+    Returns:
+        list: Dicts with 'source', 'content', 'engagement', 'feedback' and 'similarity', most similar first
+    """
+    query = embed_text(topic)
+    if not query.any():
+        return []
+    matches = get_profile_index(profile_url).search(query, k)
+    return [
+        {key: m.get(key) for key in ("source", "content", "engagement", "feedback", "similarity")}
+        for m in matches if m["similarity"] >= min_similarity
+    ]
+
+
+def rebuild_index(batch_size=1000):
+    """Re-embeds all posts and feedback in one streaming pass."""
+    clear_embedding_entries()
+    with _lock:
+        _indexes.clear()
+    batch = []
+    for post in stream_collection(POSTS_COLLECTION, {},
+                                  {"_id": 0, "post_url": 1, "profile_url": 1, "content": 1, "engagement": 1}, batch_size):
+        batch.append(post)
+        if len(batch) >= batch_size:
+            index_posts(batch)
+            batch = []
+    if batch:
+        index_posts(batch)
+
+    for fb in stream_collection(FEEDBACK_COLLECTION, {}, {"_id": 1, "profile_url": 1, "content": 1, "feedback": 1}, batch_size):
+        index_feedback(fb)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vector index of posts for few-shot example retrieval")
+    parser.add_argument('--rebuild', action='store_true', help="Re-embed all posts and feedback")
+    parser.add_argument('--profile', type=str, default=None, help="Profile URL to search")
+    parser.add_argument('--topic', type=str, default=None, help="Topic to retrieve examples for")
+    parser.add_argument('-k', type=int, default=DEFAULT_K)
+    args = parser.parse_args()
+
+    if args.rebuild:
+        rebuild_index()
+        print("✅ Vector index rebuilt.")
+    if args.profile and args.topic:
+        for example in retrieve_examples(args.profile, args.topic, args.k):
+            print(f"  {example['similarity']:.2f}  {example['source']}  {example['content'][:80]!r}")